@@ -0,0 +1,248 @@
+"""
+Бенчмарки расчёта streak и статистики.
+
+История генерируется синтетически: daily и weekly привычки за 1–10 лет,
+плотная, редкая или с большим числом skipped. Для каждой функции замеряется
+время одного вызова и время в пересчёте на миллион логов.
+
+Запуск:
+    python -m benchmarks.bench_streak --output bench.json
+    python -m benchmarks.bench_streak --baseline bench.json --threshold 0.2
+
+В режиме сравнения код выхода 1, если какой-либо замер медленнее базового
+больше чем на threshold (доля).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Пакет bot.database читает конфигурацию при импорте, а бенчмарку токен бота не нужен
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+
+from bot.database.models import LogStatus, ScheduleType
+from bot.services.streak import calculate_daily_streak, calculate_weekly_streak, get_habit_stats
+
+# Фиксированная дата, чтобы замеры не зависели от дня запуска
+TODAY = date(2025, 6, 15)
+DEFAULT_YEARS = (1, 3, 10)
+DEFAULT_THRESHOLD = 0.2
+
+
+@dataclass(frozen=True)
+class HistoryProfile:
+    """Параметры синтетической истории привычки."""
+    name: str
+    schedule_type: ScheduleType
+    density: float  # Доля дней с логом
+    skip_share: float  # Доля skipped среди логов
+    not_done_share: float  # Доля not_done среди логов
+    weekly_target: int = 3
+
+
+PROFILES: Sequence[HistoryProfile] = (
+    HistoryProfile("daily_dense", ScheduleType.DAILY, density=0.95, skip_share=0.03, not_done_share=0.02),
+    HistoryProfile("daily_sparse", ScheduleType.DAILY, density=0.2, skip_share=0.1, not_done_share=0.2),
+    HistoryProfile("daily_skip_heavy", ScheduleType.DAILY, density=0.9, skip_share=0.5, not_done_share=0.05),
+    HistoryProfile("weekly_dense", ScheduleType.WEEKLY, density=0.7, skip_share=0.05, not_done_share=0.1),
+    HistoryProfile("weekly_sparse", ScheduleType.WEEKLY, density=0.15, skip_share=0.1, not_done_share=0.2),
+    HistoryProfile("weekly_skip_heavy", ScheduleType.WEEKLY, density=0.6, skip_share=0.5, not_done_share=0.05),
+)
+
+
+@dataclass
+class BenchResult:
+    """Результат замера одной функции на одной истории."""
+    profile: str
+    years: int
+    function: str
+    logs: int
+    calls: int
+    seconds_per_call: float
+    seconds_per_million_logs: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.profile}/{self.years}y/{self.function}"
+
+
+def generate_history(
+    profile: HistoryProfile,
+    years: int,
+    today: date = TODAY,
+    seed: int = 0,
+) -> List[SimpleNamespace]:
+    """Сгенерировать отсортированную по дате историю за years лет до today включительно."""
+    rng = random.Random(f"{profile.name}/{years}/{seed}")
+    days = years * 365
+    start = today - timedelta(days=days - 1)
+
+    logs = []
+    for offset in range(days):
+        if rng.random() >= profile.density:
+            continue
+        roll = rng.random()
+        if roll < profile.skip_share:
+            status = LogStatus.SKIPPED
+        elif roll < profile.skip_share + profile.not_done_share:
+            status = LogStatus.NOT_DONE
+        else:
+            status = LogStatus.DONE
+        logs.append(SimpleNamespace(date=start + timedelta(days=offset), status=status))
+    return logs
+
+
+def _functions(profile: HistoryProfile, logs: list) -> Dict[str, Callable[[], object]]:
+    """Замеряемые вызовы для истории профиля."""
+    if profile.schedule_type == ScheduleType.DAILY:
+        streak_name = "calculate_daily_streak"
+        streak_call = lambda: calculate_daily_streak(logs, TODAY)
+    else:
+        streak_name = "calculate_weekly_streak"
+        streak_call = lambda: calculate_weekly_streak(logs, profile.weekly_target, TODAY)
+
+    return {
+        streak_name: streak_call,
+        "get_habit_stats": lambda: get_habit_stats(
+            logs, profile.schedule_type, profile.weekly_target, TODAY
+        ),
+    }
+
+
+def time_call(func: Callable[[], object], repeat: int = 5, min_time: float = 0.05) -> tuple[int, float]:
+    """
+    Замерить вызов: (число вызовов в серии, лучшее время одного вызова в секундах).
+
+    Число вызовов подбирается так, чтобы серия длилась не меньше min_time;
+    берётся минимум по repeat сериям — он меньше всего зависит от шума.
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return number, best / number
+
+
+def run_benchmarks(
+    years: Sequence[int] = DEFAULT_YEARS,
+    profiles: Sequence[HistoryProfile] = PROFILES,
+    repeat: int = 5,
+    min_time: float = 0.05,
+) -> List[BenchResult]:
+    """Прогнать все функции на всех профилях и длинах истории."""
+    results = []
+    for profile in profiles:
+        for year_count in years:
+            logs = generate_history(profile, year_count)
+            for name, func in _functions(profile, logs).items():
+                calls, per_call = time_call(func, repeat=repeat, min_time=min_time)
+                results.append(BenchResult(
+                    profile=profile.name,
+                    years=year_count,
+                    function=name,
+                    logs=len(logs),
+                    calls=calls,
+                    seconds_per_call=per_call,
+                    seconds_per_million_logs=per_call / len(logs) * 1_000_000 if logs else 0.0,
+                ))
+    return results
+
+
+def to_json(results: Sequence[BenchResult]) -> dict:
+    """Результаты с описанием окружения для сохранения в файл."""
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "today": TODAY.isoformat(),
+        },
+        "results": {result.key: asdict(result) for result in results},
+    }
+
+
+def compare(
+    results: Sequence[BenchResult],
+    baseline: dict,
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[str]:
+    """
+    Сравнить замеры с базовыми.
+
+    Returns:
+        Описания регрессий: замеры, которые медленнее базовых больше чем на threshold
+    """
+    regressions = []
+    base_results = baseline.get("results", {})
+    for result in results:
+        base = base_results.get(result.key)
+        if base is None:
+            continue
+        ratio = result.seconds_per_call / base["seconds_per_call"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{result.key}: {base['seconds_per_call'] * 1e6:.1f} → "
+                f"{result.seconds_per_call * 1e6:.1f} µs/вызов (x{ratio:.2f})"
+            )
+    return regressions
+
+
+def _print_results(results: Sequence[BenchResult], baseline: Optional[dict]) -> None:
+    """Вывести таблицу результатов (с изменением относительно базовых, если они есть)."""
+    base_results = baseline.get("results", {}) if baseline else {}
+    print(f"{'замер':<55} {'логов':>6} {'µs/вызов':>10} {'мс/млн логов':>13} {'к базе':>7}")
+    for result in results:
+        base = base_results.get(result.key)
+        change = f"x{result.seconds_per_call / base['seconds_per_call']:.2f}" if base else ""
+        print(
+            f"{result.key:<55} {result.logs:>6} {result.seconds_per_call * 1e6:>10.1f} "
+            f"{result.seconds_per_million_logs * 1e3:>13.1f} {change:>7}"
+        )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки расчёта streak и статистики")
+    parser.add_argument("--output", help="Сохранить результаты в JSON файл")
+    parser.add_argument("--baseline", help="JSON файл с базовыми результатами для сравнения")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Допустимое замедление относительно базы (доля, по умолчанию 0.2)")
+    parser.add_argument("--years", type=int, nargs="+", default=list(DEFAULT_YEARS),
+                        help="Длины истории в годах (1–10)")
+    parser.add_argument("--repeat", type=int, default=5, help="Число серий на замер")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = run_benchmarks(years=args.years, repeat=args.repeat)
+    _print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(to_json(results), f, ensure_ascii=False, indent=2)
+        print(f"\nРезультаты сохранены в {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nРегрессии (порог {args.threshold:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nРегрессий нет (порог {args.threshold:.0%})")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,7 @@
 """
 import os
 from dataclasses import dataclass
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -29,6 +30,58 @@ class Config:
     max_habit_name_length: int = 50
     min_weekly_target: int = 1
     max_weekly_target: int = 7
+    
+    # Профиль производительности SQLite (PRAGMA на каждое соединение)
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_cache_size: int = -64000  # Отрицательное значение — в KiB (≈64 MB)
+    sqlite_mmap_size: int = 268435456  # 256 MB
+    sqlite_busy_timeout: int = 5000  # мс
+    sqlite_temp_store: str = "MEMORY"
+    sqlite_foreign_keys: bool = True
+    
+    # Очередь записи отметок с групповым commit
+    log_write_queue_size: int = 10000
+    log_write_batch_size: int = 500
+    log_write_flush_interval_ms: int = 5
+    
+    # In-process кэш пользователей
+    user_cache_size: int = 10000
+    user_cache_ttl: float = 300.0  # секунд
+    
+    # In-process кэш списков привычек (инвалидируется версией при изменениях)
+    habit_cache_size: int = 10000
+    habit_cache_ttl: float = 3600.0  # секунд
+    
+    # In-process кэш статистики привычек (по версии логов и дате «сегодня»)
+    stats_cache_size: int = 50000
+    stats_cache_ttl: float = 86400.0  # секунд
+    
+    # Планировщик напоминаний (одна проверка в минуту по индексу в памяти)
+    reminder_batch_size: int = 100  # Пользователей в одном вызове callback
+    reminder_max_catch_up_minutes: int = 5  # Сколько пропущенных минут догонять после задержки
+    reminder_restore_chunk_size: int = 1000  # Пользователей в пачке при восстановлении при старте
+    
+    # Шардирование планировщика: N воркеров (bot/worker.py), каждый со своим user_id % N
+    scheduler_enabled: bool = True  # False — процесс polling не рассылает напоминания
+    scheduler_shards: int = 0  # 0 — без шардирования, все напоминания в процессе бота
+    scheduler_shard: Optional[int] = None  # Домашний шард воркера (None — только резерв)
+    scheduler_lease_ttl: float = 30.0  # секунд; шард с истёкшей арендой забирает другой воркер
+    scheduler_poll_interval: float = 5.0  # секунд между продлением аренд и чтением журнала изменений
+    
+    # Отправка напоминаний (лимит Telegram — около 30 сообщений в секунду)
+    reminder_rate_limit: float = 25.0  # сообщений в секунду
+    reminder_burst: int = 25
+    reminder_workers: int = 8
+    reminder_queue_size: int = 100000
+    reminder_max_attempts: int = 3  # Для сетевых ошибок и ошибок сервера
+    reminder_retry_backoff: float = 1.0  # секунд перед первым повтором, дальше удваивается
+    
+    # Расчёт статистики вне event loop
+    stats_executor: str = "thread"  # thread | process
+    stats_workers: int = 2
+    stats_max_jobs: int = 4  # Одновременных расчётов в пуле
+    stats_inline_max_logs: int = 2000  # Короткие истории считаются без пула
 
 
 def get_config() -> Config:
@@ -41,6 +94,40 @@ def get_config() -> Config:
         bot_token=bot_token,
         database_url=os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./habits.db"),
         default_timezone=os.getenv("DEFAULT_TIMEZONE", "Europe/Moscow"),
+        sqlite_journal_mode=os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        sqlite_synchronous=os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        sqlite_cache_size=int(os.getenv("SQLITE_CACHE_SIZE", "-64000")),
+        sqlite_mmap_size=int(os.getenv("SQLITE_MMAP_SIZE", "268435456")),
+        sqlite_busy_timeout=int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),
+        sqlite_temp_store=os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+        sqlite_foreign_keys=os.getenv("SQLITE_FOREIGN_KEYS", "true").lower() in ("1", "true", "yes"),
+        log_write_queue_size=int(os.getenv("LOG_WRITE_QUEUE_SIZE", "10000")),
+        log_write_batch_size=int(os.getenv("LOG_WRITE_BATCH_SIZE", "500")),
+        log_write_flush_interval_ms=int(os.getenv("LOG_WRITE_FLUSH_INTERVAL_MS", "5")),
+        user_cache_size=int(os.getenv("USER_CACHE_SIZE", "10000")),
+        user_cache_ttl=float(os.getenv("USER_CACHE_TTL", "300")),
+        habit_cache_size=int(os.getenv("HABIT_CACHE_SIZE", "10000")),
+        habit_cache_ttl=float(os.getenv("HABIT_CACHE_TTL", "3600")),
+        stats_cache_size=int(os.getenv("STATS_CACHE_SIZE", "50000")),
+        stats_cache_ttl=float(os.getenv("STATS_CACHE_TTL", "86400")),
+        reminder_batch_size=int(os.getenv("REMINDER_BATCH_SIZE", "100")),
+        reminder_max_catch_up_minutes=int(os.getenv("REMINDER_MAX_CATCH_UP_MINUTES", "5")),
+        reminder_restore_chunk_size=int(os.getenv("REMINDER_RESTORE_CHUNK_SIZE", "1000")),
+        reminder_rate_limit=float(os.getenv("REMINDER_RATE_LIMIT", "25")),
+        reminder_burst=int(os.getenv("REMINDER_BURST", "25")),
+        reminder_workers=int(os.getenv("REMINDER_WORKERS", "8")),
+        reminder_queue_size=int(os.getenv("REMINDER_QUEUE_SIZE", "100000")),
+        reminder_max_attempts=int(os.getenv("REMINDER_MAX_ATTEMPTS", "3")),
+        reminder_retry_backoff=float(os.getenv("REMINDER_RETRY_BACKOFF", "1")),
+        scheduler_enabled=os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes"),
+        scheduler_shards=int(os.getenv("SCHEDULER_SHARDS", "0")),
+        scheduler_shard=int(os.environ["SCHEDULER_SHARD"]) if os.getenv("SCHEDULER_SHARD") else None,
+        scheduler_lease_ttl=float(os.getenv("SCHEDULER_LEASE_TTL", "30")),
+        scheduler_poll_interval=float(os.getenv("SCHEDULER_POLL_INTERVAL", "5")),
+        stats_executor=os.getenv("STATS_EXECUTOR", "thread"),
+        stats_workers=int(os.getenv("STATS_WORKERS", "2")),
+        stats_max_jobs=int(os.getenv("STATS_MAX_JOBS", "4")),
+        stats_inline_max_logs=int(os.getenv("STATS_INLINE_MAX_LOGS", "2000")),
     )
 
 
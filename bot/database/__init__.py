@@ -1,42 +1,142 @@
 # Database package
-from bot.database.models import User, Habit, HabitLog, ScheduleType, LogStatus
-from bot.database.session import get_session, init_db, async_session_factory
+from bot.database.models import (
+    User,
+    Habit,
+    HabitLog,
+    HabitStreakSummary,
+    SchedulerLease,
+    ReminderChange,
+    ReminderTime,
+    ScheduleType,
+    LogStatus,
+)
+from bot.database.session import (
+    get_session,
+    get_readonly_session,
+    init_db,
+    async_session_factory,
+)
 from bot.database.crud import (
     get_or_create_user,
     get_user,
     update_user,
+    get_user_snapshot,
+    get_or_create_user_snapshot,
     create_habit,
     get_habits,
-    get_active_habits,
+    get_habit_snapshots,
     get_habit,
     update_habit,
     delete_habit,
     get_or_create_log,
+    get_log_statuses_for_date,
+    get_log_statuses_for_range,
     get_logs_for_habit,
     get_logs_for_date_range,
+    get_done_counters_for_user_habits,
+    DoneCounters,
+    rebuild_streak_summary,
+    get_streak_summaries,
+    backfill_streak_summaries,
+    get_log_columns,
+    get_log_batch,
     get_all_users_with_reminders,
+    iter_reminder_entries,
+    ReminderEntry,
+    get_reminder_habits,
+    ReminderHabits,
+    get_shard_leases,
+    claim_shard_lease,
+    release_shard_lease,
+    request_shard_handoff,
+    get_last_reminder_change_id,
+    get_reminder_changes,
+    prune_reminder_changes,
+    add_reminder_time,
+    get_reminder_times,
+    delete_reminder_time,
+    get_reminder_timezones,
+    refresh_reminder_offsets,
+    get_due_reminder_times,
+    DueReminder,
+)
+from bot.database.cache import (
+    TTLCache,
+    UserSnapshot,
+    HabitSnapshot,
+    user_cache,
+    habit_list_cache,
+    HabitStatsCache,
+    habit_stats_cache,
 )
+from bot.database.columns import LogBatch, LogColumns
+from bot.database.write_queue import LogWriteQueue, log_write_queue
 
 __all__ = [
     "User",
     "Habit",
     "HabitLog",
+    "HabitStreakSummary",
+    "SchedulerLease",
+    "ReminderChange",
+    "ReminderTime",
     "ScheduleType",
     "LogStatus",
     "get_session",
+    "get_readonly_session",
     "init_db",
     "async_session_factory",
     "get_or_create_user",
     "get_user",
     "update_user",
+    "get_user_snapshot",
+    "get_or_create_user_snapshot",
     "create_habit",
     "get_habits",
-    "get_active_habits",
+    "get_habit_snapshots",
     "get_habit",
     "update_habit",
     "delete_habit",
     "get_or_create_log",
+    "get_log_statuses_for_date",
+    "get_log_statuses_for_range",
     "get_logs_for_habit",
     "get_logs_for_date_range",
+    "get_done_counters_for_user_habits",
+    "DoneCounters",
+    "rebuild_streak_summary",
+    "get_streak_summaries",
+    "backfill_streak_summaries",
+    "get_log_columns",
+    "get_log_batch",
     "get_all_users_with_reminders",
+    "iter_reminder_entries",
+    "ReminderEntry",
+    "get_reminder_habits",
+    "ReminderHabits",
+    "get_shard_leases",
+    "claim_shard_lease",
+    "release_shard_lease",
+    "request_shard_handoff",
+    "get_last_reminder_change_id",
+    "get_reminder_changes",
+    "prune_reminder_changes",
+    "add_reminder_time",
+    "get_reminder_times",
+    "delete_reminder_time",
+    "get_reminder_timezones",
+    "refresh_reminder_offsets",
+    "get_due_reminder_times",
+    "DueReminder",
+    "TTLCache",
+    "UserSnapshot",
+    "HabitSnapshot",
+    "user_cache",
+    "habit_list_cache",
+    "HabitStatsCache",
+    "habit_stats_cache",
+    "LogColumns",
+    "LogBatch",
+    "LogWriteQueue",
+    "log_write_queue",
 ]
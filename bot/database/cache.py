@@ -0,0 +1,316 @@
+"""
+In-process кэши поверх БД.
+
+Кэш заполняется при чтении и обновляется при записи (write-through). Новые
+значения публикуются в кэш только после commit транзакции, которая их записала:
+до этого запись просто инвалидирует ключ, а откат транзакции ничего не публикует.
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from datetime import time as time_of_day
+from typing import TYPE_CHECKING, Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from bot.config import config
+from bot.database.models import Habit, ScheduleType, User
+
+if TYPE_CHECKING:
+    from bot.services.streak import HabitStats
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# Ключ в session.info для действий, ожидающих commit
+_PENDING_KEY = "pending_cache_writes"
+
+
+class TTLCache(Generic[K, V]):
+    """Ограниченный по размеру кэш с TTL и вытеснением давно не использованных (LRU)."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[K, tuple[float, V]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: K) -> Optional[V]:
+        """Получить значение или None, если его нет или истёк TTL."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        """Положить значение, вытеснив самое старое при переполнении."""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: K) -> None:
+        """Удалить значение из кэша."""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Очистить кэш (счётчики сохраняются)."""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики для мониторинга."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class VersionTable(Generic[K]):
+    """
+    Версии ключей для версионной инвалидации с ограниченной памятью.
+
+    Каждое изменение присваивает ключу следующее значение общего счётчика.
+    Таблица помнит max_size последних изменённых ключей; при вытеснении ключа
+    нижняя граница поднимается до его версии, и версия всех ключей вне таблицы
+    равна этой границе. Поэтому версия ключа никогда не возвращается к прежнему
+    значению (запись, начатая до изменения, не будет принята), а рост границы
+    лишь сбрасывает давно не менявшиеся записи кэша.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._versions: "OrderedDict[K, int]" = OrderedDict()
+        self._clock = 0
+        self._floor = 0
+
+    def get(self, key: K) -> int:
+        """Текущая версия ключа."""
+        return self._versions.get(key, self._floor)
+
+    def bump(self, key: K) -> None:
+        """Отметить изменение ключа."""
+        self._clock += 1
+        self._versions[key] = self._clock
+        self._versions.move_to_end(key)
+        while len(self._versions) > self.max_size:
+            # Самая старая запись таблицы — с наименьшей версией
+            _, self._floor = self._versions.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+
+def on_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """Выполнить callback после commit текущей транзакции сессии (при откате — не выполнять)."""
+    session.sync_session.info.setdefault(_PENDING_KEY, []).append(callback)
+
+
+def write_through(session: AsyncSession, cache: TTLCache, key: Hashable, value: Any) -> None:
+    """Инвалидировать ключ сейчас и положить новое значение в кэш после commit сессии."""
+    cache.invalidate(key)
+    on_commit(session, lambda: cache.put(key, value))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_cache_writes(session: Session) -> None:
+    """Опубликовать изменения закоммиченной транзакции."""
+    for callback in session.info.pop(_PENDING_KEY, []):
+        callback()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_cache_writes(session: Session, previous_transaction) -> None:
+    """Отбросить изменения откаченной транзакции."""
+    session.info.pop(_PENDING_KEY, None)
+
+
+# === User ===
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Лёгкий неизменяемый снимок пользователя для хэндлеров."""
+    id: int
+    timezone: str
+    reminder_time: Optional[time_of_day]
+    reminders_enabled: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            timezone=user.timezone,
+            reminder_time=user.reminder_time,
+            reminders_enabled=user.reminders_enabled,
+        )
+
+
+user_cache: TTLCache[int, UserSnapshot] = TTLCache(
+    max_size=config.user_cache_size,
+    ttl=config.user_cache_ttl,
+)
+
+
+# === Habit ===
+
+@dataclass(frozen=True)
+class HabitSnapshot:
+    """Лёгкий неизменяемый снимок метаданных привычки (без логов)."""
+    id: int
+    name: str
+    schedule_type: ScheduleType
+    weekly_target: int
+    is_active: bool
+    order: int  # Позиция в списке привычек пользователя (по дате создания)
+
+    @classmethod
+    def from_habit(cls, habit: Habit, order: int) -> "HabitSnapshot":
+        return cls(
+            id=habit.id,
+            name=habit.name,
+            schedule_type=habit.schedule_type,
+            weekly_target=habit.weekly_target,
+            is_active=habit.is_active,
+            order=order,
+        )
+
+
+class HabitListCache:
+    """
+    Кэш списков привычек по пользователям с версионной инвалидацией.
+    
+    Каждое изменение привычек пользователя увеличивает его версию дважды:
+    сразу (запись в кэш, начатая до изменения, не будет принята) и после commit
+    (значение, прочитанное внутри ещё не закоммиченной транзакции, устаревает).
+    Версий хранится не больше, чем записей (см. VersionTable).
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self._entries: TTLCache[int, Tuple[int, Tuple[HabitSnapshot, ...]]] = TTLCache(max_size, ttl)
+        self._versions: VersionTable[int] = VersionTable(max_size)
+
+    def version(self, user_id: int) -> int:
+        """Текущая версия списка привычек пользователя."""
+        return self._versions.get(user_id)
+
+    def get(self, user_id: int) -> Optional[Tuple[HabitSnapshot, ...]]:
+        """Получить список, если он закэширован для текущей версии."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        version, habits = entry
+        if version != self.version(user_id):
+            self._entries.invalidate(user_id)
+            return None
+        return habits
+
+    def put(self, user_id: int, version: int, habits: Tuple[HabitSnapshot, ...]) -> None:
+        """Положить список, прочитанный при версии version (устаревший не сохраняется)."""
+        if version == self.version(user_id):
+            self._entries.put(user_id, (version, habits))
+
+    def bump(self, session: AsyncSession, user_id: int) -> None:
+        """Отметить изменение привычек пользователя в транзакции сессии."""
+        self._bump(user_id)
+        on_commit(session, lambda: self._bump(user_id))
+
+    def _bump(self, user_id: int) -> None:
+        self._versions.bump(user_id)
+        self._entries.invalidate(user_id)
+
+    def clear(self) -> None:
+        """Очистить кэш (версии сохраняются)."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики для мониторинга."""
+        return self._entries.stats()
+
+
+habit_list_cache = HabitListCache(
+    max_size=config.habit_cache_size,
+    ttl=config.habit_cache_ttl,
+)
+
+
+# === Habit stats ===
+
+class HabitStatsCache:
+    """
+    Кэш рассчитанной статистики привычек по (habit_id, дата «сегодня» пользователя).
+    
+    Запись действительна, пока не изменилась версия логов привычки: версия
+    увеличивается при каждой записи лога и изменении параметров привычки
+    (так же, как в HabitListCache — сразу и после commit). Версий хранится
+    не больше, чем записей (см. VersionTable).
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self._entries: TTLCache[Tuple[int, date], Tuple[int, "HabitStats"]] = TTLCache(max_size, ttl)
+        self._versions: VersionTable[int] = VersionTable(max_size)
+
+    def version(self, habit_id: int) -> int:
+        """Текущая версия логов привычки."""
+        return self._versions.get(habit_id)
+
+    def get(self, habit_id: int, today: date) -> Optional["HabitStats"]:
+        """Получить статистику, если она посчитана для текущей версии логов."""
+        key = (habit_id, today)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        version, stats = entry
+        if version != self.version(habit_id):
+            self._entries.invalidate(key)
+            return None
+        return stats
+
+    def put(self, habit_id: int, today: date, version: int, stats: "HabitStats") -> None:
+        """Положить статистику, посчитанную при версии version (устаревшая не сохраняется)."""
+        if version == self.version(habit_id):
+            self._entries.put((habit_id, today), (version, stats))
+
+    def bump(self, session: AsyncSession, habit_id: int) -> None:
+        """Отметить изменение логов или параметров привычки в транзакции сессии."""
+        self._bump(habit_id)
+        on_commit(session, lambda: self._bump(habit_id))
+
+    def _bump(self, habit_id: int) -> None:
+        self._versions.bump(habit_id)
+
+    def clear(self) -> None:
+        """Очистить кэш (версии сохраняются)."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики для мониторинга."""
+        return self._entries.stats()
+
+
+habit_stats_cache = HabitStatsCache(
+    max_size=config.stats_cache_size,
+    ttl=config.stats_cache_ttl,
+)
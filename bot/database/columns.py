@@ -0,0 +1,103 @@
+"""
+Колоночное представление истории привычки.
+
+История хранится двумя компактными массивами одинаковой длины: порядковые
+номера дат (date.toordinal) в array('i') и коды статусов в array('b')
+(1 — done, 2 — not_done, 3 — skipped). LogBatch склеивает
+истории многих привычек в одни массивы со смещениями сегментов.
+"""
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, NamedTuple
+
+from bot.database.models import LogStatus
+
+STATUS_CODES: Dict[LogStatus, int] = {
+    LogStatus.DONE: 1,
+    LogStatus.NOT_DONE: 2,
+    LogStatus.SKIPPED: 3,
+}
+STATUS_DONE = STATUS_CODES[LogStatus.DONE]
+STATUS_NOT_DONE = STATUS_CODES[LogStatus.NOT_DONE]
+STATUS_SKIPPED = STATUS_CODES[LogStatus.SKIPPED]
+
+
+class DoneCounters(NamedTuple):
+    """Счётчики выполнений привычки."""
+    done_7_days: int
+    done_30_days: int
+    total_done: int
+
+
+@dataclass
+class LogColumns:
+    """История привычки в колоночном виде: даты и статусы по возрастанию даты."""
+    dates: array = field(default_factory=lambda: array("i"))
+    statuses: array = field(default_factory=lambda: array("b"))
+
+    @classmethod
+    def from_logs(cls, logs: Iterable) -> "LogColumns":
+        """Построить колонки из объектов с полями date/status (HabitLog и т.п.)."""
+        columns = cls()
+        for log in logs:
+            columns.append(log.date.toordinal(), STATUS_CODES[log.status])
+        return columns
+
+    def append(self, date_ordinal: int, status_code: int) -> None:
+        """Добавить день в конец истории."""
+        self.dates.append(date_ordinal)
+        self.statuses.append(status_code)
+
+    def is_sorted(self) -> bool:
+        """Отсортированы ли даты по возрастанию."""
+        dates = self.dates
+        return all(dates[i - 1] <= dates[i] for i in range(1, len(dates)))
+
+    def sorted(self) -> "LogColumns":
+        """Копия, устойчиво отсортированная по дате (для неотсортированного входа)."""
+        order = sorted(range(len(self.dates)), key=self.dates.__getitem__)
+        return LogColumns(
+            array("i", (self.dates[i] for i in order)),
+            array("b", (self.statuses[i] for i in order)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+@dataclass
+class LogBatch:
+    """
+    Истории нескольких привычек в общих массивах.
+    
+    История привычки i — элементы dates/statuses с offsets[i] по offsets[i + 1];
+    offsets начинается с 0 и на один элемент длиннее числа привычек.
+    """
+    dates: array = field(default_factory=lambda: array("i"))
+    statuses: array = field(default_factory=lambda: array("b"))
+    offsets: array = field(default_factory=lambda: array("q", [0]))
+
+    @classmethod
+    def from_columns(cls, histories: Iterable[LogColumns]) -> "LogBatch":
+        """Склеить истории привычек в один пакет (порядок сегментов сохраняется)."""
+        batch = cls()
+        for columns in histories:
+            batch.append(columns)
+        return batch
+
+    def append(self, columns: LogColumns) -> None:
+        """Добавить историю очередной привычки."""
+        self.dates.extend(columns.dates)
+        self.statuses.extend(columns.statuses)
+        self.offsets.append(len(self.dates))
+
+    def segment(self, index: int) -> LogColumns:
+        """История привычки с номером index."""
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return LogColumns(self.dates[start:end], self.statuses[start:end])
+
+    def __iter__(self) -> Iterator[LogColumns]:
+        return (self.segment(index) for index in range(len(self)))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
@@ -1,14 +1,39 @@
 """
 CRUD операции для работы с базой данных.
 """
-from datetime import date, time
-from typing import List, Optional, Sequence
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
 
-from sqlalchemy import select, and_
+import pytz
+from sqlalchemy import Row, select, update, delete, and_, or_, case, func
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 
-from bot.database.models import Habit, HabitLog, User, ScheduleType, LogStatus
+from bot.config import config
+from bot.database.models import (
+    Habit,
+    HabitLog,
+    HabitStreakSummary,
+    ReminderChange,
+    ReminderTime,
+    SchedulerLease,
+    User,
+    ScheduleType,
+    LogStatus,
+)
+from bot.database.cache import (
+    HabitSnapshot,
+    UserSnapshot,
+    habit_list_cache,
+    habit_stats_cache,
+    user_cache,
+    write_through,
+)
+from bot.database.columns import STATUS_CODES, DoneCounters, LogBatch, LogColumns
+from bot.database.summary import apply_log, is_summary_stale, rebuild_summary, reset_summary
+from bot.database.timezones import MINUTES_PER_DAY, resolve_timezone, to_utc_minute, utc_offset_minutes
 
 
 # === User CRUD ===
@@ -26,6 +51,7 @@ async def get_or_create_user(
         user = User(id=user_id, timezone=timezone)
         session.add(user)
         await session.flush()
+        write_through(session, user_cache, user.id, UserSnapshot.from_user(user))
     
     return user
 
@@ -36,6 +62,15 @@ async def get_user(session: AsyncSession, user_id: int) -> Optional[User]:
     return result.scalar_one_or_none()
 
 
+def _journal_reminder_change(session: AsyncSession, user_id: int) -> None:
+    """
+    Записать изменение напоминаний пользователя в журнал для воркеров планировщика
+    в других процессах. Без шардирования журнал никто не читает и не чистит.
+    """
+    if config.scheduler_shards:
+        session.add(ReminderChange(user_id=user_id))
+
+
 async def update_user(
     session: AsyncSession,
     user_id: int,
@@ -54,11 +89,45 @@ async def update_user(
         user.reminder_time = reminder_time
     if reminders_enabled is not None:
         user.reminders_enabled = reminders_enabled
+    if (timezone, reminder_time, reminders_enabled) != (None, None, None):
+        _journal_reminder_change(session, user_id)
+    if timezone is not None:
+        await _move_reminder_times(session, user_id, timezone)
     
     await session.flush()
+    write_through(session, user_cache, user.id, UserSnapshot.from_user(user))
     return user
 
 
+async def get_user_snapshot(session: AsyncSession, user_id: int) -> Optional[UserSnapshot]:
+    """Получить снимок пользователя из кэша, при промахе — из БД."""
+    snapshot = user_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+    
+    user = await get_user(session, user_id)
+    if user is None:
+        return None
+    
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.put(user_id, snapshot)
+    return snapshot
+
+
+async def get_or_create_user_snapshot(
+    session: AsyncSession,
+    user_id: int,
+    timezone: str = "Europe/Moscow",
+) -> UserSnapshot:
+    """Получить снимок пользователя из кэша или БД, создав пользователя при отсутствии."""
+    snapshot = await get_user_snapshot(session, user_id)
+    if snapshot is not None:
+        return snapshot
+    
+    user = await get_or_create_user(session, user_id, timezone)
+    return UserSnapshot.from_user(user)
+
+
 async def get_all_users_with_reminders(session: AsyncSession) -> Sequence[User]:
     """Получить всех пользователей с включёнными напоминаниями."""
     result = await session.execute(
@@ -72,6 +141,426 @@ async def get_all_users_with_reminders(session: AsyncSession) -> Sequence[User]:
     return result.scalars().all()
 
 
+class ReminderEntry(NamedTuple):
+    """Настройки напоминания пользователя (без загрузки ORM-объекта User)."""
+    user_id: int
+    reminder_time: time
+    timezone: str
+
+
+def _in_shards(column, shard_count: int, shards: Iterable[int]):
+    """Условие «column % shard_count входит в shards»."""
+    return (column % shard_count).in_(sorted(shards))
+
+
+async def iter_reminder_entries(
+    session: AsyncSession,
+    chunk_size: int = 1000,
+    shard_count: int = 0,
+    shards: Optional[Iterable[int]] = None,
+) -> AsyncIterator[List[ReminderEntry]]:
+    """
+    Потоково перебрать напоминания всех пользователей пачками по chunk_size.
+    
+    Строки читаются курсором (yield_per), в памяти одновременно только одна пачка.
+    
+    Args:
+        shard_count: Число шардов планировщика (0 — без шардирования)
+        shards: Только пользователи с user_id % shard_count из этого набора
+    """
+    query = select(User.id, User.reminder_time, User.timezone).where(
+        and_(
+            User.reminders_enabled == True,
+            User.reminder_time.isnot(None),
+        )
+    )
+    if shard_count and shards is not None:
+        query = query.where(_in_shards(User.id, shard_count, shards))
+    
+    result = await session.stream(
+        query.order_by(User.id).execution_options(yield_per=chunk_size)
+    )
+    async for rows in result.partitions():
+        yield [ReminderEntry(*row) for row in rows]
+
+
+class ReminderHabits(NamedTuple):
+    """Активные привычки пользователя и их отметки за несколько дат (для напоминаний)."""
+    timezone: str
+    habits: List[HabitSnapshot]
+    marked: Dict[date, Set[int]]  # {дата: id привычек с любой отметкой за эту дату}
+
+
+async def get_reminder_habits(
+    session: AsyncSession,
+    user_ids: Sequence[int],
+    dates: Sequence[date],
+) -> Dict[int, ReminderHabits]:
+    """
+    Получить активные привычки и отметки пачки пользователей одним запросом.
+    
+    Логи присоединяются только за dates (кандидаты на локальное «сегодня»
+    пользователей пачки), поэтому запрос идёт по индексу (habit_id, date)
+    и не зависит от длины истории.
+    
+    Returns:
+        Словарь {user_id: ReminderHabits}. Пользователи без привычек в словарь не попадают.
+    """
+    if not user_ids:
+        return {}
+    
+    result = await session.execute(
+        select(
+            Habit.id,
+            Habit.user_id,
+            Habit.name,
+            Habit.schedule_type,
+            Habit.weekly_target,
+            Habit.is_active,
+            User.timezone,
+            HabitLog.date,
+        )
+        .join(User, User.id == Habit.user_id)
+        .outerjoin(
+            HabitLog,
+            and_(HabitLog.habit_id == Habit.id, HabitLog.date.in_(dates)),
+        )
+        .where(Habit.user_id.in_(user_ids))
+        .order_by(Habit.user_id, Habit.created_at, Habit.id)
+    )
+    
+    reminders: Dict[int, ReminderHabits] = {}
+    orders: Dict[int, int] = defaultdict(int)
+    last_habit_id = None
+    for habit_id, user_id, name, schedule_type, weekly_target, is_active, timezone, log_date in result.all():
+        reminder = reminders.get(user_id)
+        if reminder is None:
+            reminder = reminders[user_id] = ReminderHabits(timezone, [], defaultdict(set))
+        
+        # Привычка повторяется в строках по числу отметок за dates
+        if habit_id != last_habit_id:
+            last_habit_id = habit_id
+            order = orders[user_id]
+            orders[user_id] += 1
+            if is_active:
+                reminder.habits.append(HabitSnapshot(
+                    id=habit_id,
+                    name=name,
+                    schedule_type=schedule_type,
+                    weekly_target=weekly_target,
+                    is_active=is_active,
+                    order=order,
+                ))
+        
+        if log_date is not None:
+            reminder.marked[log_date].add(habit_id)
+    
+    return reminders
+
+
+# === Scheduler shards ===
+
+async def get_shard_leases(session: AsyncSession) -> Sequence[SchedulerLease]:
+    """Получить аренды всех шардов планировщика."""
+    result = await session.execute(select(SchedulerLease).order_by(SchedulerLease.shard))
+    return result.scalars().all()
+
+
+async def claim_shard_lease(
+    session: AsyncSession,
+    shard: int,
+    owner: str,
+    now: datetime,
+    ttl: timedelta,
+) -> bool:
+    """
+    Взять или продлить аренду шарда до now + ttl.
+    
+    Удаётся, если шард свободен, уже принадлежит owner или аренда истекла.
+    На SQLite/PostgreSQL выполняется одним условным upsert, поэтому из двух
+    воркеров, одновременно забирающих шард, выигрывает ровно один.
+    
+    Returns:
+        True — шард принадлежит owner до now + ttl
+    """
+    values = {"owner": owner, "expires_at": now + ttl}
+    claimable = or_(SchedulerLease.owner == owner, SchedulerLease.expires_at <= now)
+    # Просьба вернуть шард выполнена, когда его забирает сам просивший
+    handoff_to = case(
+        (SchedulerLease.handoff_to == owner, None),
+        else_=SchedulerLease.handoff_to,
+    )
+    
+    insert = _UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if insert is None:
+        result = await session.execute(
+            update(SchedulerLease)
+            .where(and_(SchedulerLease.shard == shard, claimable))
+            .values(handoff_to=handoff_to, **values)
+        )
+        if result.rowcount:
+            return True
+        if await session.get(SchedulerLease, shard) is not None:
+            return False
+        session.add(SchedulerLease(shard=shard, **values))
+        await session.flush()
+        return True
+    
+    stmt = insert(SchedulerLease).values(shard=shard, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SchedulerLease.shard],
+        set_={"handoff_to": handoff_to, **values},
+        where=claimable,
+    ).returning(SchedulerLease.shard)
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none() is not None
+
+
+async def release_shard_lease(session: AsyncSession, shard: int, owner: str) -> None:
+    """Отдать шард: аренда owner удаляется, шард может забрать любой воркер."""
+    await session.execute(
+        delete(SchedulerLease).where(
+            and_(SchedulerLease.shard == shard, SchedulerLease.owner == owner)
+        )
+    )
+
+
+async def request_shard_handoff(session: AsyncSession, shard: int, owner: str) -> None:
+    """Попросить текущего владельца шарда отдать его owner (домашнему воркеру шарда)."""
+    await session.execute(
+        update(SchedulerLease)
+        .where(and_(SchedulerLease.shard == shard, SchedulerLease.owner != owner))
+        .values(handoff_to=owner)
+    )
+
+
+async def get_last_reminder_change_id(session: AsyncSession) -> int:
+    """Id последней записи журнала изменений напоминаний (0 — журнал пуст)."""
+    result = await session.execute(select(func.max(ReminderChange.id)))
+    return result.scalar() or 0
+
+
+async def get_reminder_changes(
+    session: AsyncSession,
+    after_id: int,
+    shard_count: int = 0,
+    shards: Optional[Iterable[int]] = None,
+) -> Tuple[int, Dict[int, Optional[ReminderEntry]]]:
+    """
+    Дочитать журнал изменений напоминаний после after_id.
+    
+    Returns:
+        (id, до которого прочитан журнал; {user_id: текущее напоминание или None, если его нет})
+    """
+    last_id = await get_last_reminder_change_id(session)
+    if last_id <= after_id:
+        return after_id, {}
+    
+    query = (
+        select(User.id, User.reminder_time, User.timezone, User.reminders_enabled)
+        .where(
+            User.id.in_(
+                select(ReminderChange.user_id).where(
+                    and_(ReminderChange.id > after_id, ReminderChange.id <= last_id)
+                )
+            )
+        )
+    )
+    if shard_count and shards is not None:
+        query = query.where(_in_shards(User.id, shard_count, shards))
+    
+    result = await session.execute(query)
+    changes: Dict[int, Optional[ReminderEntry]] = {}
+    for user_id, reminder_time, timezone, enabled in result.all():
+        if enabled and reminder_time is not None:
+            changes[user_id] = ReminderEntry(user_id, reminder_time, timezone)
+        else:
+            changes[user_id] = None
+    return last_id, changes
+
+
+async def prune_reminder_changes(session: AsyncSession, before: datetime) -> int:
+    """
+    Удалить записи журнала изменений старше before. Возвращает число удалённых.
+    
+    Последняя запись сохраняется всегда: в таблице, созданной без AUTOINCREMENT,
+    опустевший журнал начал бы id заново, и воркеры с курсором больше новых id
+    пропустили бы эти изменения.
+    """
+    newest = select(func.max(ReminderChange.id)).scalar_subquery()
+    result = await session.execute(
+        delete(ReminderChange).where(
+            and_(ReminderChange.created_at < before, ReminderChange.id < newest)
+        )
+    )
+    return result.rowcount
+
+
+# === Reminder times ===
+
+class DueReminder(NamedTuple):
+    """Сработавшее дополнительное напоминание."""
+    utc_minute: int
+    user_id: int
+    habit_id: Optional[int]  # None — обо всех привычках
+
+
+def _utc_minute_expr(offset: int):
+    """SQL-выражение utc_minute при смещении offset (остаток всегда неотрицательный)."""
+    return (ReminderTime.local_minute - offset + MINUTES_PER_DAY) % MINUTES_PER_DAY
+
+
+async def _move_reminder_times(session: AsyncSession, user_id: int, timezone: str) -> None:
+    """Перевести дополнительные напоминания пользователя в новую таймзону."""
+    offset = utc_offset_minutes(resolve_timezone(timezone), datetime.now(pytz.utc))
+    await session.execute(
+        update(ReminderTime)
+        .where(ReminderTime.user_id == user_id)
+        .values(timezone=timezone, utc_offset=offset, utc_minute=_utc_minute_expr(offset))
+    )
+
+
+async def add_reminder_time(
+    session: AsyncSession,
+    user_id: int,
+    reminder_time: time,
+    habit_id: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> Optional[ReminderTime]:
+    """
+    Добавить дополнительное напоминание пользователю (обо всех привычках или об одной).
+    
+    Повторное добавление того же времени возвращает существующее напоминание.
+    
+    Returns:
+        Напоминание или None, если нет пользователя или привычка ему не принадлежит
+    """
+    user = await get_user(session, user_id)
+    if user is None:
+        return None
+    if habit_id is not None:
+        habit = await get_habit(session, habit_id)
+        if habit is None or habit.user_id != user_id:
+            return None
+    
+    local_minute = reminder_time.hour * 60 + reminder_time.minute
+    result = await session.execute(
+        select(ReminderTime).where(
+            and_(
+                ReminderTime.user_id == user_id,
+                ReminderTime.habit_id.is_(None) if habit_id is None else ReminderTime.habit_id == habit_id,
+                ReminderTime.local_minute == local_minute,
+            )
+        )
+    )
+    reminder = result.scalars().first()
+    if reminder is not None:
+        return reminder
+    
+    offset = utc_offset_minutes(resolve_timezone(user.timezone), now or datetime.now(pytz.utc))
+    reminder = ReminderTime(
+        user_id=user_id,
+        habit_id=habit_id,
+        local_minute=local_minute,
+        timezone=user.timezone,
+        utc_offset=offset,
+        utc_minute=to_utc_minute(local_minute, offset),
+    )
+    session.add(reminder)
+    _journal_reminder_change(session, user_id)
+    await session.flush()
+    return reminder
+
+
+async def get_reminder_times(session: AsyncSession, user_id: int) -> Sequence[ReminderTime]:
+    """Получить дополнительные напоминания пользователя по времени."""
+    result = await session.execute(
+        select(ReminderTime)
+        .where(ReminderTime.user_id == user_id)
+        .order_by(ReminderTime.local_minute, ReminderTime.id)
+    )
+    return result.scalars().all()
+
+
+async def delete_reminder_time(session: AsyncSession, reminder_id: int, user_id: int) -> bool:
+    """Удалить дополнительное напоминание пользователя."""
+    result = await session.execute(
+        delete(ReminderTime).where(
+            and_(ReminderTime.id == reminder_id, ReminderTime.user_id == user_id)
+        )
+    )
+    if not result.rowcount:
+        return False
+    _journal_reminder_change(session, user_id)
+    return True
+
+
+async def get_reminder_timezones(session: AsyncSession) -> List[str]:
+    """Таймзоны, в которых есть дополнительные напоминания."""
+    result = await session.execute(select(ReminderTime.timezone).distinct())
+    return list(result.scalars().all())
+
+
+async def refresh_reminder_offsets(session: AsyncSession, offsets: Dict[str, int]) -> int:
+    """
+    Пересчитать utc_minute напоминаний таймзон, у которых сменилось смещение от UTC.
+    
+    Args:
+        offsets: {таймзона: текущее смещение в минутах}
+    
+    Returns:
+        Число обновлённых напоминаний
+    """
+    updated = 0
+    for timezone, offset in offsets.items():
+        result = await session.execute(
+            update(ReminderTime)
+            .where(and_(ReminderTime.timezone == timezone, ReminderTime.utc_offset != offset))
+            .values(utc_offset=offset, utc_minute=_utc_minute_expr(offset))
+        )
+        updated += result.rowcount
+    return updated
+
+
+async def get_due_reminder_times(
+    session: AsyncSession,
+    first_minute: int,
+    last_minute: int,
+    shard_count: int = 0,
+    shards: Optional[Iterable[int]] = None,
+) -> List[DueReminder]:
+    """
+    Дополнительные напоминания с UTC минутой суток от first_minute до last_minute
+    включительно (через полночь, если first_minute > last_minute) — один запрос
+    по индексу utc_minute.
+    
+    Пропускаются пользователи с выключенными напоминаниями и архивные привычки.
+    """
+    if first_minute <= last_minute:
+        in_range = ReminderTime.utc_minute.between(first_minute, last_minute)
+    else:
+        in_range = or_(ReminderTime.utc_minute >= first_minute, ReminderTime.utc_minute <= last_minute)
+    
+    query = (
+        select(ReminderTime.utc_minute, ReminderTime.user_id, ReminderTime.habit_id)
+        .join(User, User.id == ReminderTime.user_id)
+        .outerjoin(Habit, Habit.id == ReminderTime.habit_id)
+        .where(
+            and_(
+                in_range,
+                User.reminders_enabled == True,
+                or_(ReminderTime.habit_id.is_(None), Habit.is_active == True),
+            )
+        )
+        .order_by(ReminderTime.utc_minute, ReminderTime.user_id)
+    )
+    if shard_count and shards is not None:
+        query = query.where(_in_shards(ReminderTime.user_id, shard_count, shards))
+    
+    result = await session.execute(query)
+    return [DueReminder(*row) for row in result.all()]
+
+
 # === Habit CRUD ===
 
 async def create_habit(
@@ -88,31 +577,54 @@ async def create_habit(
         schedule_type=schedule_type,
         weekly_target=weekly_target,
     )
+    summary = HabitStreakSummary()
+    reset_summary(summary, schedule_type, weekly_target)
+    habit.streak_summary = summary
     session.add(habit)
     await session.flush()
+    habit_list_cache.bump(session, user_id)
     return habit
 
 
-async def get_habits(session: AsyncSession, user_id: int) -> Sequence[Habit]:
-    """Получить все привычки пользователя с предзагрузкой логов."""
-    result = await session.execute(
-        select(Habit)
-        .where(Habit.user_id == user_id)
-        .options(selectinload(Habit.logs))
-        .order_by(Habit.created_at)
-    )
+async def get_habits(
+    session: AsyncSession,
+    user_id: int,
+    with_logs: bool = True,
+) -> Sequence[Habit]:
+    """
+    Получить все привычки пользователя.
+    
+    Args:
+        with_logs: Предзагрузить все логи (False — только сами привычки)
+    """
+    query = select(Habit).where(Habit.user_id == user_id).order_by(Habit.created_at)
+    if with_logs:
+        query = query.options(selectinload(Habit.logs))
+    
+    result = await session.execute(query)
     return result.scalars().all()
 
 
-async def get_active_habits(session: AsyncSession, user_id: int) -> Sequence[Habit]:
-    """Получить активные привычки пользователя с предзагрузкой логов."""
-    result = await session.execute(
-        select(Habit)
-        .where(and_(Habit.user_id == user_id, Habit.is_active == True))
-        .options(selectinload(Habit.logs))
-        .order_by(Habit.created_at)
-    )
-    return result.scalars().all()
+async def get_habit_snapshots(
+    session: AsyncSession,
+    user_id: int,
+    active_only: bool = False,
+) -> Sequence[HabitSnapshot]:
+    """
+    Получить снимки привычек пользователя (по дате создания) из кэша или БД.
+    
+    Кэш инвалидируется версией, которую увеличивают create_habit, update_habit и delete_habit.
+    """
+    habits = habit_list_cache.get(user_id)
+    if habits is None:
+        version = habit_list_cache.version(user_id)
+        rows = await get_habits(session, user_id, with_logs=False)
+        habits = tuple(HabitSnapshot.from_habit(habit, order) for order, habit in enumerate(rows))
+        habit_list_cache.put(user_id, version, habits)
+    
+    if active_only:
+        return [habit for habit in habits if habit.is_active]
+    return habits
 
 
 async def get_habit(session: AsyncSession, habit_id: int) -> Optional[Habit]:
@@ -144,6 +656,13 @@ async def update_habit(
         habit.weekly_target = weekly_target
     
     await session.flush()
+    if schedule_type is not None or weekly_target is not None:
+        # Сводка streak посчитана для старого расписания
+        summary = await session.get(HabitStreakSummary, habit.id)
+        if is_summary_stale(summary, habit.schedule_type, habit.weekly_target):
+            await rebuild_streak_summary(session, habit)
+    habit_list_cache.bump(session, habit.user_id)
+    habit_stats_cache.bump(session, habit.id)
     return habit
 
 
@@ -155,18 +674,56 @@ async def delete_habit(session: AsyncSession, habit_id: int) -> bool:
     
     await session.delete(habit)
     await session.flush()
+    habit_list_cache.bump(session, habit.user_id)
     return True
 
 
 # === HabitLog CRUD ===
 
+# Диалекты с поддержкой INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+_UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
 async def get_or_create_log(
     session: AsyncSession,
     habit_id: int,
     log_date: date,
     status: LogStatus,
 ) -> HabitLog:
-    """Получить или создать лог привычки за дату. Idempotent: обновляет статус если лог существует."""
+    """
+    Получить или создать лог привычки за дату. Idempotent: обновляет статус если лог существует.
+    
+    На SQLite/PostgreSQL выполняется одним upsert по уникальному индексу (habit_id, date),
+    поэтому повторные нажатия не создают дублей и не требуют предварительного SELECT.
+    """
+    insert = _UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if insert is None:
+        return await _select_and_update_log(session, habit_id, log_date, status)
+    
+    stmt = insert(HabitLog).values(habit_id=habit_id, date=log_date, status=status)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[HabitLog.habit_id, HabitLog.date],
+        set_={"status": stmt.excluded.status},
+    ).returning(HabitLog)
+    
+    result = await session.scalars(stmt, execution_options={"populate_existing": True})
+    log = result.one()
+    
+    await _update_streak_summary(session, habit_id, log_date, status)
+    habit_stats_cache.bump(session, habit_id)
+    return log
+
+
+async def _select_and_update_log(
+    session: AsyncSession,
+    habit_id: int,
+    log_date: date,
+    status: LogStatus,
+) -> HabitLog:
+    """Запасной путь для диалектов без ON CONFLICT: SELECT, затем INSERT или UPDATE."""
     result = await session.execute(
         select(HabitLog).where(
             and_(HabitLog.habit_id == habit_id, HabitLog.date == log_date)
@@ -181,9 +738,92 @@ async def get_or_create_log(
         log.status = status
     
     await session.flush()
+    await _update_streak_summary(session, habit_id, log_date, status)
+    habit_stats_cache.bump(session, habit_id)
     return log
 
 
+async def _update_streak_summary(
+    session: AsyncSession,
+    habit_id: int,
+    log_date: date,
+    status: LogStatus,
+) -> None:
+    """
+    Обновить сводку streak после записи лога в той же транзакции.
+    
+    Запись за последний или новый день обновляет сводку инкрементально;
+    изменение прошлого дня, смена параметров привычки или отсутствие сводки —
+    полный пересчёт по истории.
+    """
+    result = await session.execute(
+        select(Habit)
+        .options(joinedload(Habit.streak_summary))
+        .where(Habit.id == habit_id)
+    )
+    habit = result.scalar_one_or_none()
+    if habit is None:
+        return
+    
+    summary = habit.streak_summary
+    if is_summary_stale(summary, habit.schedule_type, habit.weekly_target) or not apply_log(
+        summary, log_date, status
+    ):
+        await rebuild_streak_summary(session, habit)
+        return
+    
+    await session.flush()
+
+
+async def get_log_statuses_for_date(
+    session: AsyncSession,
+    habit_ids: Sequence[int],
+    log_date: date,
+) -> Dict[int, LogStatus]:
+    """Получить статусы привычек за дату одним запросом по индексу: {habit_id: статус}."""
+    if not habit_ids:
+        return {}
+    
+    result = await session.execute(
+        select(HabitLog.habit_id, HabitLog.status).where(
+            and_(HabitLog.habit_id.in_(habit_ids), HabitLog.date == log_date)
+        )
+    )
+    return dict(result.all())
+
+
+async def get_log_statuses_for_range(
+    session: AsyncSession,
+    habit_ids: Sequence[int],
+    start_date: date,
+    end_date: date,
+) -> Dict[int, Dict[date, LogStatus]]:
+    """
+    Получить статусы привычек за период с start_date по end_date включительно
+    одним запросом по индексу (habit_id, date).
+    
+    Returns:
+        Словарь {habit_id: {дата: статус}}. Привычки без логов за период в словарь не попадают.
+    """
+    if not habit_ids:
+        return {}
+    
+    result = await session.execute(
+        select(HabitLog.habit_id, HabitLog.date, HabitLog.status).where(
+            and_(
+                HabitLog.habit_id.in_(habit_ids),
+                HabitLog.date >= start_date,
+                HabitLog.date <= end_date,
+            )
+        )
+    )
+    
+    statuses: Dict[int, Dict[date, LogStatus]] = defaultdict(dict)
+    for habit_id, log_date, status in result:
+        statuses[habit_id][log_date] = status
+    return dict(statuses)
+
+
 async def get_logs_for_habit(
     session: AsyncSession,
     habit_id: int,
@@ -220,3 +860,191 @@ async def get_logs_for_date_range(
         ).order_by(HabitLog.date)
     )
     return result.scalars().all()
+
+
+async def get_done_counters_for_user_habits(
+    session: AsyncSession,
+    user_id: int,
+    today: date,
+) -> Dict[int, DoneCounters]:
+    """
+    Посчитать done за 7/30 дней и всего для всех привычек пользователя одним агрегатом.
+    
+    Окна совпадают с get_habit_stats: лог попадает в окно N дней, если (today - date) <= N.
+    
+    Returns:
+        Словарь {habit_id: DoneCounters}. Привычки без done логов в словарь не попадают.
+    """
+    def done_since(days: int):
+        return func.sum(case((HabitLog.date >= today - timedelta(days=days), 1), else_=0))
+    
+    result = await session.execute(
+        select(
+            HabitLog.habit_id,
+            done_since(7),
+            done_since(30),
+            func.count(),
+        )
+        .join(Habit, Habit.id == HabitLog.habit_id)
+        .where(and_(Habit.user_id == user_id, HabitLog.status == LogStatus.DONE))
+        .group_by(HabitLog.habit_id)
+    )
+    return {
+        habit_id: DoneCounters(done_7, done_30, total)
+        for habit_id, done_7, done_30, total in result.all()
+    }
+
+
+async def get_log_columns(session: AsyncSession, habit_id: int) -> LogColumns:
+    """
+    Получить историю привычки в колоночном виде (даты и коды статусов по возрастанию даты).
+    
+    Читаются только столбцы date/status, без создания ORM-объектов HabitLog.
+    """
+    table = HabitLog.__table__
+    result = await session.execute(
+        select(table.c.date, table.c.status)
+        .where(table.c.habit_id == habit_id)
+        .order_by(table.c.date)
+    )
+    
+    columns = LogColumns()
+    for log_date, status in result:
+        columns.append(log_date.toordinal(), STATUS_CODES[status])
+    return columns
+
+
+async def get_log_batch(session: AsyncSession, habit_ids: Sequence[int]) -> LogBatch:
+    """
+    Получить истории нескольких привычек одним запросом в колоночном виде.
+    
+    Сегменты пакета идут в порядке habit_ids; у привычки без логов сегмент пустой.
+    """
+    histories: Dict[int, LogColumns] = {habit_id: LogColumns() for habit_id in habit_ids}
+    if histories:
+        table = HabitLog.__table__
+        result = await session.execute(
+            select(table.c.habit_id, table.c.date, table.c.status)
+            .where(table.c.habit_id.in_(histories))
+            .order_by(table.c.habit_id, table.c.date)
+        )
+        for habit_id, log_date, status in result:
+            histories[habit_id].append(log_date.toordinal(), STATUS_CODES[status])
+    
+    return LogBatch.from_columns(histories[habit_id] for habit_id in habit_ids)
+
+# === HabitStreakSummary ===
+
+async def rebuild_streak_summary(session: AsyncSession, habit: Habit) -> HabitStreakSummary:
+    """Пересчитать сводку streak привычки по всей истории логов."""
+    logs = await get_logs_for_habit(session, habit.id)
+    
+    summary = await session.get(HabitStreakSummary, habit.id)
+    if summary is None:
+        summary = HabitStreakSummary(habit_id=habit.id)
+        session.add(summary)
+    
+    rebuild_summary(summary, logs, habit.schedule_type, habit.weekly_target)
+    await session.flush()
+    return summary
+
+
+async def _get_summary_logs(
+    session: AsyncSession,
+    habit_ids: Sequence[int],
+) -> Dict[int, List[Row]]:
+    """Логи (date, status) привычек одним запросом: {habit_id: логи по дате} для пересчёта сводок."""
+    logs: Dict[int, List[Row]] = defaultdict(list)
+    if not habit_ids:
+        return logs
+    
+    result = await session.execute(
+        select(HabitLog.habit_id, HabitLog.date, HabitLog.status)
+        .where(HabitLog.habit_id.in_(habit_ids))
+        .order_by(HabitLog.habit_id, HabitLog.date)
+    )
+    for row in result.all():
+        logs[row.habit_id].append(row)
+    return logs
+
+
+async def get_streak_summaries(
+    session: AsyncSession,
+    habits: Sequence[Union[Habit, HabitSnapshot]],
+    rebuild_stale: bool = True,
+) -> Dict[int, HabitStreakSummary]:
+    """
+    Получить сводки streak привычек одним запросом: {habit_id: сводка}.
+    
+    Сводки сохраняются при записи логов, при смене расписания (update_habit)
+    и при старте (backfill_streak_summaries), поэтому пересчёт здесь — редкость.
+    Если сводка всё же отсутствует или устарела, она пересчитывается в памяти
+    по логам, загруженным одним запросом на все такие привычки.
+    
+    Args:
+        rebuild_stale: False — не пересчитывать, а пропустить такие привычки
+            (вызывающий посчитает их по истории сам, например в пуле статистики)
+    """
+    if not habits:
+        return {}
+    
+    result = await session.execute(
+        select(HabitStreakSummary).where(
+            HabitStreakSummary.habit_id.in_([habit.id for habit in habits])
+        )
+    )
+    summaries = {summary.habit_id: summary for summary in result.scalars()}
+    
+    stale = [
+        habit for habit in habits
+        if is_summary_stale(summaries.get(habit.id), habit.schedule_type, habit.weekly_target)
+    ]
+    if not rebuild_stale:
+        for habit in stale:
+            summaries.pop(habit.id, None)
+        return summaries
+    
+    logs = await _get_summary_logs(session, [habit.id for habit in stale])
+    for habit in stale:
+        transient = HabitStreakSummary(habit_id=habit.id)
+        rebuild_summary(transient, logs[habit.id], habit.schedule_type, habit.weekly_target)
+        summaries[habit.id] = transient
+    
+    return summaries
+
+
+async def backfill_streak_summaries(session: AsyncSession, chunk_size: int = 500) -> int:
+    """
+    Сохранить сводки привычек, у которых их нет или они посчитаны для другого
+    расписания (привычки, созданные до появления сводок, архивные и т.п.).
+    
+    Логи загружаются одним запросом на пачку из chunk_size привычек.
+    
+    Returns:
+        Число пересчитанных сводок
+    """
+    result = await session.execute(
+        select(Habit, HabitStreakSummary)
+        .outerjoin(HabitStreakSummary, HabitStreakSummary.habit_id == Habit.id)
+        .where(
+            or_(
+                HabitStreakSummary.habit_id.is_(None),
+                HabitStreakSummary.schedule_type != Habit.schedule_type,
+                HabitStreakSummary.weekly_target != Habit.weekly_target,
+            )
+        )
+        .order_by(Habit.id)
+    )
+    stale = result.all()
+    
+    for start in range(0, len(stale), chunk_size):
+        chunk = stale[start:start + chunk_size]
+        logs = await _get_summary_logs(session, [habit.id for habit, _ in chunk])
+        for habit, summary in chunk:
+            if summary is None:
+                summary = HabitStreakSummary(habit_id=habit.id)
+                session.add(summary)
+            rebuild_summary(summary, logs[habit.id], habit.schedule_type, habit.weekly_target)
+        await session.flush()
+    
+    return len(stale)
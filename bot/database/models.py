@@ -2,7 +2,7 @@
 SQLAlchemy модели для базы данных.
 """
 import enum
-from datetime import datetime, time
+from datetime import date as date_type, datetime, time
 from typing import Optional, List
 
 from sqlalchemy import (
@@ -12,6 +12,7 @@ from sqlalchemy import (
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     String,
     Time,
@@ -76,6 +77,9 @@ class Habit(Base):
     logs: Mapped[List["HabitLog"]] = relationship(
         "HabitLog", back_populates="habit", cascade="all, delete-orphan"
     )
+    streak_summary: Mapped[Optional["HabitStreakSummary"]] = relationship(
+        "HabitStreakSummary", back_populates="habit", cascade="all, delete-orphan"
+    )
     
     def __repr__(self) -> str:
         return f"<Habit(id={self.id}, name={self.name}, type={self.schedule_type})>"
@@ -84,6 +88,10 @@ class Habit(Base):
 class HabitLog(Base):
     """Лог выполнения привычки за день."""
     __tablename__ = "habit_logs"
+    __table_args__ = (
+        # Одна запись на привычку за день; индекс же обслуживает выборки по периоду
+        Index("ix_habit_logs_habit_id_date", "habit_id", "date", unique=True),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     habit_id: Mapped[int] = mapped_column(Integer, ForeignKey("habits.id", ondelete="CASCADE"))
@@ -96,3 +104,128 @@ class HabitLog(Base):
     
     def __repr__(self) -> str:
         return f"<HabitLog(habit_id={self.habit_id}, date={self.date}, status={self.status})>"
+
+
+class HabitStreakSummary(Base):
+    """
+    Сводка streak привычки, обновляемая при каждой записи лога.
+    
+    Поля base_* — состояние прохода по логам в порядке дат без последнего лога,
+    последний лог хранится отдельно (last_date, last_status). Поэтому смена статуса
+    за последний день пересчитывается без чтения истории. Логика — в bot.database.summary.
+    """
+    __tablename__ = "habit_streak_summaries"
+    
+    habit_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("habits.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Параметры привычки, для которых посчитана сводка: при их изменении нужен пересчёт
+    schedule_type: Mapped[ScheduleType] = mapped_column(Enum(ScheduleType))
+    weekly_target: Mapped[int] = mapped_column(Integer)
+    
+    # Итоговые значения с учётом последнего лога
+    current_streak: Mapped[int] = mapped_column(Integer, default=0)  # На дату last_date
+    best_streak: Mapped[int] = mapped_column(Integer, default=0)
+    total_done: Mapped[int] = mapped_column(Integer, default=0)
+    
+    # Последний (по дате) лог привычки
+    last_date: Mapped[Optional[date_type]] = mapped_column(Date, nullable=True, default=None)
+    last_status: Mapped[Optional[LogStatus]] = mapped_column(
+        Enum(LogStatus), nullable=True, default=None
+    )
+    
+    # Состояние без последнего лога
+    base_streak: Mapped[int] = mapped_column(Integer, default=0)
+    base_best: Mapped[int] = mapped_column(Integer, default=0)
+    base_total: Mapped[int] = mapped_column(Integer, default=0)
+    # Daily: дата последнего done/skipped серии. Weekly: понедельник последней успешной недели
+    base_prev_date: Mapped[Optional[date_type]] = mapped_column(Date, nullable=True, default=None)
+    # Daily: done в непрерывном блоке done/skipped, заканчивающемся base_run_end
+    base_run: Mapped[int] = mapped_column(Integer, default=0)
+    base_run_end: Mapped[Optional[date_type]] = mapped_column(Date, nullable=True, default=None)
+    # Weekly: done в неделе last_date без последнего лога
+    base_week_done: Mapped[int] = mapped_column(Integer, default=0)
+    
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now()
+    )
+    
+    # Relationships
+    habit: Mapped["Habit"] = relationship("Habit", back_populates="streak_summary")
+    
+    def __repr__(self) -> str:
+        return (
+            f"<HabitStreakSummary(habit_id={self.habit_id}, "
+            f"current={self.current_streak}, best={self.best_streak})>"
+        )
+
+
+class SchedulerLease(Base):
+    """
+    Аренда шарда планировщика напоминаний (шард — пользователи с user_id % N == shard).
+    
+    Владелец продлевает аренду, пока жив; шард с истёкшей арендой может забрать
+    другой воркер. handoff_to — воркер, для которого шард «домашний» и который
+    просит его вернуть.
+    """
+    __tablename__ = "scheduler_leases"
+    
+    shard: Mapped[int] = mapped_column(Integer, primary_key=True)
+    owner: Mapped[str] = mapped_column(String(100))
+    expires_at: Mapped[datetime] = mapped_column(DateTime)  # UTC
+    handoff_to: Mapped[Optional[str]] = mapped_column(String(100), nullable=True, default=None)
+    
+    def __repr__(self) -> str:
+        return f"<SchedulerLease(shard={self.shard}, owner={self.owner}, expires_at={self.expires_at})>"
+
+
+class ReminderChange(Base):
+    """
+    Журнал изменений настроек напоминаний: воркеры планировщика в других
+    процессах дочитывают его по id и обновляют свои индексы.
+    
+    Id не должны переиспользоваться после очистки журнала (иначе воркер с курсором
+    больше новых id их не увидит), поэтому на SQLite таблица создаётся с AUTOINCREMENT.
+    """
+    __tablename__ = "reminder_changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(BigInteger)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    
+    def __repr__(self) -> str:
+        return f"<ReminderChange(id={self.id}, user_id={self.user_id})>"
+
+
+class ReminderTime(Base):
+    """
+    Дополнительное напоминание: для конкретной привычки или для всех привычек пользователя.
+    
+    utc_minute — минута суток UTC, в которую напоминание срабатывает при текущем
+    смещении таймзоны (utc_offset); по индексу на ней планировщик одним запросом
+    находит все напоминания минуты. При переходе таймзоны на летнее/зимнее время
+    utc_minute и utc_offset пересчитываются для всех её напоминаний.
+    """
+    __tablename__ = "reminder_times"
+    __table_args__ = (
+        Index("ix_reminder_times_utc_minute", "utc_minute"),
+        Index("ix_reminder_times_timezone_offset", "timezone", "utc_offset"),
+        Index("ix_reminder_times_user_id", "user_id"),
+    )
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"))
+    habit_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("habits.id", ondelete="CASCADE"), nullable=True, default=None
+    )  # None — напоминание обо всех привычках
+    local_minute: Mapped[int] = mapped_column(Integer)  # Минута суток в таймзоне пользователя
+    timezone: Mapped[str] = mapped_column(String(50))  # Копия User.timezone
+    utc_offset: Mapped[int] = mapped_column(Integer)  # Смещение, по которому посчитан utc_minute
+    utc_minute: Mapped[int] = mapped_column(Integer)
+    
+    def __repr__(self) -> str:
+        return (
+            f"<ReminderTime(user_id={self.user_id}, habit_id={self.habit_id}, "
+            f"local_minute={self.local_minute}, utc_minute={self.utc_minute})>"
+        )
@@ -1,13 +1,17 @@
 """
 Управление сессиями базы данных.
 """
+import logging
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Dict
 
+from sqlalchemy import Connection, delete, event, func, inspect, select, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from bot.config import config
-from bot.database.models import Base
+from bot.database.models import Base, HabitLog
+
+logger = logging.getLogger(__name__)
 
 # Создаём async engine
 engine = create_async_engine(
@@ -15,6 +19,30 @@ engine = create_async_engine(
     echo=False,  # Включить для отладки SQL
 )
 
+# PRAGMA, применяемые к каждому новому соединению SQLite (порядок важен:
+# busy_timeout до journal_mode, чтобы переключение WAL дождалось блокировки)
+SQLITE_PRAGMAS: Dict[str, object] = {
+    "busy_timeout": config.sqlite_busy_timeout,
+    "journal_mode": config.sqlite_journal_mode,
+    "synchronous": config.sqlite_synchronous,
+    "cache_size": config.sqlite_cache_size,
+    "mmap_size": config.sqlite_mmap_size,
+    "temp_store": config.sqlite_temp_store,
+    "foreign_keys": "ON" if config.sqlite_foreign_keys else "OFF",
+}
+
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        """Применить профиль производительности SQLite к новому соединению."""
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
 # Фабрика сессий
 async_session_factory = async_sessionmaker(
     engine,
@@ -27,6 +55,49 @@ async def init_db() -> None:
     """Инициализация базы данных: создание всех таблиц."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_ensure_habit_log_unique_index)
+        
+        if engine.dialect.name == "sqlite":
+            effective = {}
+            for name in SQLITE_PRAGMAS:
+                effective[name] = (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+            logger.info(
+                "SQLite settings: "
+                + ", ".join(f"{name}={value}" for name, value in effective.items())
+            )
+    
+    # Сводки streak привычек, созданных до их появления или с другим расписанием
+    from bot.database.crud import backfill_streak_summaries
+    
+    async with async_session_factory() as session:
+        rebuilt = await backfill_streak_summaries(session)
+        await session.commit()
+    if rebuilt:
+        logger.info(f"Backfilled {rebuilt} streak summaries")
+
+
+def _ensure_habit_log_unique_index(connection: Connection) -> None:
+    """
+    Создать уникальный индекс (habit_id, date) в БД, созданной до его появления.
+    
+    create_all не добавляет индексы в уже существующие таблицы, поэтому
+    перед созданием индекса удаляем дубли логов, оставляя самый поздний.
+    """
+    index = next(
+        idx for idx in HabitLog.__table__.indexes
+        if idx.name == "ix_habit_logs_habit_id_date"
+    )
+    existing = {idx["name"] for idx in inspect(connection).get_indexes(HabitLog.__tablename__)}
+    if index.name in existing:
+        return
+    
+    latest_ids = (
+        select(func.max(HabitLog.id))
+        .group_by(HabitLog.habit_id, HabitLog.date)
+        .scalar_subquery()
+    )
+    connection.execute(delete(HabitLog).where(HabitLog.id.not_in(latest_ids)))
+    index.create(connection)
 
 
 @asynccontextmanager
@@ -39,3 +110,19 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
         except Exception:
             await session.rollback()
             raise
+
+
+@asynccontextmanager
+async def get_readonly_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Контекстный менеджер сессии только для чтения.
+    
+    Commit не вызывается: транзакция завершается при закрытии сессии (соединение
+    возвращается в пул с откатом), autoflush выключен, поэтому чтение не держит
+    блокировку записи и не вызывает fsync. Загруженные объекты остаются доступны
+    после выхода из контекста, изменения в них в БД не попадают.
+    """
+    async with async_session_factory(autoflush=False) as session:
+        if engine.dialect.name == "postgresql":
+            await session.execute(text("SET TRANSACTION READ ONLY"))
+        yield session
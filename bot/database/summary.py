@@ -0,0 +1,246 @@
+"""
+Инкрементальное обновление сводки streak (HabitStreakSummary).
+
+Сводка — это состояние прохода по логам привычки в порядке дат, повторяющее
+правила calculate_daily_streak / calculate_weekly_streak:
+- Daily: лучший streak считается по done, skipped продлевает серию, not_done и пропуск дня сбрасывают.
+  Текущий streak — done в непрерывном блоке done/skipped, который заканчивается сегодня или вчера.
+- Weekly: неделя успешна, если done >= weekly_target. Streak — успешные недели подряд,
+  текущий streak ненулевой, только если успешна текущая неделя.
+
+Последний лог хранится отдельно от base_* состояния, поэтому его статус можно
+заменить без чтения истории. Запись лога раньше последнего требует rebuild_summary.
+"""
+from datetime import date, timedelta
+from typing import Iterable, Optional, Tuple
+
+from bot.database.models import HabitLog, HabitStreakSummary, LogStatus, ScheduleType
+
+ONE_DAY = timedelta(days=1)
+ONE_WEEK = timedelta(days=7)
+
+
+def week_start(day: date) -> date:
+    """Понедельник ISO недели, в которую попадает дата."""
+    return day - timedelta(days=day.weekday())
+
+
+def reset_summary(
+    summary: HabitStreakSummary,
+    schedule_type: ScheduleType,
+    weekly_target: int,
+) -> None:
+    """Сбросить сводку в состояние «логов нет» для указанных параметров привычки."""
+    summary.schedule_type = schedule_type
+    summary.weekly_target = weekly_target
+    summary.last_date = None
+    summary.last_status = None
+    summary.base_streak = 0
+    summary.base_best = 0
+    summary.base_total = 0
+    summary.base_prev_date = None
+    summary.base_run = 0
+    summary.base_run_end = None
+    summary.base_week_done = 0
+    _refresh_totals(summary)
+
+
+def rebuild_summary(
+    summary: HabitStreakSummary,
+    logs: Iterable[HabitLog],
+    schedule_type: ScheduleType,
+    weekly_target: int,
+) -> None:
+    """Пересчитать сводку по всей истории (логи отсортированы по дате, даты уникальны)."""
+    reset_summary(summary, schedule_type, weekly_target)
+    for log in logs:
+        _append(summary, log.date, log.status)
+    _refresh_totals(summary)
+
+
+def apply_log(summary: HabitStreakSummary, log_date: date, status: LogStatus) -> bool:
+    """
+    Учесть запись лога в сводке.
+
+    Returns:
+        False, если лог относится к дате раньше последней — тогда нужен rebuild_summary
+    """
+    if summary.last_date is not None and log_date < summary.last_date:
+        return False
+
+    if log_date == summary.last_date:
+        summary.last_status = status
+    else:
+        _append(summary, log_date, status)
+
+    _refresh_totals(summary)
+    return True
+
+
+def is_summary_stale(
+    summary: Optional[HabitStreakSummary],
+    schedule_type: ScheduleType,
+    weekly_target: int,
+) -> bool:
+    """Сводка отсутствует или посчитана для других параметров привычки."""
+    return (
+        summary is None
+        or summary.schedule_type != schedule_type
+        or summary.weekly_target != weekly_target
+    )
+
+
+def summary_current_streak(summary: HabitStreakSummary, today: date) -> int:
+    """
+    Текущий streak на дату today.
+
+    Сводка хранит streak на дату последнего лога; если с тех пор серия
+    прервалась (день или неделя без отметок), streak равен нулю.
+    Для логов позже today результат не определён — нужен пересчёт по логам.
+    """
+    if summary.last_date is None:
+        return 0
+
+    if summary.schedule_type == ScheduleType.DAILY:
+        if summary.last_date >= today - ONE_DAY:
+            return summary.current_streak
+        return 0
+
+    if week_start(summary.last_date) == week_start(today):
+        return summary.current_streak
+    return 0
+
+
+def _append(summary: HabitStreakSummary, log_date: date, status: LogStatus) -> None:
+    """Перенести последний лог в base_* состояние и сделать последним новый лог."""
+    if summary.last_date is not None:
+        last_done = int(summary.last_status == LogStatus.DONE)
+        summary.base_total += last_done
+
+        if summary.schedule_type == ScheduleType.DAILY:
+            (
+                summary.base_streak,
+                summary.base_prev_date,
+                summary.base_best,
+                summary.base_run,
+                summary.base_run_end,
+            ) = _daily_step(
+                summary.base_streak,
+                summary.base_prev_date,
+                summary.base_best,
+                summary.base_run,
+                summary.base_run_end,
+                summary.last_date,
+                summary.last_status,
+            )
+        elif week_start(log_date) == week_start(summary.last_date):
+            summary.base_week_done += last_done
+        else:
+            summary.base_streak, summary.base_prev_date, summary.base_best = _weekly_step(
+                summary.base_streak,
+                summary.base_prev_date,
+                summary.base_best,
+                week_start(summary.last_date),
+                summary.base_week_done + last_done,
+                summary.weekly_target,
+            )
+            summary.base_week_done = 0
+
+    summary.last_date = log_date
+    summary.last_status = status
+
+
+def _refresh_totals(summary: HabitStreakSummary) -> None:
+    """Пересчитать итоговые current/best/total из base_* состояния и последнего лога."""
+    if summary.last_date is None:
+        summary.current_streak = 0
+        summary.best_streak = summary.base_best
+        summary.total_done = summary.base_total
+        return
+
+    last_done = int(summary.last_status == LogStatus.DONE)
+    summary.total_done = summary.base_total + last_done
+
+    if summary.schedule_type == ScheduleType.DAILY:
+        _, _, best, run, run_end = _daily_step(
+            summary.base_streak,
+            summary.base_prev_date,
+            summary.base_best,
+            summary.base_run,
+            summary.base_run_end,
+            summary.last_date,
+            summary.last_status,
+        )
+        summary.current_streak = run if run_end is not None else 0
+    else:
+        monday = week_start(summary.last_date)
+        streak, prev_success, best = _weekly_step(
+            summary.base_streak,
+            summary.base_prev_date,
+            summary.base_best,
+            monday,
+            summary.base_week_done + last_done,
+            summary.weekly_target,
+        )
+        summary.current_streak = streak if prev_success == monday else 0
+
+    summary.best_streak = best
+
+
+def _daily_step(
+    streak: int,
+    prev_date: Optional[date],
+    best: int,
+    run: int,
+    run_end: Optional[date],
+    log_date: date,
+    status: LogStatus,
+) -> Tuple[int, Optional[date], int, int, Optional[date]]:
+    """Шаг прохода daily: (streak, prev_date, best, run, run_end) после лога."""
+    if status == LogStatus.DONE:
+        if prev_date is not None and log_date == prev_date + ONE_DAY:
+            streak += 1
+        else:
+            streak = 1
+        prev_date = log_date
+        best = max(best, streak)
+    elif status == LogStatus.SKIPPED:
+        # Skipped не прерывает серию, но и не увеличивает
+        if prev_date is not None:
+            prev_date = log_date
+    else:  # NOT_DONE
+        streak = 0
+        prev_date = None
+
+    if status == LogStatus.NOT_DONE:
+        run, run_end = 0, None
+    else:
+        is_done = int(status == LogStatus.DONE)
+        if run_end is not None and log_date == run_end + ONE_DAY:
+            run += is_done
+        else:
+            run = is_done
+        run_end = log_date
+
+    return streak, prev_date, best, run, run_end
+
+
+def _weekly_step(
+    streak: int,
+    prev_success: Optional[date],
+    best: int,
+    monday: date,
+    done_count: int,
+    weekly_target: int,
+) -> Tuple[int, Optional[date], int]:
+    """Шаг прохода weekly: (streak, понедельник последней успешной недели, best) после недели."""
+    if done_count >= weekly_target:
+        if prev_success is not None and prev_success == monday - ONE_WEEK:
+            streak += 1
+        else:
+            streak = 1
+        prev_success = monday
+        best = max(best, streak)
+    else:
+        streak = 0
+    return streak, prev_success, best
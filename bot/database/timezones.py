@@ -0,0 +1,32 @@
+"""
+Таймзоны пользователей и перевод локальной минуты суток в UTC.
+"""
+import logging
+from datetime import datetime
+
+import pytz
+
+from bot.config import config
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def resolve_timezone(timezone: str) -> pytz.BaseTzInfo:
+    """Таймзона по имени IANA (неизвестная — таймзона по умолчанию)."""
+    try:
+        return pytz.timezone(timezone)
+    except pytz.exceptions.UnknownTimeZoneError:
+        logger.warning(f"Unknown timezone {timezone}, using default")
+        return pytz.timezone(config.default_timezone)
+
+
+def utc_offset_minutes(tz: pytz.BaseTzInfo, now: datetime) -> int:
+    """Смещение таймзоны от UTC в минутах на момент now (aware datetime)."""
+    return int(now.astimezone(tz).utcoffset().total_seconds() // 60)
+
+
+def to_utc_minute(local_minute: int, offset: int) -> int:
+    """UTC минута суток для локальной минуты суток при смещении offset."""
+    return (local_minute - offset) % MINUTES_PER_DAY
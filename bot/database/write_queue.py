@@ -0,0 +1,181 @@
+"""
+Очередь записи логов с групповым commit (write-behind).
+
+Отметки привычек от разных пользователей собираются в пачку за несколько
+миллисекунд и записываются одной транзакцией: SQLite сериализует commit'ы,
+поэтому при всплеске нажатий после напоминаний один commit на пачку вместо
+одного на нажатие. Вызывающий код ждёт, пока его запись не будет закоммичена.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import date
+from typing import AsyncContextManager, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.config import config
+from bot.database.crud import get_or_create_log
+from bot.database.models import LogStatus
+from bot.database.session import get_session
+
+logger = logging.getLogger(__name__)
+
+SessionFactory = Callable[[], AsyncContextManager[AsyncSession]]
+
+
+@dataclass
+class _PendingWrite:
+    """Запись лога, ожидающая commit."""
+    habit_id: int
+    log_date: date
+    status: LogStatus
+    futures: List[asyncio.Future] = field(default_factory=list)
+
+
+class LogWriteQueue:
+    """Очередь upsert'ов HabitLog с групповым commit."""
+
+    def __init__(
+        self,
+        session_factory: SessionFactory = get_session,
+        max_size: int = config.log_write_queue_size,
+        max_batch: int = config.log_write_batch_size,
+        flush_interval: float = config.log_write_flush_interval_ms / 1000,
+    ):
+        self._session_factory = session_factory
+        self._max_size = max_size
+        self._max_batch = max_batch
+        self._flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches_committed = 0
+        self.writes_committed = 0
+
+    @property
+    def running(self) -> bool:
+        """Запущен ли фоновый обработчик."""
+        return self._worker is not None and not self._worker.done()
+
+    @property
+    def depth(self) -> int:
+        """Количество записей, ожидающих обработки."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        """Запустить фоновый обработчик очереди."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self._max_size)
+        self._worker = asyncio.create_task(self._run(), name="log-write-queue")
+        logger.info("Log write queue started")
+
+    async def stop(self) -> None:
+        """Дописать всё из очереди и остановить обработчик."""
+        if not self.running:
+            return
+
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        logger.info(
+            f"Log write queue stopped: {self.writes_committed} writes "
+            f"in {self.batches_committed} batches"
+        )
+
+    async def submit(self, habit_id: int, log_date: date, status: LogStatus) -> None:
+        """
+        Записать статус привычки за дату и дождаться commit.
+
+        При заполненной очереди ждёт освобождения места (backpressure).
+        Если обработчик не запущен, пишет сразу в отдельной транзакции.
+        """
+        if not self.running:
+            async with self._session_factory() as session:
+                await get_or_create_log(session, habit_id, log_date, status)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((habit_id, log_date, status, future))
+        await future
+
+    async def _run(self) -> None:
+        """Цикл обработчика: собрать пачку и записать её одной транзакцией."""
+        while True:
+            items = [await self._queue.get()]
+
+            # Даём пачке накопиться, не дольше flush_interval
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self._flush_interval
+            while len(items) < self._max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush(items)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    async def _flush(self, items: List[Tuple[int, date, LogStatus, asyncio.Future]]) -> None:
+        """Записать пачку; при ошибке — повторить по одной, чтобы изолировать сбойную запись."""
+        # Повторные нажатия по одной привычке за день схлопываются: побеждает последнее
+        pending: Dict[Tuple[int, date], _PendingWrite] = {}
+        for habit_id, log_date, status, future in items:
+            write = pending.setdefault(
+                (habit_id, log_date), _PendingWrite(habit_id, log_date, status)
+            )
+            write.status = status
+            write.futures.append(future)
+
+        writes = list(pending.values())
+        try:
+            await self._commit(writes)
+        except Exception as e:
+            if len(writes) == 1:
+                self._resolve(writes[0], e)
+                return
+            logger.warning(f"Batch of {len(writes)} log writes failed, retrying one by one: {e}")
+            for write in writes:
+                try:
+                    await self._commit([write])
+                except Exception as write_error:
+                    self._resolve(write, write_error)
+                else:
+                    self._resolve(write)
+            return
+
+        for write in writes:
+            self._resolve(write)
+
+    async def _commit(self, writes: List[_PendingWrite]) -> None:
+        """Записать логи одной транзакцией."""
+        async with self._session_factory() as session:
+            for write in writes:
+                await get_or_create_log(session, write.habit_id, write.log_date, write.status)
+        self.batches_committed += 1
+        self.writes_committed += len(writes)
+
+    @staticmethod
+    def _resolve(write: _PendingWrite, error: Optional[BaseException] = None) -> None:
+        """Сообщить ожидающим результат записи."""
+        for future in write.futures:
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+
+# Глобальный экземпляр очереди
+log_write_queue = LogWriteQueue()
@@ -11,9 +11,10 @@ from aiogram.types import Message, CallbackQuery
 from bot.config import config
 from bot.database import (
     get_session,
-    get_or_create_user,
+    get_readonly_session,
+    get_or_create_user_snapshot,
     create_habit,
-    get_habits,
+    get_habit_snapshots,
     get_habit,
     update_habit,
     delete_habit,
@@ -51,9 +52,8 @@ async def show_my_habits(message: Message) -> None:
     """Показать список привычек с управлением."""
     user_id = message.from_user.id
     
-    async with get_session() as session:
-        await get_or_create_user(session, user_id)
-        habits = await get_habits(session, user_id)
+    async with get_readonly_session() as session:
+        habits = await get_habit_snapshots(session, user_id)
     
     if not habits:
         await message.answer(
@@ -76,8 +76,8 @@ async def back_to_habits(callback: CallbackQuery) -> None:
     """Вернуться к списку привычек."""
     user_id = callback.from_user.id
     
-    async with get_session() as session:
-        habits = await get_habits(session, user_id)
+    async with get_readonly_session() as session:
+        habits = await get_habit_snapshots(session, user_id)
     
     await callback.message.edit_text(
         "📋 <b>Твои привычки:</b>\n\n"
@@ -94,7 +94,7 @@ async def manage_habit(callback: CallbackQuery) -> None:
     """Показать действия для привычки."""
     habit_id = int(callback.data.split(":")[1])
     
-    async with get_session() as session:
+    async with get_readonly_session() as session:
         habit = await get_habit(session, habit_id)
         
         if habit is None:
@@ -164,7 +164,7 @@ async def confirm_delete_habit(callback: CallbackQuery) -> None:
     """Подтверждение удаления привычки."""
     habit_id = int(callback.data.split(":")[1])
     
-    async with get_session() as session:
+    async with get_readonly_session() as session:
         habit = await get_habit(session, habit_id)
         
         if habit is None:
@@ -197,7 +197,7 @@ async def do_delete_habit(callback: CallbackQuery) -> None:
         await callback.answer("Привычка удалена 🗑")
         
         # Показываем обновлённый список
-        habits = await get_habits(session, user_id)
+        habits = await get_habit_snapshots(session, user_id)
         
         if habits:
             await callback.message.edit_text(
@@ -365,7 +365,7 @@ async def create_new_habit(
     user_id = callback.from_user.id
     
     async with get_session() as session:
-        await get_or_create_user(session, user_id)
+        await get_or_create_user_snapshot(session, user_id)
         habit = await create_habit(
             session,
             user_id=user_id,
@@ -4,6 +4,7 @@
 import logging
 import re
 from datetime import time
+from typing import Optional
 
 import pytz
 from aiogram import Router, F
@@ -12,9 +13,23 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message, CallbackQuery
 
 from bot.config import config
-from bot.database import get_session, get_or_create_user, get_user, update_user
+from bot.database import (
+    get_session,
+    get_readonly_session,
+    get_or_create_user_snapshot,
+    get_user_snapshot,
+    update_user,
+    get_habit_snapshots,
+    add_reminder_time,
+    get_reminder_times,
+    delete_reminder_time,
+)
 from bot.keyboards.reply import get_main_menu_keyboard, get_cancel_keyboard
-from bot.keyboards.inline import get_settings_keyboard, get_timezone_keyboard
+from bot.keyboards.inline import (
+    get_settings_keyboard,
+    get_timezone_keyboard,
+    get_reminder_times_keyboard,
+)
 from bot.services.scheduler import scheduler_service
 
 logger = logging.getLogger(__name__)
@@ -25,6 +40,18 @@ class SettingsStates(StatesGroup):
     """Состояния настроек."""
     waiting_reminder_time = State()
     waiting_custom_timezone = State()
+    waiting_extra_reminder_time = State()
+
+
+TIME_PATTERN = r"^([0-1]?[0-9]|2[0-3]):([0-5][0-9])$"
+
+
+def parse_time(text: str) -> Optional[time]:
+    """Разобрать время в формате ЧЧ:ММ; None, если формат неверный."""
+    match = re.match(TIME_PATTERN, text.strip())
+    if not match:
+        return None
+    return time(int(match.group(1)), int(match.group(2)))
 
 
 @router.message(F.text == "⚙️ Настройки")
@@ -32,22 +59,26 @@ async def show_settings(message: Message) -> None:
     """Показать настройки пользователя."""
     user_id = message.from_user.id
     
-    async with get_session() as session:
-        user = await get_or_create_user(session, user_id)
-        
-        reminder_status = "выключены 🔕"
-        if user.reminders_enabled and user.reminder_time:
-            reminder_status = f"включены 🔔 в {user.reminder_time.strftime('%H:%M')}"
-        elif user.reminders_enabled:
-            reminder_status = "включены 🔔 (время не задано)"
-        
-        await message.answer(
-            "⚙️ <b>Настройки</b>\n\n"
-            f"🌍 Часовой пояс: <b>{user.timezone}</b>\n"
-            f"🔔 Напоминания: {reminder_status}\n",
-            parse_mode="HTML",
-            reply_markup=get_settings_keyboard(user.reminders_enabled),
-        )
+    async with get_readonly_session() as session:
+        user = await get_user_snapshot(session, user_id)
+    
+    if user is None:
+        async with get_session() as session:
+            user = await get_or_create_user_snapshot(session, user_id)
+    
+    reminder_status = "выключены 🔕"
+    if user.reminders_enabled and user.reminder_time:
+        reminder_status = f"включены 🔔 в {user.reminder_time.strftime('%H:%M')}"
+    elif user.reminders_enabled:
+        reminder_status = "включены 🔔 (время не задано)"
+    
+    await message.answer(
+        "⚙️ <b>Настройки</b>\n\n"
+        f"🌍 Часовой пояс: <b>{user.timezone}</b>\n"
+        f"🔔 Напоминания: {reminder_status}\n",
+        parse_mode="HTML",
+        reply_markup=get_settings_keyboard(user.reminders_enabled),
+    )
 
 
 # === Время напоминания ===
@@ -75,10 +106,9 @@ async def process_reminder_time(message: Message, state: FSMContext) -> None:
     time_text = message.text.strip()
     
     # Валидация формата HH:MM
-    pattern = r"^([0-1]?[0-9]|2[0-3]):([0-5][0-9])$"
-    match = re.match(pattern, time_text)
+    reminder_time = parse_time(time_text)
     
-    if not match:
+    if reminder_time is None:
         await message.answer(
             "❌ Неверный формат! Введи время в формате <b>ЧЧ:ММ</b>\n"
             "Например: 09:00, 21:30, 08:45",
@@ -86,9 +116,6 @@ async def process_reminder_time(message: Message, state: FSMContext) -> None:
         )
         return
     
-    hours, minutes = int(match.group(1)), int(match.group(2))
-    reminder_time = time(hours, minutes)
-    
     user_id = message.from_user.id
     
     async with get_session() as session:
@@ -114,6 +141,120 @@ async def process_reminder_time(message: Message, state: FSMContext) -> None:
     )
 
 
+# === Дополнительные напоминания ===
+
+async def show_reminder_times(callback: CallbackQuery) -> None:
+    """Показать список дополнительных напоминаний пользователя."""
+    user_id = callback.from_user.id
+    
+    async with get_readonly_session() as session:
+        user = await get_user_snapshot(session, user_id)
+        reminders = await get_reminder_times(session, user_id)
+        habits = await get_habit_snapshots(session, user_id)
+    
+    habit_names = {
+        habit.id: habit.name if habit.is_active else f"{habit.name} (выкл.)"
+        for habit in habits
+    }
+    
+    text = "⏰ <b>Дополнительные напоминания</b>\n\n"
+    if reminders:
+        text += "Нажми на напоминание, чтобы удалить его.\n"
+    else:
+        text += "Дополнительных напоминаний пока нет.\n"
+    text += "Напоминание об одной привычке добавляется в «📋 Мои привычки»."
+    if user is not None and not user.reminders_enabled:
+        text += "\n\n⚠️ Напоминания выключены — включи их в настройках."
+    
+    await callback.message.edit_text(
+        text,
+        parse_mode="HTML",
+        reply_markup=get_reminder_times_keyboard(reminders, habit_names),
+    )
+
+
+@router.callback_query(F.data == "settings:reminder_times")
+async def list_reminder_times(callback: CallbackQuery) -> None:
+    """Открыть список дополнительных напоминаний."""
+    await show_reminder_times(callback)
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("reminder_time_add:"))
+async def ask_extra_reminder_time(callback: CallbackQuery, state: FSMContext) -> None:
+    """Запросить время дополнительного напоминания (обо всех привычках или об одной)."""
+    target = callback.data.split(":")[1]
+    habit_id = None if target == "all" else int(target)
+    
+    await state.update_data(reminder_habit_id=habit_id)
+    await state.set_state(SettingsStates.waiting_extra_reminder_time)
+    
+    await callback.message.edit_text(
+        "⏰ Введи время дополнительного напоминания в формате <b>ЧЧ:ММ</b>\n"
+        "(например, 13:00):",
+        parse_mode="HTML",
+    )
+    await callback.answer()
+
+
+@router.message(SettingsStates.waiting_extra_reminder_time)
+async def process_extra_reminder_time(message: Message, state: FSMContext) -> None:
+    """Обработка времени дополнительного напоминания."""
+    if message.text == "❌ Отмена":
+        await state.clear()
+        await message.answer("Добавление отменено.", reply_markup=get_main_menu_keyboard())
+        return
+    
+    time_text = message.text.strip()
+    reminder_time = parse_time(time_text)
+    
+    if reminder_time is None:
+        await message.answer(
+            "❌ Неверный формат! Введи время в формате <b>ЧЧ:ММ</b>\n"
+            "Например: 09:00, 21:30, 08:45",
+            parse_mode="HTML",
+        )
+        return
+    
+    data = await state.get_data()
+    habit_id = data.get("reminder_habit_id")
+    user_id = message.from_user.id
+    
+    # Планировщик читает дополнительные напоминания из БД каждую минуту,
+    # воркеры других процессов узнают об изменении из журнала
+    async with get_session() as session:
+        await get_or_create_user_snapshot(session, user_id)
+        reminder = await add_reminder_time(session, user_id, reminder_time, habit_id=habit_id)
+    
+    await state.clear()
+    
+    if reminder is None:
+        await message.answer("Привычка не найдена.", reply_markup=get_main_menu_keyboard())
+        return
+    
+    await message.answer(
+        f"✅ Дополнительное напоминание добавлено: <b>{reminder_time.strftime('%H:%M')}</b>",
+        parse_mode="HTML",
+        reply_markup=get_main_menu_keyboard(),
+    )
+
+
+@router.callback_query(F.data.startswith("reminder_time_del:"))
+async def remove_reminder_time(callback: CallbackQuery) -> None:
+    """Удалить дополнительное напоминание."""
+    reminder_id = int(callback.data.split(":")[1])
+    
+    async with get_session() as session:
+        deleted = await delete_reminder_time(session, reminder_id, callback.from_user.id)
+    
+    if not deleted:
+        await callback.answer("Напоминание не найдено", show_alert=True)
+        return
+    
+    await show_reminder_times(callback)
+    await callback.answer("Напоминание удалено")
+
+
 # === Часовой пояс ===
 
 @router.callback_query(F.data == "settings:timezone")
@@ -16,7 +16,7 @@ from bot.config import config
 from bot.database import (
     get_session,
     get_or_create_user,
-    get_user,
+    get_user_snapshot,
     create_habit,
     update_user,
     ScheduleType,
@@ -46,7 +46,7 @@ async def cmd_start(message: Message, state: FSMContext) -> None:
     user_id = message.from_user.id
     
     async with get_session() as session:
-        user = await get_user(session, user_id)
+        user = await get_user_snapshot(session, user_id)
         
         if user is not None:
             # Пользователь уже существует
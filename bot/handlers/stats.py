@@ -10,12 +10,17 @@ from aiogram.types import Message
 
 from bot.config import config
 from bot.database import (
-    get_session,
-    get_or_create_user,
-    get_habits,
-    get_logs_for_habit,
+    get_readonly_session,
+    get_user_snapshot,
+    get_habit_snapshots,
+    get_log_batch,
+    get_done_counters_for_user_habits,
+    get_streak_summaries,
+    habit_stats_cache,
+    DoneCounters,
 )
-from bot.services.streak import get_habit_stats
+from bot.services.stats_executor import stats_executor
+from bot.services.streak import get_habit_stats_from_summary
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -36,9 +41,9 @@ async def show_statistics(message: Message) -> None:
     """Показать статистику по всем привычкам."""
     user_id = message.from_user.id
     
-    async with get_session() as session:
-        user = await get_or_create_user(session, user_id)
-        habits = await get_habits(session, user_id)
+    async with get_readonly_session() as session:
+        user = await get_user_snapshot(session, user_id)
+        habits = await get_habit_snapshots(session, user_id)
         
         if not habits:
             await message.answer(
@@ -51,19 +56,49 @@ async def show_statistics(message: Message) -> None:
         
         today = get_user_today(user.timezone)
         
+        # Статистика неизменившихся привычек берётся из кэша, остальные пересчитываются.
+        # Версии читаются до запроса к БД: запись лога во время расчёта их увеличит,
+        # и устаревший результат не попадёт в кэш
+        all_stats = {habit.id: habit_stats_cache.get(habit.id, today) for habit in habits}
+        missing = [habit for habit in habits if all_stats[habit.id] is None]
+        
+        if missing:
+            versions = {habit.id: habit_stats_cache.version(habit.id) for habit in missing}
+            
+            # Счётчики done считаются агрегатом в БД, streak берётся из сводок
+            done_counters = await get_done_counters_for_user_habits(session, user_id, today)
+            summaries = await get_streak_summaries(session, missing, rebuild_stale=False)
+            
+            # Без актуальной сводки или с логами «из будущего» (например, после смены
+            # таймзоны) статистика считается по истории — в пуле, чтобы не блокировать event loop
+            from_history = [
+                habit for habit in missing
+                if habit.id not in summaries
+                or (summaries[habit.id].last_date is not None and summaries[habit.id].last_date > today)
+            ]
+            if from_history:
+                history_stats = await stats_executor.compute_batch(
+                    await get_log_batch(session, [habit.id for habit in from_history]),
+                    [habit.schedule_type for habit in from_history],
+                    [habit.weekly_target for habit in from_history],
+                    today,
+                )
+                for habit, stats in zip(from_history, history_stats):
+                    all_stats[habit.id] = stats
+            
+            for habit in missing:
+                stats = all_stats[habit.id]
+                if stats is None:
+                    counters = done_counters.get(habit.id, DoneCounters(0, 0, 0))
+                    stats = get_habit_stats_from_summary(summaries[habit.id], counters, today)
+                    all_stats[habit.id] = stats
+                
+                habit_stats_cache.put(habit.id, today, versions[habit.id], stats)
+        
         stats_text = "📊 <b>Статистика привычек</b>\n\n"
         
         for habit in habits:
-            # Получаем все логи привычки
-            logs = await get_logs_for_habit(session, habit.id)
-            
-            # Вычисляем статистику
-            stats = get_habit_stats(
-                logs=logs,
-                schedule_type=habit.schedule_type,
-                weekly_target=habit.weekly_target,
-                today=today,
-            )
+            stats = all_stats[habit.id]
             
             # Формируем текст
             status_icon = "🟢" if habit.is_active else "🔴"
@@ -11,10 +11,12 @@ from aiogram.types import Message, CallbackQuery
 from bot.config import config
 from bot.database import (
     get_session,
-    get_or_create_user,
-    get_user,
-    get_active_habits,
-    get_or_create_log,
+    get_readonly_session,
+    get_or_create_user_snapshot,
+    get_user_snapshot,
+    get_habit_snapshots,
+    get_log_statuses_for_date,
+    log_write_queue,
     LogStatus,
 )
 from bot.keyboards.inline import get_habits_tracking_keyboard
@@ -39,8 +41,11 @@ async def show_today_habits(message: Message) -> None:
     user_id = message.from_user.id
     
     async with get_session() as session:
-        user = await get_or_create_user(session, user_id)
-        habits = await get_active_habits(session, user_id)
+        user = await get_or_create_user_snapshot(session, user_id)
+        
+        # Получаем сегодняшнюю дату в TZ пользователя
+        today = get_user_today(user.timezone)
+        habits = await get_habit_snapshots(session, user_id, active_only=True)
         
         if not habits:
             await message.answer(
@@ -49,16 +54,10 @@ async def show_today_habits(message: Message) -> None:
             )
             return
         
-        # Получаем сегодняшнюю дату в TZ пользователя
-        today = get_user_today(user.timezone)
-        
         # Собираем текущие статусы за сегодня
-        logs_today = {}
-        for habit in habits:
-            for log in habit.logs:
-                if log.date == today:
-                    logs_today[habit.id] = log.status
-                    break
+        logs_today = await get_log_statuses_for_date(
+            session, [habit.id for habit in habits], today
+        )
         
         await message.answer(
             f"📅 <b>Отметки за {today.strftime('%d.%m.%Y')}</b>\n\n"
@@ -89,42 +88,38 @@ async def track_habit(callback: CallbackQuery) -> None:
     
     user_id = callback.from_user.id
     
-    async with get_session() as session:
-        user = await get_user(session, user_id)
-        
-        if user is None:
-            await callback.answer("Пользователь не найден", show_alert=True)
-            return
-        
-        # Получаем сегодняшнюю дату в TZ пользователя
-        today = get_user_today(user.timezone)
-        
-        # Idempotent: создаём или обновляем лог
-        log = await get_or_create_log(session, habit_id, today, status)
-        
-        # Получаем все активные привычки для обновления клавиатуры
-        habits = await get_active_habits(session, user_id)
-        
-        # Собираем обновлённые статусы
-        logs_today = {}
-        for habit in habits:
-            for habit_log in habit.logs:
-                if habit_log.date == today:
-                    logs_today[habit.id] = habit_log.status
-                    break
-        
-        # Обновляем сообщение
-        await callback.message.edit_reply_markup(
-            reply_markup=get_habits_tracking_keyboard(habits, logs_today),
+    async with get_readonly_session() as session:
+        user = await get_user_snapshot(session, user_id)
+    
+    if user is None:
+        await callback.answer("Пользователь не найден", show_alert=True)
+        return
+    
+    # Получаем сегодняшнюю дату в TZ пользователя
+    today = get_user_today(user.timezone)
+    
+    # Idempotent: создаём или обновляем лог (групповой commit вместе с другими нажатиями)
+    await log_write_queue.submit(habit_id, today, status)
+    
+    async with get_readonly_session() as session:
+        # Получаем активные привычки (из кэша) и статусы за сегодня для обновления клавиатуры
+        habits = await get_habit_snapshots(session, user_id, active_only=True)
+        logs_today = await get_log_statuses_for_date(
+            session, [habit.id for habit in habits], today
         )
-        
-        # Уведомление о статусе
-        status_text = {
-            LogStatus.DONE: "✅ Выполнено!",
-            LogStatus.NOT_DONE: "❌ Не сделал",
-            LogStatus.SKIPPED: "⏭ Пропущено",
-        }
-        await callback.answer(status_text.get(status, "Сохранено"))
+    
+    # Обновляем сообщение
+    await callback.message.edit_reply_markup(
+        reply_markup=get_habits_tracking_keyboard(habits, logs_today),
+    )
+    
+    # Уведомление о статусе
+    status_text = {
+        LogStatus.DONE: "✅ Выполнено!",
+        LogStatus.NOT_DONE: "❌ Не сделал",
+        LogStatus.SKIPPED: "⏭ Пропущено",
+    }
+    await callback.answer(status_text.get(status, "Сохранено"))
 
 
 @router.callback_query(F.data.startswith("habit_info:"))
@@ -6,6 +6,7 @@ from bot.keyboards.inline import (
     get_habit_actions_keyboard,
     get_timezone_keyboard,
     get_settings_keyboard,
+    get_reminder_times_keyboard,
     get_schedule_type_keyboard,
     get_weekly_target_keyboard,
     get_confirmation_keyboard,
@@ -18,6 +19,7 @@ __all__ = [
     "get_habit_actions_keyboard",
     "get_timezone_keyboard",
     "get_settings_keyboard",
+    "get_reminder_times_keyboard",
     "get_schedule_type_keyboard",
     "get_weekly_target_keyboard",
     "get_confirmation_keyboard",
@@ -1,24 +1,25 @@
 """
 Inline-клавиатуры для бота.
 """
-from typing import Sequence
+from typing import Sequence, Union
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from bot.config import config
-from bot.database.models import Habit, HabitLog, LogStatus
+from bot.database.cache import HabitSnapshot
+from bot.database.models import Habit, HabitLog, LogStatus, ReminderTime
 
 
 def get_habits_tracking_keyboard(
-    habits: Sequence[Habit],
+    habits: Sequence[Union[Habit, HabitSnapshot]],
     logs_today: dict[int, LogStatus],
 ) -> InlineKeyboardMarkup:
     """
     Клавиатура для отметки привычек за сегодня.
     
     Args:
-        habits: Список активных привычек
+        habits: Список активных привычек (модели или снимки из кэша)
         logs_today: Словарь {habit_id: status} для уже отмеченных сегодня
     """
     builder = InlineKeyboardBuilder()
@@ -70,12 +71,14 @@ def get_habits_tracking_keyboard(
     return builder.as_markup()
 
 
-def get_habit_management_keyboard(habits: Sequence[Habit]) -> InlineKeyboardMarkup:
+def get_habit_management_keyboard(
+    habits: Sequence[Union[Habit, HabitSnapshot]],
+) -> InlineKeyboardMarkup:
     """
     Клавиатура для управления привычками.
     
     Args:
-        habits: Список всех привычек пользователя
+        habits: Список всех привычек пользователя (модели или снимки из кэша)
     """
     builder = InlineKeyboardBuilder()
     
@@ -141,6 +144,14 @@ def get_habit_actions_keyboard(habit_id: int, is_active: bool) -> InlineKeyboard
         ),
     )
     
+    # Дополнительное напоминание об этой привычке
+    builder.row(
+        InlineKeyboardButton(
+            text="⏰ Напоминание",
+            callback_data=f"reminder_time_add:{habit_id}",
+        )
+    )
+    
     # Назад
     builder.row(
         InlineKeyboardButton(
@@ -248,6 +259,13 @@ def get_settings_keyboard(reminders_enabled: bool) -> InlineKeyboardMarkup:
         )
     )
     
+    builder.row(
+        InlineKeyboardButton(
+            text="⏰ Дополнительные напоминания",
+            callback_data="settings:reminder_times",
+        )
+    )
+    
     builder.row(
         InlineKeyboardButton(
             text="🌍 Часовой пояс",
@@ -272,3 +290,38 @@ def get_settings_keyboard(reminders_enabled: bool) -> InlineKeyboardMarkup:
         )
     
     return builder.as_markup()
+
+
+def get_reminder_times_keyboard(
+    reminders: Sequence[ReminderTime],
+    habit_names: dict[int, str],
+) -> InlineKeyboardMarkup:
+    """
+    Клавиатура дополнительных напоминаний: по кнопке удаления на каждое.
+    
+    Args:
+        reminders: Дополнительные напоминания пользователя
+        habit_names: Словарь {habit_id: название} для подписи напоминаний о привычке
+    """
+    builder = InlineKeyboardBuilder()
+    
+    for reminder in reminders:
+        hours, minutes = divmod(reminder.local_minute, 60)
+        target = "Все привычки"
+        if reminder.habit_id is not None:
+            target = habit_names.get(reminder.habit_id, "Привычка")
+        builder.row(
+            InlineKeyboardButton(
+                text=f"🗑 {hours:02d}:{minutes:02d} — {target}",
+                callback_data=f"reminder_time_del:{reminder.id}",
+            )
+        )
+    
+    builder.row(
+        InlineKeyboardButton(
+            text="➕ Для всех привычек",
+            callback_data="reminder_time_add:all",
+        )
+    )
+    
+    return builder.as_markup()
@@ -4,22 +4,24 @@
 import asyncio
 import logging
 import sys
-from datetime import datetime
 from pathlib import Path
 
 # Добавляем родительскую директорию в путь для импортов
 # Это позволяет запускать как `python bot/main.py`
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-import pytz
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 
 from bot.config import config
-from bot.database import init_db, get_session, get_active_habits, get_user
-from bot.database.models import LogStatus
+from bot.database import (
+    init_db,
+    log_write_queue,
+    user_cache,
+    habit_stats_cache,
+)
 from bot.handlers import (
     start_router,
     habits_router,
@@ -27,8 +29,8 @@ from bot.handlers import (
     stats_router,
     settings_router,
 )
-from bot.keyboards.inline import get_habits_tracking_keyboard
-from bot.services.scheduler import scheduler_service
+from bot.services.reminders import start_reminders, stop_reminders
+from bot.services.stats_executor import stats_executor
 
 # Настройка логирования
 logging.basicConfig(
@@ -41,29 +43,6 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def send_reminder(user_id: int) -> None:
-    """
-    Отправить напоминание пользователю.
-    Эта функция вызывается планировщиком.
-    """
-    bot = scheduler_service._bot
-    if bot is None:
-        logger.error("Bot not set in scheduler service")
-        return
-    
-    try:
-        # Простое напоминание без запроса к БД для теста
-        await bot.send_message(
-            chat_id=user_id,
-            text="🔔 <b>Напоминание!</b>\n\nНе забудь отметить привычки! Нажми «✅ Отметить сегодня»",
-            parse_mode=ParseMode.HTML,
-        )
-        logger.info(f"Sent reminder to user {user_id}")
-            
-    except Exception as e:
-        logger.error(f"Failed to send reminder to user {user_id}: {e}")
-
-
 async def on_startup(bot: Bot) -> None:
     """Действия при запуске бота."""
     logger.info("Bot starting...")
@@ -72,13 +51,14 @@ async def on_startup(bot: Bot) -> None:
     await init_db()
     logger.info("Database initialized")
     
-    # Настройка планировщика
-    scheduler_service.set_bot(bot)
-    scheduler_service.set_reminder_callback(send_reminder)
-    scheduler_service.start()
+    # Очередь записи отметок с групповым commit
+    log_write_queue.start()
     
-    # Восстановление jobs из БД
-    await scheduler_service.restore_jobs_from_db()
+    # Пул для расчёта статистики вне event loop
+    stats_executor.start()
+    
+    # Планировщик и очередь отправки напоминаний (или только шарды, или ничего — см. SCHEDULER_*)
+    await start_reminders(bot)
     
     logger.info("Bot started successfully!")
 
@@ -86,7 +66,14 @@ async def on_startup(bot: Bot) -> None:
 async def on_shutdown(bot: Bot) -> None:
     """Действия при остановке бота."""
     logger.info("Bot stopping...")
-    scheduler_service.shutdown()
+    await stop_reminders()
+    
+    # Дописываем отметки, ожидающие commit
+    await log_write_queue.stop()
+    await stats_executor.stop()
+    
+    logger.info(f"User cache stats: {user_cache.stats()}")
+    logger.info(f"Habit stats cache stats: {habit_stats_cache.stats()}")
     logger.info("Bot stopped")
 
 
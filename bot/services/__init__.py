@@ -1,10 +1,34 @@
 # Services package
-from bot.services.streak import calculate_daily_streak, calculate_weekly_streak, get_habit_stats
+from bot.services.streak import (
+    calculate_daily_streak,
+    calculate_weekly_streak,
+    calculate_daily_streak_columns,
+    calculate_weekly_streak_columns,
+    get_habit_stats,
+    get_habit_stats_columns,
+    get_habit_stats_from_summary,
+)
+from bot.services.batch_stats import compute_batch_stats
+from bot.services.stats_executor import StatsExecutor
+from bot.services.reminder_sender import ReminderSender, TokenBucket
 from bot.services.scheduler import SchedulerService
+from bot.services.shard_coordinator import ShardCoordinator
+from bot.services.reminders import Reminder, build_reminders
 
 __all__ = [
     "calculate_daily_streak",
     "calculate_weekly_streak",
+    "calculate_daily_streak_columns",
+    "calculate_weekly_streak_columns",
     "get_habit_stats",
+    "get_habit_stats_columns",
+    "get_habit_stats_from_summary",
+    "compute_batch_stats",
+    "StatsExecutor",
+    "ReminderSender",
+    "TokenBucket",
     "SchedulerService",
+    "ShardCoordinator",
+    "Reminder",
+    "build_reminders",
 ]
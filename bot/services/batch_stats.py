@@ -0,0 +1,253 @@
+"""
+Пакетный расчёт статистики для многих привычек сразу.
+
+Нужен для массового пересчёта (ежедневная сводка, исправление правил streak):
+истории привычек передаются одним LogBatch, и текущий/лучший streak и счётчики
+done считаются векторно через NumPy. Результат совпадает с get_habit_stats_columns
+для каждой привычки. Без NumPy используется построчный расчёт на Python.
+"""
+from datetime import date
+from typing import List, Optional, Sequence, Union
+
+from bot.database.columns import STATUS_DONE, STATUS_NOT_DONE, LogBatch
+from bot.database.models import ScheduleType
+from bot.services.streak import HabitStats, get_habit_stats_columns
+
+try:
+    import numpy as np
+except ImportError:  # NumPy — необязательная зависимость
+    np = None
+
+HAS_NUMPY = np is not None
+
+# Множитель ключа сегмент * _SEGMENT_KEY + порядковый номер даты (date.max.toordinal() < 2 ** 22)
+_SEGMENT_KEY = 1 << 22
+
+
+def compute_batch_stats(
+    batch: LogBatch,
+    schedule_types: Sequence[ScheduleType],
+    weekly_targets: Sequence[int],
+    today: Union[date, Sequence[date]],
+    use_numpy: Optional[bool] = None,
+) -> List[HabitStats]:
+    """
+    Посчитать статистику всех привычек пакета.
+
+    Args:
+        batch: Истории привычек
+        schedule_types: Тип расписания каждой привычки
+        weekly_targets: Цель для weekly каждой привычки (для daily игнорируется)
+        today: Текущая дата — общая или своя для каждой привычки (TZ пользователей различаются)
+        use_numpy: Принудительно включить/выключить NumPy (по умолчанию — если установлен)
+
+    Returns:
+        HabitStats в порядке сегментов пакета
+    """
+    count = len(batch)
+    todays = [today] * count if isinstance(today, date) else list(today)
+    if not (len(schedule_types) == len(weekly_targets) == len(todays) == count):
+        raise ValueError("Параметры привычек должны быть заданы для каждого сегмента пакета")
+
+    if use_numpy is None:
+        use_numpy = HAS_NUMPY
+    if use_numpy and not HAS_NUMPY:
+        raise RuntimeError("NumPy не установлен")
+
+    if use_numpy and count:
+        return _numpy_batch_stats(batch, schedule_types, weekly_targets, todays)
+    return _python_batch_stats(batch, schedule_types, weekly_targets, todays)
+
+
+def _python_batch_stats(
+    batch: LogBatch,
+    schedule_types: Sequence[ScheduleType],
+    weekly_targets: Sequence[int],
+    todays: Sequence[date],
+) -> List[HabitStats]:
+    """Построчный расчёт: get_habit_stats_columns для каждой привычки."""
+    return [
+        get_habit_stats_columns(columns, schedule_type, weekly_target, today)
+        for columns, schedule_type, weekly_target, today in zip(
+            batch, schedule_types, weekly_targets, todays
+        )
+    ]
+
+
+def _numpy_batch_stats(
+    batch: LogBatch,
+    schedule_types: Sequence[ScheduleType],
+    weekly_targets: Sequence[int],
+    todays: Sequence[date],
+) -> List[HabitStats]:
+    """Векторный расчёт по всему пакету."""
+    count = len(batch)
+    segment_ids = np.arange(count, dtype=np.int64)
+    lengths = np.diff(np.asarray(batch.offsets, dtype=np.int64))
+    segments = np.repeat(segment_ids, lengths)
+    ordinals = np.asarray(batch.dates, dtype=np.int64)
+    codes = np.asarray(batch.statuses, dtype=np.int8)
+    today_ordinals = np.array([day.toordinal() for day in todays], dtype=np.int64)
+
+    # Сортировка по (сегмент, дата); устойчивая — логи за одну дату сохраняют порядок
+    keys = segments * _SEGMENT_KEY + ordinals
+    if len(keys) > 1 and not np.all(keys[1:] >= keys[:-1]):
+        order = np.argsort(keys, kind="stable")
+        segments, ordinals, codes, keys = segments[order], ordinals[order], codes[order], keys[order]
+
+    # Счётчики done: всего и за 7/30 дней ((today - date) <= N дней)
+    is_done = codes == STATUS_DONE
+    done_segments = segments[is_done]
+    done_ordinals = ordinals[is_done]
+    done_today = today_ordinals[done_segments]
+    total_done = np.bincount(done_segments, minlength=count)
+    done_7_days = np.bincount(done_segments[done_ordinals >= done_today - 7], minlength=count)
+    done_30_days = np.bincount(done_segments[done_ordinals >= done_today - 30], minlength=count)
+
+    is_daily = np.array([t == ScheduleType.DAILY for t in schedule_types], dtype=bool)
+    current = np.zeros(count, dtype=np.int64)
+    best = np.zeros(count, dtype=np.int64)
+
+    daily_logs = is_daily[segments]
+    _daily_streaks(
+        segments[daily_logs],
+        ordinals[daily_logs],
+        codes[daily_logs],
+        keys[daily_logs],
+        today_ordinals,
+        current,
+        best,
+    )
+
+    weekly_logs = ~daily_logs
+    thresholds = np.maximum(np.asarray(weekly_targets, dtype=np.int64), 0)
+    _weekly_streaks(
+        segments[weekly_logs],
+        ordinals[weekly_logs],
+        codes[weekly_logs],
+        thresholds,
+        (today_ordinals - 1) // 7,
+        current,
+        best,
+    )
+
+    stats = [
+        HabitStats(
+            current_streak=int(current[i]),
+            best_streak=int(best[i]),
+            done_7_days=int(done_7_days[i]),
+            done_30_days=int(done_30_days[i]),
+            total_done=int(total_done[i]),
+        )
+        for i in range(count)
+    ]
+
+    # Несколько логов за одну дату (в БД невозможно из-за уникального индекса) меняют
+    # результат daily в зависимости от порядка — такие привычки считаем построчно
+    daily_segments = segments[daily_logs]
+    daily_ordinals = ordinals[daily_logs]
+    duplicated = (daily_segments[1:] == daily_segments[:-1]) & (daily_ordinals[1:] == daily_ordinals[:-1])
+    for i in np.unique(daily_segments[1:][duplicated]).tolist():
+        stats[i] = get_habit_stats_columns(
+            batch.segment(i), schedule_types[i], weekly_targets[i], todays[i]
+        )
+
+    return stats
+
+
+def _daily_streaks(segments, ordinals, codes, keys, today_ordinals, current, best) -> None:
+    """
+    Daily streak для логов, отсортированных по (сегмент, дата).
+
+    Результаты записываются в current/best по номерам сегментов.
+    """
+    size = len(segments)
+    if not size:
+        return
+
+    index = np.arange(size, dtype=np.int64)
+    is_done = codes == STATUS_DONE
+    is_not_done = codes == STATUS_NOT_DONE
+    segment_start = np.ones(size, dtype=bool)
+    segment_start[1:] = segments[1:] != segments[:-1]
+    # Лог идёт на следующий день после предыдущего лога той же привычки
+    next_day = np.zeros(size, dtype=bool)
+    next_day[1:] = ~segment_start[1:] & (ordinals[1:] - ordinals[:-1] == 1)
+
+    # Лучший streak. Серия продолжается done, если он на следующий день после
+    # предыдущего лога и после последнего not_done (или начала истории) уже был done;
+    # иначе done начинает новую серию. Skipped серию не прерывает и не увеличивает
+    last_done = np.full(size, -1, dtype=np.int64)
+    last_done[1:] = np.maximum.accumulate(np.where(is_done, index, -1))[:-1]
+    chain_start = np.maximum.accumulate(
+        np.where(is_not_done, index, np.where(segment_start, index - 1, -1))
+    )
+    continues = next_day & (last_done > chain_start)
+
+    done_index = np.flatnonzero(is_done)
+    position = np.arange(len(done_index), dtype=np.int64)
+    run_start = np.maximum.accumulate(np.where(~continues[done_index], position, 0))
+    np.maximum.at(best, segments[done_index], position - run_start + 1)
+
+    # Текущий streak: done в непрерывном (без пропусков дней и not_done) блоке,
+    # который заканчивается последним логом не позже today, если тот — сегодня или вчера
+    linked = next_day.copy()
+    linked[1:] &= ~is_not_done[:-1]
+    block_start = np.maximum.accumulate(np.where(linked, 0, index))
+    done_prefix = np.concatenate(([0], np.cumsum(is_done, dtype=np.int64)))
+
+    segment_ids = np.arange(len(today_ordinals), dtype=np.int64)
+    last = np.searchsorted(keys, segment_ids * _SEGMENT_KEY + today_ordinals, side="right") - 1
+    clipped = np.maximum(last, 0)
+    valid = (
+        (last >= 0)
+        & (segments[clipped] == segment_ids)
+        & (ordinals[clipped] >= today_ordinals - 1)
+        & ~is_not_done[clipped]
+    )
+    last = last[valid]
+    current[segment_ids[valid]] = done_prefix[last + 1] - done_prefix[block_start[last]]
+
+
+def _weekly_streaks(segments, ordinals, codes, thresholds, current_weeks, current, best) -> None:
+    """
+    Weekly streak для логов, отсортированных по (сегмент, дата).
+
+    Результаты записываются в current/best по номерам сегментов.
+    """
+    size = len(segments)
+    if not size:
+        return
+
+    # Группы логов по (сегмент, неделя) и число done в каждой
+    weeks = (ordinals - 1) // 7
+    group_start = np.ones(size, dtype=bool)
+    group_start[1:] = (segments[1:] != segments[:-1]) | (weeks[1:] != weeks[:-1])
+    starts = np.flatnonzero(group_start)
+    group_segments = segments[starts]
+    group_weeks = weeks[starts]
+    group_done = np.add.reduceat((codes == STATUS_DONE).astype(np.int64), starts)
+
+    # Успешные недели и серии подряд идущих успешных недель
+    success = group_done >= thresholds[group_segments]
+    success_segments = group_segments[success]
+    success_weeks = group_weeks[success]
+    if not len(success_weeks):
+        return
+
+    new_run = np.ones(len(success_weeks), dtype=bool)
+    new_run[1:] = (success_segments[1:] != success_segments[:-1]) | (
+        success_weeks[1:] - success_weeks[:-1] != 1
+    )
+    position = np.arange(len(success_weeks), dtype=np.int64)
+    run_length = position - np.maximum.accumulate(np.where(new_run, position, 0)) + 1
+    np.maximum.at(best, success_segments, run_length)
+
+    # Текущий streak — длина серии, заканчивающейся текущей неделей
+    success_keys = success_segments * _SEGMENT_KEY + success_weeks
+    segment_ids = np.arange(len(current_weeks), dtype=np.int64)
+    wanted = segment_ids * _SEGMENT_KEY + current_weeks
+    found = np.searchsorted(success_keys, wanted)
+    clipped = np.minimum(found, len(success_keys) - 1)
+    valid = (found < len(success_keys)) & (success_keys[clipped] == wanted)
+    current[segment_ids[valid]] = run_length[clipped[valid]]
@@ -0,0 +1,69 @@
+"""
+Индекс префиксных сумм по дням с done.
+
+Строится один раз за O(логов + дней истории) и отвечает на «сколько done
+за последние N дней» и «сколько done с даты по дату» за O(1) — для окон
+7/30 дней, 90/365 дней, с начала месяца и т.п.
+"""
+from array import array
+from datetime import date
+from itertools import accumulate
+from typing import Optional
+
+from bot.database.columns import STATUS_DONE, LogColumns
+
+
+class DoneIndex:
+    """Префиксные суммы количества done по дням истории привычки."""
+
+    def __init__(self, first_ordinal: Optional[int] = None, prefix: Optional[array] = None):
+        # prefix[k] — число done в днях [first_ordinal, first_ordinal + k)
+        self.first_ordinal = first_ordinal
+        self.prefix = prefix if prefix is not None else array("i", [0])
+
+    @classmethod
+    def from_columns(cls, columns: LogColumns) -> "DoneIndex":
+        """Построить индекс по колоночной истории (порядок логов не важен)."""
+        done_ordinals = [
+            ordinal for ordinal, status in zip(columns.dates, columns.statuses)
+            if status == STATUS_DONE
+        ]
+        if not done_ordinals:
+            return cls()
+
+        first = min(done_ordinals)
+        counts = array("i", [0]) * (max(done_ordinals) - first + 2)
+        for ordinal in done_ordinals:
+            counts[ordinal - first + 1] += 1
+        return cls(first, array("i", accumulate(counts)))
+
+    @property
+    def total(self) -> int:
+        """Всего done."""
+        return self.prefix[-1]
+
+    def between(self, start: date, end: date) -> int:
+        """Число done с start по end включительно."""
+        if self.first_ordinal is None:
+            return 0
+        low = max(start.toordinal() - self.first_ordinal, 0)
+        high = min(end.toordinal() - self.first_ordinal + 1, len(self.prefix) - 1)
+        if high <= low:
+            return 0
+        return self.prefix[high] - self.prefix[low]
+
+    def since(self, start: date) -> int:
+        """Число done начиная с start (включая даты позже сегодняшней)."""
+        return self.between(start, date.max)
+
+    def last_days(self, days: int, today: date) -> int:
+        """
+        Число done за последние days дней: (today - дата) <= days.
+
+        То же правило, что у done_7_days/done_30_days в HabitStats.
+        """
+        return self.since(date.fromordinal(max(today.toordinal() - days, 1)))
+
+    def month_to_date(self, today: date) -> int:
+        """Число done с начала месяца по today."""
+        return self.between(today.replace(day=1), today)
@@ -0,0 +1,286 @@
+"""
+Доставка напоминаний с ограничением скорости и повторами.
+
+Напоминания многих пользователей приходятся на одну минуту (популярное время,
+например 09:00 по Москве), а Telegram принимает от бота порядка 30 сообщений
+в секунду. Сообщения ставятся в очередь с приоритетом и отправляются пулом
+воркеров через общий token bucket. TelegramRetryAfter приостанавливает всю
+отправку на retry_after секунд, а сообщение возвращается в очередь; сетевые
+ошибки и ошибки сервера повторяются с экспоненциальной задержкой.
+"""
+import asyncio
+import itertools
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from aiogram.enums import ParseMode
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNotFound,
+    TelegramRetryAfter,
+)
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+from bot.config import config
+
+logger = logging.getLogger(__name__)
+
+# Меньше — раньше. Повторы идут впереди новых сообщений: они уже ждали
+PRIORITY_RETRY = 0
+PRIORITY_HIGH = 1
+PRIORITY_NORMAL = 2
+
+# Ошибки, после которых повторять бессмысленно (бот заблокирован, чат не найден, ...)
+PERMANENT_ERRORS = (TelegramForbiddenError, TelegramBadRequest, TelegramNotFound)
+
+
+class TokenBucket:
+    """Token bucket: в среднем rate операций в секунду, всплеск до capacity."""
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated: Optional[float] = None
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self) -> None:
+        """Дождаться и забрать один токен (ожидающие обслуживаются по очереди)."""
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated is None:
+                    self._updated = now
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+    
+    def pause(self, seconds: float) -> None:
+        """Не выдавать токены seconds секунд (flood control Telegram), накопленные сбросить."""
+        now = asyncio.get_running_loop().time()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0
+
+
+@dataclass(order=True)
+class _Delivery:
+    """Сообщение в очереди; порядок — приоритет, затем порядок постановки."""
+    priority: int
+    seq: int
+    chat_id: int = field(compare=False)
+    text: str = field(compare=False)
+    reply_markup: Any = field(compare=False, default=None)
+    attempts: int = field(compare=False, default=0)
+    enqueued_at: float = field(compare=False, default=0.0)
+
+
+class ReminderSender:
+    """Очередь отправки напоминаний с общим ограничением скорости."""
+    
+    def __init__(
+        self,
+        bot: Optional["Bot"] = None,
+        rate: float = config.reminder_rate_limit,
+        burst: int = config.reminder_burst,
+        workers: int = config.reminder_workers,
+        max_queue: int = config.reminder_queue_size,
+        max_attempts: int = config.reminder_max_attempts,
+        retry_backoff: float = config.reminder_retry_backoff,
+    ):
+        self._bot = bot
+        self._rate = rate
+        self._burst = burst
+        self._workers_count = workers
+        self._max_queue = max_queue
+        self._max_attempts = max_attempts
+        self._retry_backoff = retry_backoff
+        self._bucket: Optional[TokenBucket] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._capacity: Optional[asyncio.Semaphore] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        self._retry_handles: set = set()
+        self._seq = itertools.count()
+        self._unfinished = 0
+        self._latencies: deque = deque(maxlen=1000)
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+    
+    @property
+    def running(self) -> bool:
+        """Запущены ли воркеры."""
+        return bool(self._workers)
+    
+    @property
+    def depth(self) -> int:
+        """Сообщений, ожидающих отправки (включая отложенные повторы)."""
+        return self._unfinished
+    
+    def set_bot(self, bot: "Bot") -> None:
+        """Установить экземпляр бота."""
+        self._bot = bot
+    
+    def start(self) -> None:
+        """Запустить воркеры."""
+        if self.running:
+            return
+        self._bucket = TokenBucket(self._rate, self._burst)
+        self._queue = asyncio.PriorityQueue()
+        self._capacity = asyncio.Semaphore(self._max_queue)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"reminder-sender-{i}")
+            for i in range(self._workers_count)
+        ]
+        logger.info(f"Reminder sender started: {self._rate} msg/s, {self._workers_count} workers")
+    
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Дождаться отправки очереди (не дольше timeout) и остановить воркеры."""
+        if not self.running:
+            return
+        
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Reminder sender stopped with {self.depth} undelivered messages")
+        
+        for handle in self._retry_handles:
+            handle.cancel()
+        self._retry_handles.clear()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info(f"Reminder sender stopped: {self.stats()}")
+    
+    async def submit(
+        self,
+        chat_id: int,
+        text: str,
+        reply_markup: Any = None,
+        priority: int = PRIORITY_NORMAL,
+    ) -> None:
+        """
+        Поставить сообщение в очередь.
+        
+        При заполненной очереди ждёт освобождения места (backpressure).
+        """
+        if not self.running:
+            raise RuntimeError("Reminder sender is not running")
+        
+        await self._capacity.acquire()
+        self._unfinished += 1
+        self._idle.clear()
+        self._queue.put_nowait(_Delivery(
+            priority=priority,
+            seq=next(self._seq),
+            chat_id=chat_id,
+            text=text,
+            reply_markup=reply_markup,
+            enqueued_at=asyncio.get_running_loop().time(),
+        ))
+    
+    async def join(self) -> None:
+        """Дождаться, пока все поставленные сообщения будут отправлены или отброшены."""
+        if self._idle is not None:
+            await self._idle.wait()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики и задержка доставки (от постановки в очередь до отправки) для мониторинга."""
+        latencies = sorted(self._latencies)
+        return {
+            "depth": self.depth,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "latency_avg": sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_p95": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+            "latency_max": latencies[-1] if latencies else 0.0,
+        }
+    
+    async def _worker(self) -> None:
+        """
+        Цикл воркера: дождаться сообщения и токена, затем выбрать сообщение и отправить.
+        
+        Сообщение выбирается после получения токена: повторы и срочные сообщения,
+        пришедшие за время ожидания, обгоняют уже взятое. Токен берётся только при
+        непустой очереди, чтобы простаивающие воркеры не копили токены сверх burst.
+        """
+        while True:
+            delivery = await self._queue.get()
+            await self._bucket.acquire()
+            self._queue.put_nowait(delivery)
+            delivery = self._queue.get_nowait()
+            await self._send(delivery)
+    
+    async def _send(self, delivery: _Delivery) -> None:
+        """Отправить сообщение и обработать результат."""
+        try:
+            await self._bot.send_message(
+                chat_id=delivery.chat_id,
+                text=delivery.text,
+                reply_markup=delivery.reply_markup,
+                parse_mode=ParseMode.HTML,
+            )
+        except TelegramRetryAfter as e:
+            # Flood control: останавливаем всю отправку, сообщение повторяем после паузы
+            logger.warning(f"Flood control, pausing sends for {e.retry_after}s")
+            self._bucket.pause(e.retry_after)
+            self._retry(delivery, e.retry_after)
+        except PERMANENT_ERRORS as e:
+            logger.warning(f"Reminder to {delivery.chat_id} dropped: {e}")
+            self._finish(failed=True)
+        except Exception as e:
+            delivery.attempts += 1
+            if delivery.attempts >= self._max_attempts:
+                logger.error(f"Reminder to {delivery.chat_id} failed after {delivery.attempts} attempts: {e}")
+                self._finish(failed=True)
+            else:
+                self._retry(delivery, self._retry_backoff * 2 ** (delivery.attempts - 1))
+        else:
+            self._latencies.append(asyncio.get_running_loop().time() - delivery.enqueued_at)
+            self._finish(failed=False)
+    
+    def _retry(self, delivery: _Delivery, delay: float) -> None:
+        """Вернуть сообщение в очередь через delay секунд, впереди новых."""
+        self.retried += 1
+        delivery.priority = PRIORITY_RETRY
+        delivery.seq = next(self._seq)
+        
+        def requeue() -> None:
+            self._retry_handles.discard(handle)
+            self._queue.put_nowait(delivery)
+        
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._retry_handles.add(handle)
+    
+    def _finish(self, failed: bool) -> None:
+        """Учесть сообщение как обработанное."""
+        if failed:
+            self.failed += 1
+        else:
+            self.sent += 1
+        self._unfinished -= 1
+        self._capacity.release()
+        if not self._unfinished:
+            self._idle.set()
+
+
+# Глобальный экземпляр отправителя
+reminder_sender = ReminderSender()
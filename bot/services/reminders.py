@@ -0,0 +1,153 @@
+"""
+Персональные напоминания: только привычки, ещё не отмеченные за локальное «сегодня».
+
+Данные всех пользователей, чьё напоминание пришлось на одну минуту, загружаются
+одним запросом на пачку планировщика, а не запросом на пользователя.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Set
+
+import pytz
+from sqlalchemy.ext.asyncio import AsyncSession
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+from bot.config import config
+from bot.database.cache import HabitSnapshot
+from bot.database.crud import get_reminder_habits
+from bot.database.session import get_readonly_session, get_session
+from bot.database.timezones import resolve_timezone
+from bot.keyboards.inline import get_habits_tracking_keyboard
+from bot.services.reminder_sender import reminder_sender
+from bot.services.scheduler import scheduler_service
+from bot.services.shard_coordinator import shard_coordinator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Reminder:
+    """Напоминание пользователю."""
+    user_id: int
+    today: date  # Локальная дата пользователя
+    habits: List[HabitSnapshot]  # Неотмеченные активные привычки
+
+
+def local_date_candidates(now: datetime) -> List[date]:
+    """Даты, которые могут быть локальным «сегодня» в какой-либо таймзоне (UTC−12…UTC+14)."""
+    utc_today = now.astimezone(pytz.utc).date()
+    return [utc_today - timedelta(days=1), utc_today, utc_today + timedelta(days=1)]
+
+
+async def build_reminders(
+    session: AsyncSession,
+    user_ids: Sequence[int],
+    now: datetime,
+    habit_ids: Optional[Dict[int, Set[int]]] = None,
+) -> List[Reminder]:
+    """
+    Собрать напоминания пачки пользователей на момент now (aware datetime).
+    
+    Пользователи, у которых все активные привычки уже отмечены (или привычек нет),
+    пропускаются.
+    
+    Args:
+        habit_ids: {user_id: привычки} — напомнить только о них (напоминания по привычкам)
+    """
+    habit_ids = habit_ids or {}
+    rows = await get_reminder_habits(session, user_ids, local_date_candidates(now))
+    
+    reminders = []
+    for user_id in user_ids:
+        row = rows.get(user_id)
+        if row is None:
+            continue
+        
+        today = now.astimezone(resolve_timezone(row.timezone)).date()
+        marked = row.marked.get(today, ())
+        only = habit_ids.get(user_id)
+        habits = [
+            habit for habit in row.habits
+            if habit.id not in marked and (only is None or habit.id in only)
+        ]
+        if habits:
+            reminders.append(Reminder(user_id=user_id, today=today, habits=habits))
+    
+    return reminders
+
+
+def format_reminder(reminder: Reminder) -> str:
+    """Текст напоминания (клавиатура для отметки отправляется вместе с ним)."""
+    return (
+        f"🔔 <b>Напоминание!</b>\n\n"
+        f"Не отмечено за {reminder.today.strftime('%d.%m.%Y')}: {len(reminder.habits)}\n"
+        "Нажми кнопку чтобы отметить статус:"
+    )
+
+
+async def send_reminders(user_ids: List[int], habit_ids: Optional[Dict[int, Set[int]]] = None) -> None:
+    """
+    Поставить персональные напоминания пачки пользователей в очередь отправки.
+    Эта функция вызывается планировщиком.
+    
+    Привычки и отметки всей пачки загружаются одним запросом; в напоминание
+    попадают только неотмеченные сегодня привычки, пользователи без таких
+    привычек пропускаются.
+    """
+    async with get_readonly_session() as session:
+        reminders = await build_reminders(session, user_ids, datetime.now(pytz.utc), habit_ids)
+    
+    for reminder in reminders:
+        await reminder_sender.submit(
+            reminder.user_id,
+            format_reminder(reminder),
+            reply_markup=get_habits_tracking_keyboard(reminder.habits, {}),
+        )
+    
+    skipped = len(user_ids) - len(reminders)
+    if skipped:
+        logger.debug(f"Reminders skipped for {skipped} users with everything marked")
+
+
+async def start_reminders(bot: "Bot", enabled: Optional[bool] = None) -> None:
+    """
+    Запустить рассылку напоминаний в этом процессе.
+    
+    Без шардирования процесс ведёт всех пользователей (восстановление из БД в фоне),
+    при SCHEDULER_SHARDS > 0 — только шарды, аренду которых удалось взять.
+    
+    Args:
+        enabled: Планировать ли напоминания (по умолчанию SCHEDULER_ENABLED);
+            False — процесс только обрабатывает апдейты, напоминания шлют воркеры
+    """
+    if enabled is None:
+        enabled = config.scheduler_enabled
+    if not enabled:
+        scheduler_service.assign_shards(())
+        logger.info("Reminder scheduling is disabled in this process")
+        return
+    
+    # Очередь отправки напоминаний с лимитом скорости
+    reminder_sender.set_bot(bot)
+    reminder_sender.start()
+    
+    scheduler_service.set_bot(bot)
+    scheduler_service.set_reminder_callback(send_reminders)
+    scheduler_service.set_session_factory(get_session)
+    scheduler_service.start()
+    
+    if scheduler_service.shard_count:
+        shard_coordinator.start()
+    else:
+        # Восстановление напоминаний из БД в фоне: polling стартует сразу
+        scheduler_service.start_restore()
+
+
+async def stop_reminders() -> None:
+    """Остановить планирование, отдать шарды и дослать очередь напоминаний."""
+    scheduler_service.shutdown()
+    await shard_coordinator.stop()
+    await reminder_sender.stop()
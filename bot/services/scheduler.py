@@ -1,10 +1,34 @@
 """
 Сервис планировщика напоминаний.
-Использует APScheduler для отправки ежедневных напоминаний.
+
+Вместо cron job'а на каждого пользователя один job APScheduler срабатывает
+каждую минуту UTC и берёт из индекса в памяти пользователей, у которых сейчас
+время напоминания. Индекс разбит по UTC минуте суток и таймзоне: локальное
+время пользователя переводится в UTC по текущему смещению его таймзоны, а при
+смене смещения (переход на летнее/зимнее время) группа таймзоны переносится
+целиком. Стоимость минуты — O(таймзон + пользователей к отправке).
+
+Дополнительные напоминания (по привычкам и списки времён пользователя) в
+память не загружаются: они лежат в таблице reminder_times с индексом по UTC
+минуте суток, и тик находит все сработавшие одним запросом по диапазону минут.
 """
+import asyncio
 import logging
-from datetime import datetime, time
-from typing import TYPE_CHECKING, Callable, Awaitable
+from datetime import datetime, time, timedelta
+from typing import (
+    TYPE_CHECKING,
+    AsyncContextManager,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 import pytz
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -13,42 +37,237 @@ from apscheduler.executors.asyncio import AsyncIOExecutor
 
 if TYPE_CHECKING:
     from aiogram import Bot
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from bot.database.crud import ReminderEntry
 
 from bot.config import config
+from bot.database.timezones import resolve_timezone, to_utc_minute, utc_offset_minutes
 
 logger = logging.getLogger(__name__)
 
+# Список таймзон дополнительных напоминаний перечитывается в минуты UTC, кратные этой:
+# все смещения от UTC кратны 15 минутам, поэтому любой переход на летнее время
+# приходится на такую минуту, и таймзона, добавленная другим процессом, пересчитывается
+# в момент перехода
+ZONES_RELOAD_MINUTES = 15
+
+# (пользователи пачки, {user_id: привычки} для тех, кому напомнить только о части привычек)
+ReminderCallback = Callable[[List[int], Dict[int, Set[int]]], Awaitable[None]]
+SessionFactory = Callable[[], AsyncContextManager["AsyncSession"]]
+
+
+class ReminderIndex:
+    """
+    Индекс напоминаний: UTC минута суток → таймзона → пользователи.
+    
+    Множество пользователей группы (таймзона, локальная минута) одно и то же
+    в обоих уровнях индекса, поэтому добавление и удаление — O(1).
+    """
+    
+    def __init__(self):
+        self._users: Dict[int, Tuple[str, int]] = {}  # user_id → (таймзона, локальная минута)
+        self._local: Dict[str, Dict[int, Set[int]]] = {}  # таймзона → локальная минута → пользователи
+        self._zones: Dict[str, pytz.BaseTzInfo] = {}
+        self._offsets: Dict[str, int] = {}  # таймзона → смещение, по которому разложены её группы
+        self._buckets: Dict[int, Dict[str, Set[int]]] = {}  # UTC минута → таймзона → пользователи
+    
+    def __len__(self) -> int:
+        return len(self._users)
+    
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._users
+    
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._users)
+    
+    def add(self, user_id: int, tz: pytz.BaseTzInfo, reminder_time: time, now: datetime) -> None:
+        """Добавить или перенести напоминание пользователя."""
+        self.remove(user_id)
+        
+        zone = tz.zone
+        minute = reminder_time.hour * 60 + reminder_time.minute
+        if zone not in self._local:
+            self._local[zone] = {}
+            self._zones[zone] = tz
+            self._offsets[zone] = utc_offset_minutes(tz, now)
+        
+        group = self._local[zone].get(minute)
+        if group is None:
+            group = self._local[zone][minute] = set()
+            self._link(zone, minute, group)
+        group.add(user_id)
+        self._users[user_id] = (zone, minute)
+    
+    def remove(self, user_id: int) -> bool:
+        """Удалить напоминание пользователя. False — его не было."""
+        entry = self._users.pop(user_id, None)
+        if entry is None:
+            return False
+        
+        zone, minute = entry
+        group = self._local[zone][minute]
+        group.discard(user_id)
+        if not group:
+            del self._local[zone][minute]
+            self._unlink(zone, minute)
+        if not self._local[zone]:
+            del self._local[zone], self._zones[zone], self._offsets[zone]
+        return True
+    
+    def refresh_offsets(self, now: datetime) -> None:
+        """Переложить группы таймзон, у которых к моменту now сменилось смещение от UTC."""
+        for zone, old_offset in list(self._offsets.items()):
+            new_offset = utc_offset_minutes(self._zones[zone], now)
+            if new_offset == old_offset:
+                continue
+            for minute in self._local[zone]:
+                self._unlink(zone, minute)
+            self._offsets[zone] = new_offset
+            for minute, group in self._local[zone].items():
+                self._link(zone, minute, group)
+            logger.info(f"Timezone {zone} offset changed: {old_offset} → {new_offset} min")
+    
+    def due(self, utc_minute: int) -> List[int]:
+        """Пользователи, у которых напоминание в указанную UTC минуту суток."""
+        bucket = self._buckets.get(utc_minute)
+        if not bucket:
+            return []
+        return [user_id for group in bucket.values() for user_id in group]
+    
+    def _utc_minute(self, zone: str, local_minute: int) -> int:
+        return to_utc_minute(local_minute, self._offsets[zone])
+    
+    def _link(self, zone: str, local_minute: int, group: Set[int]) -> None:
+        self._buckets.setdefault(self._utc_minute(zone, local_minute), {})[zone] = group
+    
+    def _unlink(self, zone: str, local_minute: int) -> None:
+        utc_minute = self._utc_minute(zone, local_minute)
+        bucket = self._buckets[utc_minute]
+        del bucket[zone]
+        if not bucket:
+            del self._buckets[utc_minute]
+
 
 class SchedulerService:
     """Сервис для управления напоминаниями."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        batch_size: int = config.reminder_batch_size,
+        max_catch_up_minutes: int = config.reminder_max_catch_up_minutes,
+        restore_chunk_size: int = config.reminder_restore_chunk_size,
+        shard_count: int = config.scheduler_shards,
+    ):
         # Используем AsyncIOExecutor для правильной работы с async
         executors = {
             'default': AsyncIOExecutor(),
         }
         self.scheduler = AsyncIOScheduler(executors=executors)
+        self.index = ReminderIndex()
+        self._batch_size = batch_size
+        self._max_catch_up_minutes = max_catch_up_minutes
+        self._restore_chunk_size = restore_chunk_size
+        self._shard_count = shard_count
+        # Шарды (user_id % shard_count), напоминания которых ведёт этот процесс; None — все пользователи
+        self._owned: Optional[Set[int]] = None
+        self._restore_task: Optional[asyncio.Task] = None
+        # Пользователи, изменившие напоминание во время восстановления: их строки из БД могли устареть
+        self._restoring = False
+        self._changed_during_restore: Set[int] = set()
+        self._last_minute: Optional[datetime] = None  # Последняя обработанная минута (UTC)
+        # Дополнительные напоминания хранятся в БД (reminder_times), в памяти — только смещения таймзон
+        self._session_factory: Optional[SessionFactory] = None
+        self._zone_offsets: Dict[str, Optional[int]] = {}
+        self._zones_loaded = False
         self._bot: "Bot" = None
-        self._send_reminder_callback: Callable[[int], Awaitable[None]] = None
+        self._send_reminder_callback: Optional[ReminderCallback] = None
     
     def set_bot(self, bot: "Bot") -> None:
         """Установить экземпляр бота."""
         self._bot = bot
     
-    def set_reminder_callback(
-        self, callback: Callable[[int], Awaitable[None]]
-    ) -> None:
-        """Установить callback для отправки напоминания."""
+    def set_reminder_callback(self, callback: ReminderCallback) -> None:
+        """Установить callback для отправки напоминаний пачке пользователей."""
         self._send_reminder_callback = callback
     
+    def set_session_factory(self, session_factory: SessionFactory) -> None:
+        """Установить фабрику сессий для дополнительных напоминаний из таблицы reminder_times."""
+        self._session_factory = session_factory
+    
+    @property
+    def shard_count(self) -> int:
+        """Число шардов (0 — без шардирования)."""
+        return self._shard_count
+    
+    @property
+    def owned_shards(self) -> Optional[Set[int]]:
+        """Шарды этого процесса (None — все пользователи)."""
+        return None if self._owned is None else set(self._owned)
+    
+    def owns(self, user_id: int) -> bool:
+        """Ведёт ли этот процесс напоминание пользователя."""
+        if self._owned is None:
+            return True
+        return bool(self._shard_count) and user_id % self._shard_count in self._owned
+    
+    def assign_shards(self, shards: Optional[Iterable[int]]) -> None:
+        """
+        Задать шарды этого процесса (None — все пользователи, пустой набор — никто).
+        
+        Напоминания пользователей из других шардов удаляются из индекса.
+        """
+        self._owned = None if shards is None else set(shards)
+        removed = [user_id for user_id in self.index if not self.owns(user_id)]
+        for user_id in removed:
+            self.index.remove(user_id)
+        if removed:
+            logger.info(f"Dropped {len(removed)} reminders of shards not owned anymore")
+    
+    async def load_shard(self, shard: int, session_factory: Optional[SessionFactory] = None) -> int:
+        """Взять шард: добавить его к своим и загрузить его напоминания из БД."""
+        self._owned = (self._owned or set()) | {shard}
+        return await self.restore_jobs_from_db(session_factory, shards={shard})
+    
+    def drop_shard(self, shard: int) -> None:
+        """Отдать шард: убрать его напоминания из индекса."""
+        self.assign_shards((self._owned or set()) - {shard})
+    
+    def apply_changes(self, changes: Dict[int, Optional["ReminderEntry"]]) -> int:
+        """
+        Применить изменения из журнала (от процессов, где их сделали пользователи).
+        
+        Args:
+            changes: {user_id: текущее напоминание или None, если его нет}
+        
+        Returns:
+            Число применённых изменений (пользователи чужих шардов пропускаются)
+        """
+        owned = {user_id: entry for user_id, entry in changes.items() if self.owns(user_id)}
+        for user_id, entry in owned.items():
+            if entry is None:
+                self.index.remove(user_id)
+        self.add_reminder_jobs(entry for entry in owned.values() if entry is not None)
+        return len(owned)
+    
     def start(self) -> None:
         """Запустить планировщик."""
         if not self.scheduler.running:
+            self.scheduler.add_job(
+                self._tick,
+                trigger=CronTrigger(second=0, timezone=pytz.utc),
+                id="reminder_tick",
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+                name="Reminder tick",
+            )
             self.scheduler.start()
             logger.info("Scheduler started")
     
     def shutdown(self) -> None:
         """Остановить планировщик."""
+        if self._restore_task is not None and not self._restore_task.done():
+            self._restore_task.cancel()
         if self.scheduler.running:
             self.scheduler.shutdown(wait=False)
             logger.info("Scheduler stopped")
@@ -60,85 +279,239 @@ class SchedulerService:
         timezone: str,
     ) -> None:
         """
-        Добавить или обновить job напоминания для пользователя.
+        Добавить или обновить напоминание для пользователя.
         
         Args:
             user_id: ID пользователя Telegram
             reminder_time: Время напоминания
             timezone: Таймзона пользователя (IANA string)
         """
-        job_id = f"reminder_{user_id}"
-        
-        # Удаляем существующий job если есть
-        self.remove_reminder_job(user_id)
-        
-        try:
-            tz = pytz.timezone(timezone)
-        except pytz.exceptions.UnknownTimeZoneError:
-            logger.warning(f"Unknown timezone {timezone}, using default")
-            tz = pytz.timezone(config.default_timezone)
-        
-        # Создаём trigger для ежедневного запуска в указанное время
-        trigger = CronTrigger(
-            hour=reminder_time.hour,
-            minute=reminder_time.minute,
-            timezone=tz,
-        )
-        
-        # Добавляем job
-        self.scheduler.add_job(
-            self._trigger_reminder,
-            trigger=trigger,
-            id=job_id,
-            args=[user_id],
-            replace_existing=True,
-            name=f"Reminder for user {user_id}",
-        )
-        
+        if not self.owns(user_id):
+            return
+        self._mark_changed(user_id)
+        self.index.add(user_id, resolve_timezone(timezone), reminder_time, datetime.now(pytz.utc))
         logger.info(
             f"Added reminder job for user {user_id} at {reminder_time} ({timezone})"
         )
     
     def remove_reminder_job(self, user_id: int) -> None:
-        """Удалить job напоминания для пользователя."""
-        job_id = f"reminder_{user_id}"
+        """Удалить напоминание пользователя."""
+        self._mark_changed(user_id)
+        if self.index.remove(user_id):
+            logger.info(f"Removed reminder job for user {user_id}")
+    
+    async def _tick(self) -> None:
+        """Обработать наступившие минуты: отправить напоминания всем, у кого они сейчас."""
+        await self.run_due(datetime.now(pytz.utc))
+    
+    async def run_due(self, now: datetime) -> int:
+        """
+        Отправить напоминания за минуты до now включительно, ещё не обработанные.
         
+        Если тик опоздал (event loop был занят), пропущенные минуты догоняются,
+        но не больше max_catch_up_minutes.
+        
+        Returns:
+            Число пользователей, которым отправлялись напоминания
+        """
+        minute = now.replace(second=0, microsecond=0)
+        if self._last_minute is None or minute - self._last_minute > timedelta(
+            minutes=self._max_catch_up_minutes
+        ):
+            self._last_minute = minute - timedelta(minutes=1)
+        
+        minutes = []
+        while self._last_minute < minute:
+            self._last_minute += timedelta(minutes=1)
+            minutes.append(self._last_minute)
+        if not minutes:
+            return 0
+        
+        reminder_times = await self._load_reminder_times(minutes)
+        
+        sent = 0
+        for current in minutes:
+            self.index.refresh_offsets(current)
+            minute_of_day = current.hour * 60 + current.minute
+            # user_id → привычки, о которых напомнить (None — обо всех)
+            targets: Dict[int, Optional[Set[int]]] = dict.fromkeys(self.index.due(minute_of_day))
+            for user_id, habit_id in reminder_times.get(minute_of_day, ()):
+                if user_id in targets and targets[user_id] is None:
+                    continue
+                if habit_id is None:
+                    targets[user_id] = None
+                else:
+                    targets.setdefault(user_id, set()).add(habit_id)
+            
+            if targets:
+                habit_ids = {user_id: habits for user_id, habits in targets.items() if habits is not None}
+                await self._dispatch(list(targets), habit_ids)
+                sent += len(targets)
+        return sent
+    
+    async def _load_reminder_times(
+        self,
+        minutes: List[datetime],
+    ) -> Dict[int, List[Tuple[int, Optional[int]]]]:
+        """
+        Дополнительные напоминания (таблица reminder_times) за минуты minutes —
+        один запрос по индексу utc_minute. Перед запросом пересчитываются
+        напоминания таймзон, у которых сменилось смещение от UTC; список таймзон
+        перечитывается каждые ZONES_RELOAD_MINUTES минут UTC.
+        
+        Returns:
+            {UTC минута суток: [(user_id, habit_id или None)]}
+        """
+        if self._session_factory is None or (self._owned is not None and not self._owned):
+            return {}
+        
+        from bot.database import (
+            get_due_reminder_times,
+            get_reminder_timezones,
+            refresh_reminder_offsets,
+        )
+        
+        now = minutes[-1]
+        first = minutes[0].hour * 60 + minutes[0].minute
+        last = now.hour * 60 + now.minute
         try:
-            self.scheduler.remove_job(job_id)
-            logger.info(f"Removed reminder job for user {user_id}")
-        except Exception:
-            pass  # Job не существует
+            async with self._session_factory() as session:
+                if not self._zones_loaded or any(m.minute % ZONES_RELOAD_MINUTES == 0 for m in minutes):
+                    # Новые таймзоны (None) пересчитываются сразу: смещение могло смениться, пока бот стоял
+                    zones = await get_reminder_timezones(session)
+                    self._zone_offsets = {zone: self._zone_offsets.get(zone) for zone in zones}
+                    self._zones_loaded = True
+                
+                changed = {}
+                for zone, applied in self._zone_offsets.items():
+                    offset = utc_offset_minutes(resolve_timezone(zone), now)
+                    if offset != applied:
+                        changed[zone] = offset
+                if changed:
+                    updated = await refresh_reminder_offsets(session, changed)
+                    self._zone_offsets.update(changed)
+                    if updated:
+                        logger.info(f"Moved {updated} reminder times to new UTC offsets")
+                
+                rows = await get_due_reminder_times(session, first, last, self._shard_count, self._owned)
+        except Exception as e:
+            logger.error(f"Failed to load reminder times: {e}")
+            return {}
+        
+        grouped: Dict[int, List[Tuple[int, Optional[int]]]] = {}
+        for row in rows:
+            grouped.setdefault(row.utc_minute, []).append((row.user_id, row.habit_id))
+        return grouped
     
-    async def _trigger_reminder(self, user_id: int) -> None:
-        """Триггер напоминания — вызывает callback."""
-        if self._send_reminder_callback:
+    async def _dispatch(self, user_ids: Sequence[int], habit_ids: Dict[int, Set[int]]) -> None:
+        """Передать пользователей в callback пачками по batch_size."""
+        if self._send_reminder_callback is None:
+            logger.warning("Reminder callback not set")
+            return
+        
+        for start in range(0, len(user_ids), self._batch_size):
+            batch = list(user_ids[start:start + self._batch_size])
             try:
-                await self._send_reminder_callback(user_id)
-                logger.info(f"Sent reminder to user {user_id}")
+                await self._send_reminder_callback(
+                    batch, {user_id: habit_ids[user_id] for user_id in batch if user_id in habit_ids}
+                )
             except Exception as e:
-                logger.error(f"Failed to send reminder to user {user_id}: {e}")
-        else:
-            logger.warning("Reminder callback not set")
+                logger.error(f"Failed to send reminders to {len(batch)} users: {e}")
+            # Отдаём управление event loop между пачками
+            await asyncio.sleep(0)
+        
+        logger.info(f"Dispatched reminders to {len(user_ids)} users")
     
-    async def restore_jobs_from_db(self) -> None:
+    def add_reminder_jobs(self, entries: Iterable["ReminderEntry"]) -> int:
+        """
+        Добавить напоминания пачкой (при восстановлении): без лога на каждого пользователя,
+        таймзоны разрешаются один раз на пачку.
+        
+        Пользователи, изменившие напоминание во время восстановления, пропускаются.
+        
+        Returns:
+            Число добавленных напоминаний
         """
-        Восстановить все jobs из базы данных при старте.
-        Должен вызываться после инициализации БД и установки callback.
+        now = datetime.now(pytz.utc)
+        zones: Dict[str, pytz.BaseTzInfo] = {}
+        added = 0
+        for entry in entries:
+            if entry.user_id in self._changed_during_restore:
+                continue
+            tz = zones.get(entry.timezone)
+            if tz is None:
+                tz = zones[entry.timezone] = resolve_timezone(entry.timezone)
+            self.index.add(entry.user_id, tz, entry.reminder_time, now)
+            added += 1
+        return added
+    
+    def start_restore(self, session_factory: Optional[SessionFactory] = None) -> asyncio.Task:
+        """Запустить восстановление напоминаний из БД в фоне (не задерживая старт polling)."""
+        self._restoring = True
+        self._restore_task = asyncio.create_task(
+            self.restore_jobs_from_db(session_factory), name="reminder-restore"
+        )
+        return self._restore_task
+    
+    async def restore_jobs_from_db(
+        self,
+        session_factory: Optional[SessionFactory] = None,
+        shards: Optional[Set[int]] = None,
+    ) -> int:
         """
-        from bot.database import get_session, get_all_users_with_reminders
+        Восстановить все напоминания из базы данных при старте.
         
-        async with get_session() as session:
-            users = await get_all_users_with_reminders(session)
-            
-            for user in users:
-                if user.reminder_time:
-                    self.add_reminder_job(
-                        user_id=user.id,
-                        reminder_time=user.reminder_time,
-                        timezone=user.timezone,
+        Пользователи читаются потоково пачками по restore_chunk_size; между пачками
+        управление возвращается event loop, прогресс пишется в лог.
+        
+        Args:
+            shards: Загрузить только эти шарды (по умолчанию — шарды этого процесса)
+        
+        Returns:
+            Число восстановленных напоминаний
+        """
+        from bot.database import get_readonly_session, iter_reminder_entries
+        
+        session_factory = session_factory or get_readonly_session
+        if shards is None:
+            shards = self._owned
+        if shards is not None and not shards:
+            return 0  # Процесс не ведёт ни одного шарда
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        restored = 0
+        self._restoring = True
+        
+        try:
+            async with session_factory() as session:
+                async for chunk in iter_reminder_entries(
+                    session, self._restore_chunk_size, self._shard_count, shards
+                ):
+                    restored += self.add_reminder_jobs(chunk)
+                    logger.info(
+                        f"Restoring reminders: {restored} restored "
+                        f"({loop.time() - started:.1f}s)"
                     )
-            
-            logger.info(f"Restored {len(users)} reminder jobs from database")
+                    await asyncio.sleep(0)
+        except asyncio.CancelledError:
+            logger.warning(f"Reminder restore cancelled after {restored} reminders")
+            raise
+        except Exception as e:
+            logger.error(f"Reminder restore failed after {restored} reminders: {e}")
+            raise
+        finally:
+            self._restoring = False
+            self._changed_during_restore.clear()
+        
+        logger.info(
+            f"Restored {restored} reminder jobs from database in {loop.time() - started:.2f}s"
+        )
+        return restored
+    
+    def _mark_changed(self, user_id: int) -> None:
+        """Запомнить изменение, чтобы восстановление не перезаписало его данными из БД."""
+        if self._restoring:
+            self._changed_during_restore.add(user_id)
 
 
 # Глобальный экземпляр сервиса
@@ -0,0 +1,232 @@
+"""
+Координация шардов планировщика напоминаний между процессами.
+
+Пользователи разбиты на N шардов по user_id % N. Каждый воркер (bot/worker.py
+или процесс бота со включённым шардированием) держит аренду своего домашнего
+шарда в таблице scheduler_leases и продлевает её каждые poll_interval секунд.
+Шард, аренда которого истекла (воркер упал), забирает любой живой воркер;
+когда домашний воркер возвращается, он просит вернуть шард, и временный
+владелец отдаёт его при следующем продлении. Изменения напоминаний, сделанные
+в других процессах, дочитываются из журнала reminder_changes.
+"""
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set
+
+import pytz
+
+from bot.config import config
+from bot.services.scheduler import SchedulerService, SessionFactory, scheduler_service
+
+logger = logging.getLogger(__name__)
+
+# Сколько хранить журнал изменений напоминаний
+CHANGES_RETENTION = timedelta(days=1)
+
+
+def default_owner() -> str:
+    """Имя воркера в таблице аренд: хост и PID процесса."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def utc_now() -> datetime:
+    """Текущее время UTC без tzinfo (как хранится в БД)."""
+    return datetime.now(pytz.utc).replace(tzinfo=None)
+
+
+class ShardCoordinator:
+    """Аренда шардов планировщика и синхронизация изменений напоминаний."""
+    
+    def __init__(
+        self,
+        scheduler: SchedulerService,
+        shard_count: int = config.scheduler_shards,
+        home_shard: Optional[int] = config.scheduler_shard,
+        owner: Optional[str] = None,
+        lease_ttl: float = config.scheduler_lease_ttl,
+        poll_interval: float = config.scheduler_poll_interval,
+    ):
+        if home_shard is not None and not 0 <= home_shard < shard_count:
+            raise ValueError(f"Home shard {home_shard} is out of range 0..{shard_count - 1}")
+        self.scheduler = scheduler
+        self.shard_count = shard_count
+        self.home_shard = home_shard
+        self.owner = owner or default_owner()
+        self.lease_ttl = timedelta(seconds=lease_ttl)
+        self.poll_interval = poll_interval
+        self._owned: Set[int] = set()
+        self._lease_expires: Dict[int, datetime] = {}  # Шард → до какого момента мы его держим
+        self._change_id: Optional[int] = None  # До какой записи прочитан журнал изменений
+        self._takeover_after: Optional[datetime] = None
+        self._next_prune: Optional[datetime] = None
+        self._session_factory: Optional[SessionFactory] = None
+        self._readonly_factory: Optional[SessionFactory] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def owned_shards(self) -> Set[int]:
+        """Шарды, которые сейчас ведёт этот воркер."""
+        return set(self._owned)
+    
+    def start(self, session_factory: Optional[SessionFactory] = None) -> asyncio.Task:
+        """Запустить цикл аренды в фоне."""
+        self.scheduler.assign_shards(())
+        self._task = asyncio.create_task(self._run(session_factory), name="shard-coordinator")
+        logger.info(
+            f"Shard coordinator started: {self.owner}, home shard {self.home_shard} "
+            f"of {self.shard_count}"
+        )
+        return self._task
+    
+    async def stop(self, session_factory: Optional[SessionFactory] = None) -> None:
+        """Остановить цикл и отдать шарды, чтобы их сразу забрали другие воркеры."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if not self._owned:
+            return
+        
+        from bot.database import release_shard_lease
+        
+        self._resolve_factories(session_factory)
+        try:
+            async with self._session_factory() as session:
+                for shard in self._owned:
+                    await release_shard_lease(session, shard, self.owner)
+        except Exception as e:
+            logger.error(f"Failed to release shards {sorted(self._owned)}: {e}")
+        for shard in list(self._owned):
+            self._drop(shard)
+        logger.info("Shard coordinator stopped")
+    
+    async def run_once(
+        self,
+        now: Optional[datetime] = None,
+        session_factory: Optional[SessionFactory] = None,
+    ) -> Set[int]:
+        """
+        Один шаг координации: продлить или взять аренды, отдать лишние шарды,
+        загрузить новые и применить журнал изменений.
+        
+        Args:
+            now: Текущее время UTC без tzinfo
+        
+        Returns:
+            Шарды этого воркера после шага
+        """
+        from bot.database import (
+            claim_shard_lease,
+            get_last_reminder_change_id,
+            get_reminder_changes,
+            get_shard_leases,
+            prune_reminder_changes,
+            release_shard_lease,
+            request_shard_handoff,
+        )
+        
+        now = now or utc_now()
+        self._resolve_factories(session_factory)
+        if self._takeover_after is None:
+            # Даём домашним воркерам время взять свои шарды, прежде чем забирать чужие
+            self._takeover_after = now + self.lease_ttl
+        if self._change_id is None:
+            # Запоминаем позицию журнала до загрузки шардов: изменения после неё применятся повторно
+            async with self._readonly_factory() as session:
+                self._change_id = await get_last_reminder_change_id(session)
+        
+        claimed: Set[int] = set()
+        async with self._session_factory() as session:
+            leases = {lease.shard: lease for lease in await get_shard_leases(session)}
+            wanted = []
+            for shard in range(self.shard_count):
+                lease = leases.get(shard)
+                mine = lease is not None and lease.owner == self.owner
+                free = lease is None or lease.expires_at <= now
+                
+                if shard == self.home_shard:
+                    if mine or free:
+                        wanted.append(shard)
+                    elif lease.handoff_to != self.owner:
+                        await request_shard_handoff(session, shard, self.owner)
+                        logger.info(f"Requested handoff of home shard {shard} from {lease.owner}")
+                elif mine:
+                    if lease.handoff_to is not None and not free:
+                        # Домашний воркер шарда вернулся
+                        await release_shard_lease(session, shard, self.owner)
+                        logger.info(f"Handing shard {shard} back to {lease.handoff_to}")
+                    else:
+                        wanted.append(shard)
+                elif free and now >= self._takeover_after:
+                    wanted.append(shard)
+            
+            for shard in wanted:
+                if await claim_shard_lease(session, shard, self.owner, now, self.lease_ttl):
+                    claimed.add(shard)
+            
+            if 0 in claimed and (self._next_prune is None or now >= self._next_prune):
+                pruned = await prune_reminder_changes(session, now - CHANGES_RETENTION)
+                self._next_prune = now + timedelta(hours=1)
+                if pruned:
+                    logger.info(f"Pruned {pruned} reminder changes")
+        
+        for shard in self._owned - claimed:
+            logger.warning(f"Lost shard {shard}")
+            self._drop(shard)
+        for shard in sorted(claimed - self._owned):
+            # Сначала отмечаем шард своим: если загрузка прервётся, следующий шаг его отдаст
+            self._owned.add(shard)
+            taken_over = "" if shard == self.home_shard else " (taken over)"
+            restored = await self.scheduler.load_shard(shard, self._readonly_factory)
+            logger.info(f"Acquired shard {shard}{taken_over}: {restored} reminders")
+        for shard in claimed:
+            self._lease_expires[shard] = now + self.lease_ttl
+        
+        async with self._readonly_factory() as session:
+            self._change_id, changes = await get_reminder_changes(
+                session, self._change_id, self.shard_count, self._owned
+            )
+        if changes:
+            self.scheduler.apply_changes(changes)
+        
+        return self.owned_shards
+    
+    def expire_leases(self, now: datetime) -> None:
+        """Перестать вести шарды, аренду которых не удалось продлить вовремя (БД недоступна)."""
+        for shard in list(self._owned):
+            if self._lease_expires.get(shard, now) <= now:
+                logger.warning(f"Lease of shard {shard} expired without renewal")
+                self._drop(shard)
+    
+    async def _run(self, session_factory: Optional[SessionFactory]) -> None:
+        """Цикл координации."""
+        while True:
+            try:
+                await self.run_once(session_factory=session_factory)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Shard coordination failed: {e}")
+                self.expire_leases(utc_now())
+            await asyncio.sleep(self.poll_interval)
+    
+    def _drop(self, shard: int) -> None:
+        self._owned.discard(shard)
+        self._lease_expires.pop(shard, None)
+        self.scheduler.drop_shard(shard)
+    
+    def _resolve_factories(self, session_factory: Optional[SessionFactory]) -> None:
+        if session_factory is not None:
+            self._session_factory = self._readonly_factory = session_factory
+        elif self._session_factory is None:
+            from bot.database import get_readonly_session, get_session
+            
+            self._session_factory = get_session
+            self._readonly_factory = get_readonly_session
+
+
+# Глобальный экземпляр координатора (используется при SCHEDULER_SHARDS > 0)
+shard_coordinator = ShardCoordinator(scheduler_service)
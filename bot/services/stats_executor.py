@@ -0,0 +1,121 @@
+"""
+Расчёт статистики вне event loop.
+
+Расчёт streak по длинной истории — чистая CPU-работа: в обработчике aiogram
+она блокирует единственный event loop, а вместе с ним polling, планировщик
+и обновления остальных пользователей. Пул принимает только простые данные
+(LogColumns/LogBatch, enum'ы, даты), поэтому подходит и пул процессов.
+Короткие истории считаются сразу: пересылка в пул дороже самого расчёта.
+"""
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date
+from functools import partial
+from typing import Callable, List, Optional, Sequence, TypeVar, Union
+
+from bot.config import config
+from bot.database.columns import DoneCounters, LogBatch, LogColumns
+from bot.database.models import ScheduleType
+from bot.services.batch_stats import compute_batch_stats
+from bot.services.streak import HabitStats, get_habit_stats_columns
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+EXECUTOR_MODES = ("thread", "process")
+
+
+class StatsExecutor:
+    """Пул для расчёта статистики с ограничением числа одновременных задач."""
+
+    def __init__(
+        self,
+        mode: str = config.stats_executor,
+        max_workers: int = config.stats_workers,
+        max_jobs: int = config.stats_max_jobs,
+        inline_max_logs: int = config.stats_inline_max_logs,
+    ):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Неизвестный режим пула статистики: {mode}")
+        self.mode = mode
+        self._max_workers = max_workers
+        self._max_jobs = max_jobs
+        self._inline_max_logs = inline_max_logs
+        self._pool: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.jobs_inline = 0
+        self.jobs_offloaded = 0
+
+    @property
+    def running(self) -> bool:
+        """Запущен ли пул."""
+        return self._pool is not None
+
+    def start(self) -> None:
+        """Создать пул."""
+        if self.running:
+            return
+        if self.mode == "process":
+            self._pool = ProcessPoolExecutor(max_workers=self._max_workers)
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="stats")
+        self._slots = asyncio.Semaphore(self._max_jobs)
+        logger.info(f"Stats executor started: {self.mode} pool, {self._max_workers} workers")
+
+    async def stop(self) -> None:
+        """Дождаться текущих расчётов и остановить пул."""
+        if not self.running:
+            return
+        pool, self._pool = self._pool, None
+        await asyncio.to_thread(pool.shutdown)
+        logger.info(
+            f"Stats executor stopped: {self.jobs_offloaded} jobs in pool, "
+            f"{self.jobs_inline} inline"
+        )
+
+    async def compute(
+        self,
+        columns: LogColumns,
+        schedule_type: ScheduleType,
+        weekly_target: int,
+        today: date,
+        done_counters: Optional[DoneCounters] = None,
+    ) -> HabitStats:
+        """Статистика одной привычки (см. get_habit_stats_columns)."""
+        return await self._run(
+            len(columns),
+            partial(get_habit_stats_columns, columns, schedule_type, weekly_target, today, done_counters),
+        )
+
+    async def compute_batch(
+        self,
+        batch: LogBatch,
+        schedule_types: Sequence[ScheduleType],
+        weekly_targets: Sequence[int],
+        today: Union[date, Sequence[date]],
+    ) -> List[HabitStats]:
+        """Статистика всех привычек пакета (см. compute_batch_stats)."""
+        return await self._run(
+            len(batch.dates),
+            partial(compute_batch_stats, batch, schedule_types, weekly_targets, today),
+        )
+
+    async def _run(self, size: int, job: Callable[[], T]) -> T:
+        """Выполнить задачу в пуле или сразу, если пул не запущен или вход маленький."""
+        if not self.running or size <= self._inline_max_logs:
+            self.jobs_inline += 1
+            return job()
+
+        async with self._slots:
+            # Пул мог быть остановлен, пока задача ждала слот
+            if not self.running:
+                self.jobs_inline += 1
+                return job()
+            self.jobs_offloaded += 1
+            return await asyncio.get_running_loop().run_in_executor(self._pool, job)
+
+
+# Глобальный экземпляр пула
+stats_executor = StatsExecutor()
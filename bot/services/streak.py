@@ -5,11 +5,15 @@
 - Daily: streak увеличивается, если сегодня done. Если вчера not_done — сброс. skipped не сбрасывает.
 - Weekly N: неделя успешна, если done >= N. streak = успешные недели подряд. skipped не штрафует.
 """
+from array import array
 from dataclasses import dataclass
-from datetime import date, timedelta
-from typing import Dict, List, Sequence
+from datetime import date
+from typing import Optional, Sequence
 
-from bot.database.models import HabitLog, LogStatus, ScheduleType
+from bot.database.columns import STATUS_DONE, STATUS_NOT_DONE, STATUS_SKIPPED, DoneCounters, LogColumns
+from bot.database.models import HabitLog, HabitStreakSummary, ScheduleType
+from bot.database.summary import summary_current_streak
+from bot.services.done_index import DoneIndex
 
 
 @dataclass
@@ -26,6 +30,8 @@ def calculate_daily_streak(logs: Sequence[HabitLog], today: date) -> tuple[int,
     """
     Рассчитать текущий и лучший streak для daily привычки.
     
+    Адаптер над calculate_daily_streak_columns для ORM-логов.
+    
     Args:
         logs: Список логов привычки (отсортированный по дате)
         today: Текущая дата в TZ пользователя
@@ -33,82 +39,99 @@ def calculate_daily_streak(logs: Sequence[HabitLog], today: date) -> tuple[int,
     Returns:
         (current_streak, best_streak)
     """
-    if not logs:
+    return calculate_daily_streak_columns(LogColumns.from_logs(logs), today)
+
+
+def calculate_daily_streak_columns(columns: LogColumns, today: date) -> tuple[int, int]:
+    """
+    Рассчитать текущий и лучший streak для daily привычки по колоночной истории.
+    
+    Один проход по логам в каждую сторону, O(количество логов) независимо от
+    длины пропусков между ними. Отсортированный вход не копируется.
+    
+    Args:
+        columns: История привычки (порядковые номера дат и коды статусов)
+        today: Текущая дата в TZ пользователя
+    
+    Returns:
+        (current_streak, best_streak)
+    """
+    if not columns:
         return 0, 0
     
-    # Преобразуем в dict для быстрого доступа
-    log_by_date: Dict[date, LogStatus] = {log.date: log.status for log in logs}
+    if not columns.is_sorted():
+        columns = columns.sorted()  # Устойчивая сортировка
     
-    current_streak = 0
-    best_streak = 0
-    streak = 0
+    dates = columns.dates
+    statuses = columns.statuses
+    today_ordinal = today.toordinal()
     
-    # Идём от сегодня назад
-    check_date = today
+    # Текущий streak: идём от сегодня назад по отсортированным логам.
+    # Среди логов за одну дату учитывается последний — как при построении dict по дате
+    current_streak = 0
+    check = today_ordinal
+    i = len(dates) - 1
+    while i >= 0 and dates[i] > check:
+        i -= 1  # Логи после сегодняшнего дня не учитываются
     
-    # Проверяем текущий streak
     while True:
-        status = log_by_date.get(check_date)
+        status = statuses[i] if i >= 0 and dates[i] == check else 0
         
-        if status == LogStatus.DONE:
-            streak += 1
-            check_date -= timedelta(days=1)
-        elif status == LogStatus.SKIPPED:
+        if status == STATUS_DONE:
+            current_streak += 1
+        elif status == STATUS_SKIPPED:
             # Skipped не ломает streak, продолжаем проверять
-            check_date -= timedelta(days=1)
-        elif status == LogStatus.NOT_DONE:
+            pass
+        elif status == STATUS_NOT_DONE:
             # Not done — сброс
             break
-        else:
+        elif check < today_ordinal:
             # Нет записи — если это не сегодня, считаем что не делали
-            if check_date < today:
-                break
-            # Сегодня ещё не отметили — проверяем вчера
-            check_date -= timedelta(days=1)
-    
-    current_streak = streak
+            break
+        
+        # Сегодня ещё не отметили или день засчитан — проверяем предыдущий
+        check -= 1
+        while i >= 0 and dates[i] > check:
+            i -= 1
     
-    # Рассчитываем лучший streak по всем логам
-    sorted_logs = sorted(logs, key=lambda x: x.date)
+    # Лучший streak: один проход вперёд. prev — порядковый номер последнего done/skipped
+    # дня серии, поэтому пропуски, закрытые skipped, сводятся к сравнению prev + 1
+    # (дней без записи между prev и следующим логом быть не может)
+    best_streak = 0
     streak = 0
-    prev_date = None
+    prev = None
     
-    for log in sorted_logs:
-        if log.status == LogStatus.DONE:
-            if prev_date is None:
+    for ordinal, status in zip(dates, statuses):
+        if status == STATUS_DONE:
+            if prev is None or ordinal > prev + 1:
                 streak = 1
-            elif log.date == prev_date + timedelta(days=1):
+            elif ordinal == prev + 1:
                 streak += 1
-            elif log.date == prev_date:
-                pass  # Та же дата
-            else:
-                # Проверяем, были ли пропущенные дни только skipped
-                gap_ok = True
-                for i in range(1, (log.date - prev_date).days):
-                    gap_date = prev_date + timedelta(days=i)
-                    gap_status = log_by_date.get(gap_date)
-                    if gap_status != LogStatus.SKIPPED:
-                        gap_ok = False
-                        break
-                
-                if gap_ok:
-                    streak += 1
-                else:
-                    streak = 1
+            # ordinal == prev — та же дата
             
-            prev_date = log.date
-            best_streak = max(best_streak, streak)
-        elif log.status == LogStatus.SKIPPED:
+            prev = ordinal
+            if streak > best_streak:
+                best_streak = streak
+        elif status == STATUS_SKIPPED:
             # Skipped не прерывает серию, но и не увеличивает
-            if prev_date is not None:
-                prev_date = log.date
+            if prev is not None:
+                prev = ordinal
         else:  # NOT_DONE
             streak = 0
-            prev_date = None
+            prev = None
     
     return current_streak, best_streak
 
 
+def week_ordinal(day: date) -> int:
+    """
+    Порядковый номер ISO недели: количество недель от понедельника 0001-01-01.
+    
+    Соседние ISO недели (в том числе через границу года и неделю 53) отличаются на 1.
+    """
+    return (day.toordinal() - 1) // 7
+
+
 def calculate_weekly_streak(
     logs: Sequence[HabitLog],
     weekly_target: int,
@@ -117,6 +140,8 @@ def calculate_weekly_streak(
     """
     Рассчитать текущий и лучший streak для weekly привычки.
     
+    Адаптер над calculate_weekly_streak_columns для ORM-логов.
+    
     Args:
         logs: Список логов привычки
         weekly_target: Сколько раз в неделю нужно выполнить
@@ -125,57 +150,64 @@ def calculate_weekly_streak(
     Returns:
         (current_streak, best_streak)
     """
-    if not logs:
-        return 0, 0
+    return calculate_weekly_streak_columns(LogColumns.from_logs(logs), weekly_target, today)
+
+
+def calculate_weekly_streak_columns(
+    columns: LogColumns,
+    weekly_target: int,
+    today: date,
+) -> tuple[int, int]:
+    """
+    Рассчитать текущий и лучший streak для weekly привычки по колоночной истории.
+    
+    Логи раскладываются по номерам недель (week_ordinal) в плоский массив
+    количеств done: -1 — в неделе нет логов, иначе число done. Текущий и
+    лучший streak — линейные проходы по массиву. Порядок логов не важен.
     
-    # Группируем по неделям (ISO неделя)
-    weeks: Dict[tuple, List[LogStatus]] = {}
+    Args:
+        columns: История привычки (порядковые номера дат и коды статусов)
+        weekly_target: Сколько раз в неделю нужно выполнить
+        today: Текущая дата в TZ пользователя
     
-    for log in logs:
-        week_key = (log.date.isocalendar()[0], log.date.isocalendar()[1])
-        if week_key not in weeks:
-            weeks[week_key] = []
-        weeks[week_key].append(log.status)
+    Returns:
+        (current_streak, best_streak)
+    """
+    if not columns:
+        return 0, 0
     
-    # Проверяем, успешна ли неделя
-    def is_week_success(statuses: List[LogStatus]) -> bool:
-        done_count = sum(1 for s in statuses if s == LogStatus.DONE)
-        return done_count >= weekly_target
+    # week_ordinal через порядковый номер даты без построения date
+    weeks = [(ordinal - 1) // 7 for ordinal in columns.dates]
+    first_week = min(weeks)
+    current_week = week_ordinal(today)
+    last_week = max(max(weeks), current_week)
     
-    # Получаем все недели в порядке
-    sorted_weeks = sorted(weeks.keys())
+    done_counts = array("i", [-1]) * (last_week - first_week + 1)
+    for week, status in zip(weeks, columns.statuses):
+        index = week - first_week
+        if done_counts[index] < 0:
+            done_counts[index] = 0
+        if status == STATUS_DONE:
+            done_counts[index] += 1
     
-    if not sorted_weeks:
-        return 0, 0
+    # Неделя успешна, если в ней есть логи и done >= weekly_target
+    threshold = max(weekly_target, 0)
     
-    # Рассчитываем текущий streak (идём от текущей недели назад)
+    # Текущий streak: от текущей недели назад
     current_streak = 0
-    current_week = (today.isocalendar()[0], today.isocalendar()[1])
+    index = current_week - first_week
+    while index >= 0 and done_counts[index] >= threshold:
+        current_streak += 1
+        index -= 1
     
-    check_week = current_week
-    while check_week in weeks:
-        if is_week_success(weeks[check_week]):
-            current_streak += 1
-            check_week = get_previous_week(check_week)
-        else:
-            break
-    
-    # Рассчитываем лучший streak (последовательные успешные недели)
+    # Лучший streak: успешные недели подряд
     best_streak = 0
     streak = 0
-    
-    for i, week in enumerate(sorted_weeks):
-        if is_week_success(weeks[week]):
-            if i == 0:
-                streak = 1
-            else:
-                prev_week = sorted_weeks[i - 1]
-                expected_prev = get_previous_week(week)
-                if prev_week == expected_prev and is_week_success(weeks[prev_week]):
-                    streak += 1
-                else:
-                    streak = 1
-            best_streak = max(best_streak, streak)
+    for count in done_counts:
+        if count >= threshold:
+            streak += 1
+            if streak > best_streak:
+                best_streak = streak
         else:
             streak = 0
     
@@ -188,18 +220,19 @@ def get_previous_week(week: tuple) -> tuple:
     if week_num == 1:
         # Последняя неделя предыдущего года
         prev_year = year - 1
-        # Получаем последнюю неделю года
-        last_day = date(prev_year, 12, 31)
-        return (prev_year, last_day.isocalendar()[1])
+        # 28 декабря всегда попадает в последнюю ISO неделю года
+        # (31 декабря может уже относиться к неделе 1 следующего года)
+        last_week_day = date(prev_year, 12, 28)
+        return (prev_year, last_week_day.isocalendar()[1])
     return (year, week_num - 1)
 
 
 def get_next_week(week: tuple) -> tuple:
     """Получить следующую ISO неделю."""
     year, week_num = week
-    # Получаем последнюю неделю года
-    last_day = date(year, 12, 31)
-    max_week = last_day.isocalendar()[1]
+    # 28 декабря всегда попадает в последнюю ISO неделю года
+    last_week_day = date(year, 12, 28)
+    max_week = last_week_day.isocalendar()[1]
     
     if week_num >= max_week:
         return (year + 1, 1)
@@ -211,42 +244,91 @@ def get_habit_stats(
     schedule_type: ScheduleType,
     weekly_target: int,
     today: date,
+    done_counters: Optional[DoneCounters] = None,
 ) -> HabitStats:
     """
     Получить полную статистику привычки.
     
+    Адаптер над get_habit_stats_columns для ORM-логов.
+    
     Args:
         logs: Список логов привычки
         schedule_type: Тип расписания (daily/weekly)
         weekly_target: Цель для weekly (игнорируется для daily)
         today: Текущая дата в TZ пользователя
+        done_counters: Счётчики done, посчитанные в БД. Если переданы,
+            логи нужны только для streak и повторно не перебираются
     
     Returns:
         HabitStats с текущим streak, лучшим streak, done за 7/30 дней
     """
+    return get_habit_stats_columns(
+        LogColumns.from_logs(logs), schedule_type, weekly_target, today, done_counters
+    )
+
+
+def get_habit_stats_columns(
+    columns: LogColumns,
+    schedule_type: ScheduleType,
+    weekly_target: int,
+    today: date,
+    done_counters: Optional[DoneCounters] = None,
+) -> HabitStats:
+    """
+    Получить полную статистику привычки по колоночной истории.
+    
+    Args:
+        columns: История привычки (порядковые номера дат и коды статусов)
+        schedule_type: Тип расписания (daily/weekly)
+        weekly_target: Цель для weekly (игнорируется для daily)
+        today: Текущая дата в TZ пользователя
+        done_counters: Счётчики done, посчитанные в БД
+    
+    Returns:
+        HabitStats с текущим streak, лучшим streak и done за 7/30 дней
+        (без done_counters — по индексу префиксных сумм DoneIndex)
+    """
     if schedule_type == ScheduleType.DAILY:
-        current_streak, best_streak = calculate_daily_streak(logs, today)
+        current_streak, best_streak = calculate_daily_streak_columns(columns, today)
     else:
-        current_streak, best_streak = calculate_weekly_streak(logs, weekly_target, today)
-    
-    # Считаем done за 7 и 30 дней
-    done_7_days = 0
-    done_30_days = 0
-    total_done = 0
-    
-    for log in logs:
-        if log.status == LogStatus.DONE:
-            total_done += 1
-            days_ago = (today - log.date).days
-            if days_ago <= 7:
-                done_7_days += 1
-            if days_ago <= 30:
-                done_30_days += 1
+        current_streak, best_streak = calculate_weekly_streak_columns(
+            columns, weekly_target, today
+        )
+    
+    if done_counters is None:
+        done_index = DoneIndex.from_columns(columns)
+        done_counters = DoneCounters(
+            done_7_days=done_index.last_days(7, today),
+            done_30_days=done_index.last_days(30, today),
+            total_done=done_index.total,
+        )
     
     return HabitStats(
         current_streak=current_streak,
         best_streak=best_streak,
-        done_7_days=done_7_days,
-        done_30_days=done_30_days,
-        total_done=total_done,
+        done_7_days=done_counters.done_7_days,
+        done_30_days=done_counters.done_30_days,
+        total_done=done_counters.total_done,
+    )
+
+
+def get_habit_stats_from_summary(
+    summary: HabitStreakSummary,
+    done_counters: DoneCounters,
+    today: date,
+) -> HabitStats:
+    """
+    Получить статистику привычки из сводки streak без чтения истории.
+    
+    Args:
+        summary: Сводка streak, поддерживаемая при записи логов
+        done_counters: Счётчики done за 7/30 дней, посчитанные в БД
+        today: Текущая дата в TZ пользователя (не раньше summary.last_date)
+    """
+    return HabitStats(
+        current_streak=summary_current_streak(summary, today),
+        best_streak=summary.best_streak,
+        done_7_days=done_counters.done_7_days,
+        done_30_days=done_counters.done_30_days,
+        total_done=summary.total_done,
     )
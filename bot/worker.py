@@ -0,0 +1,70 @@
+"""
+Воркер планировщика напоминаний (шардированный режим, без polling).
+
+Каждый воркер ведёт пользователей своего шарда (user_id % SCHEDULER_SHARDS)
+и забирает шарды упавших воркеров:
+
+    SCHEDULER_SHARDS=4 SCHEDULER_SHARD=0 python bot/worker.py
+    ...
+    SCHEDULER_SHARDS=4 SCHEDULER_SHARD=3 python bot/worker.py
+    SCHEDULER_SHARDS=4 SCHEDULER_ENABLED=false python bot/main.py
+"""
+import asyncio
+import logging
+import signal
+import sys
+from pathlib import Path
+
+# Добавляем родительскую директорию в путь для импортов
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.enums import ParseMode
+
+from bot.config import config
+from bot.database import init_db
+from bot.services.reminders import start_reminders, stop_reminders
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[
+        logging.StreamHandler(),
+    ],
+)
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    """Запустить воркер и работать до SIGINT/SIGTERM."""
+    if not config.scheduler_shards:
+        logger.error("SCHEDULER_SHARDS не задан: без шардирования напоминания шлёт процесс бота")
+        sys.exit(1)
+    
+    bot = Bot(
+        token=config.bot_token,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    
+    await init_db()
+    await start_reminders(bot, enabled=True)
+    logger.info("Reminder worker started")
+    
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Reminder worker stopping...")
+        await stop_reminders()
+        await bot.session.close()
+        logger.info("Reminder worker stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
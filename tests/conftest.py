@@ -1,11 +1,57 @@
 """
 Pytest fixtures и конфигурация.
 """
+import os
+
 import pytest
 
+# bot.config требует токен при импорте; для тестов достаточно заглушки
+os.environ.setdefault("BOT_TOKEN", "test-token")
+
 
 @pytest.fixture
 def sample_date():
     """Образец даты для тестов."""
     from datetime import date
     return date(2024, 1, 15)
+
+
+@pytest.fixture
+async def session_factory():
+    """Фабрика сессий (как get_session) на отдельной in-memory SQLite БД со всеми таблицами."""
+    from contextlib import asynccontextmanager
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from bot.database.cache import habit_list_cache, habit_stats_cache, user_cache
+    from bot.database.models import Base
+    
+    # Кэши глобальные, а БД у каждого теста своя
+    user_cache.clear()
+    habit_list_cache.clear()
+    habit_stats_cache.clear()
+    
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    
+    @asynccontextmanager
+    async def get_test_session():
+        async with factory() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+    
+    yield get_test_session
+    
+    await engine.dispose()
+
+
+@pytest.fixture
+async def session(session_factory):
+    """Сессия на отдельной in-memory SQLite БД со всеми таблицами."""
+    async with session_factory() as session:
+        yield session
@@ -0,0 +1,87 @@
+"""
+Тесты пакетного расчёта статистики.
+"""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+
+def random_batch(rng, habits):
+    """Случайный пакет историй: пустые, неотсортированные, с дублями дат и логами после today."""
+    from bot.database.columns import LogBatch, LogColumns
+    from bot.database.models import ScheduleType
+
+    histories, schedule_types, weekly_targets, todays = [], [], [], []
+    for _ in range(habits):
+        start = date(2024, 12, 1) + timedelta(days=rng.randint(0, 30))
+        columns = LogColumns()
+        for _ in range(rng.choice([0, 1, 5, 40, 120])):
+            columns.append(
+                (start + timedelta(days=rng.randint(0, 90))).toordinal(),
+                rng.choice([1, 1, 1, 2, 3]),
+            )
+        if rng.random() < 0.7:
+            columns = columns.sorted()
+
+        histories.append(columns)
+        schedule_types.append(rng.choice(list(ScheduleType)))
+        weekly_targets.append(rng.randint(0, 4))
+        todays.append(start + timedelta(days=rng.randint(-3, 100)))
+
+    return LogBatch.from_columns(histories), schedule_types, weekly_targets, todays
+
+
+class TestBatchStats:
+    """Тесты compute_batch_stats."""
+
+    @pytest.mark.parametrize("use_numpy", [False, True])
+    def test_matches_per_habit_stats(self, use_numpy):
+        """Тест: пакетный расчёт совпадает с get_habit_stats_columns для каждой привычки."""
+        from bot.services.batch_stats import HAS_NUMPY, compute_batch_stats
+        from bot.services.streak import get_habit_stats_columns
+
+        if use_numpy and not HAS_NUMPY:
+            pytest.skip("NumPy не установлен")
+
+        rng = random.Random(15)
+        for _ in range(50):
+            batch, schedule_types, weekly_targets, todays = random_batch(rng, rng.randint(1, 20))
+
+            expected = [
+                get_habit_stats_columns(columns, schedule_type, target, today)
+                for columns, schedule_type, target, today in zip(
+                    batch, schedule_types, weekly_targets, todays
+                )
+            ]
+            assert compute_batch_stats(
+                batch, schedule_types, weekly_targets, todays, use_numpy=use_numpy
+            ) == expected
+
+    def test_empty_batch_and_shared_today(self):
+        """Тест: пустой пакет и одна дата на все привычки."""
+        from bot.database.columns import LogBatch, LogColumns
+        from bot.database.models import ScheduleType
+        from bot.services.batch_stats import compute_batch_stats
+
+        assert compute_batch_stats(LogBatch(), [], [], date(2025, 1, 1)) == []
+
+        today = date(2025, 1, 10)
+        columns = LogColumns()
+        for offset in range(3):
+            columns.append((today - timedelta(days=offset)).toordinal(), 1)
+        batch = LogBatch.from_columns([columns, LogColumns()])
+
+        stats = compute_batch_stats(batch, [ScheduleType.DAILY] * 2, [0, 0], today)
+        assert [s.current_streak for s in stats] == [3, 0]
+        assert [s.total_done for s in stats] == [3, 0]
+
+    def test_mismatched_parameters(self):
+        """Тест: число параметров должно совпадать с числом привычек."""
+        from bot.database.columns import LogBatch, LogColumns
+        from bot.database.models import ScheduleType
+        from bot.services.batch_stats import compute_batch_stats
+
+        batch = LogBatch.from_columns([LogColumns()])
+        with pytest.raises(ValueError):
+            compute_batch_stats(batch, [ScheduleType.DAILY] * 2, [0, 0], date(2025, 1, 1))
@@ -0,0 +1,37 @@
+"""
+Тесты генераторов и сравнения результатов бенчмарков.
+"""
+from datetime import timedelta
+
+
+class TestBenchStreak:
+    """Тесты benchmarks.bench_streak."""
+
+    def test_generated_history_matches_profile(self):
+        """Тест: история покрывает нужное число лет, отсортирована и воспроизводима."""
+        from benchmarks.bench_streak import PROFILES, TODAY, generate_history
+        from bot.database.models import LogStatus
+
+        dense, sparse, skip_heavy = PROFILES[:3]
+        logs = generate_history(dense, years=2)
+
+        assert logs == generate_history(dense, years=2)
+        assert all(a.date < b.date for a, b in zip(logs, logs[1:]))
+        assert TODAY - timedelta(days=2 * 365) < logs[0].date and logs[-1].date <= TODAY
+        assert len(generate_history(sparse, years=2)) < len(logs) / 2
+
+        skipped = [log for log in generate_history(skip_heavy, years=2) if log.status == LogStatus.SKIPPED]
+        assert len(skipped) > len(logs) / 4
+
+    def test_compare_flags_regressions(self):
+        """Тест: регрессией считается только замедление больше порога."""
+        from benchmarks.bench_streak import PROFILES, compare, run_benchmarks, to_json
+
+        results = run_benchmarks(years=[1], profiles=PROFILES[:1], repeat=1, min_time=0.001)
+        baseline = to_json(results)
+        assert compare(results, baseline, threshold=0.2) == []
+
+        for entry in baseline["results"].values():
+            entry["seconds_per_call"] /= 2
+        assert len(compare(results, baseline, threshold=0.2)) == len(results)
+        assert compare(results, baseline, threshold=1.5) == []
@@ -0,0 +1,200 @@
+"""
+Тесты in-process кэшей.
+"""
+from unittest.mock import patch
+
+import pytest
+
+
+class TestTTLCache:
+    """Тесты TTLCache."""
+    
+    def test_lru_eviction(self):
+        """Тест: при переполнении вытесняется давно не использованный ключ."""
+        from bot.database.cache import TTLCache
+        
+        cache = TTLCache(max_size=2, ttl=60)
+        cache.put(1, "a")
+        cache.put(2, "b")
+        cache.get(1)
+        cache.put(3, "c")
+        
+        assert cache.get(2) is None
+        assert cache.get(1) == "a"
+        assert cache.get(3) == "c"
+        assert cache.evictions == 1
+    
+    def test_ttl_expiry(self):
+        """Тест: значение с истёкшим TTL считается промахом."""
+        from bot.database.cache import TTLCache
+        
+        cache = TTLCache(max_size=10, ttl=5)
+        with patch("bot.database.cache.time.monotonic", return_value=100.0):
+            cache.put(1, "a")
+            assert cache.get(1) == "a"
+        with patch("bot.database.cache.time.monotonic", return_value=106.0):
+            assert cache.get(1) is None
+        
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+
+class TestUserCache:
+    """Тесты кэша пользователей."""
+    
+    async def test_update_published_only_after_commit(self, session_factory):
+        """Тест: обновление пользователя попадает в кэш после commit, откат — не попадает."""
+        from bot.database.cache import user_cache
+        from bot.database.crud import get_or_create_user, get_user_snapshot, update_user
+        
+        user_cache.clear()
+        async with session_factory() as session:
+            await get_or_create_user(session, 7)
+            assert user_cache.get(7) is None
+        assert user_cache.get(7).timezone == "Europe/Moscow"
+        
+        with pytest.raises(RuntimeError):
+            async with session_factory() as session:
+                await update_user(session, 7, timezone="Asia/Tokyo")
+                raise RuntimeError("rollback")
+        
+        async with session_factory() as session:
+            snapshot = await get_user_snapshot(session, 7)
+        assert snapshot.timezone == "Europe/Moscow"
+        
+        async with session_factory() as session:
+            await update_user(session, 7, timezone="Asia/Tokyo")
+        assert user_cache.get(7).timezone == "Asia/Tokyo"
+
+
+class TestHabitListCache:
+    """Тесты кэша списков привычек."""
+    
+    async def test_served_from_cache_until_habit_changes(self, session_factory):
+        """Тест: список берётся из кэша, а изменение привычки его инвалидирует."""
+        from bot.database.cache import habit_list_cache
+        from bot.database.crud import (
+            create_habit,
+            get_habit_snapshots,
+            get_or_create_user,
+            update_habit,
+        )
+        
+        async with session_factory() as session:
+            await get_or_create_user(session, 1)
+            habit = await create_habit(session, user_id=1, name="Йога")
+            await create_habit(session, user_id=1, name="Сон")
+        
+        async with session_factory() as session:
+            first = await get_habit_snapshots(session, 1)
+        hits = habit_list_cache.stats()["hits"]
+        async with session_factory() as session:
+            second = await get_habit_snapshots(session, 1)
+        
+        assert second is first
+        assert habit_list_cache.stats()["hits"] == hits + 1
+        assert [(h.name, h.order) for h in first] == [("Йога", 0), ("Сон", 1)]
+        
+        async with session_factory() as session:
+            await update_habit(session, habit.id, is_active=False)
+        async with session_factory() as session:
+            active = await get_habit_snapshots(session, 1, active_only=True)
+        
+        assert [h.name for h in active] == ["Сон"]
+    
+    def test_stale_fill_is_rejected(self):
+        """Тест: список, прочитанный до изменения, не попадает в кэш."""
+        from bot.database.cache import HabitListCache
+        
+        cache = HabitListCache(max_size=10, ttl=60)
+        version = cache.version(1)
+        cache._bump(1)
+        cache.put(1, version, ())
+        
+        assert cache.get(1) is None
+    
+    def test_versions_bounded(self):
+        """Тест: версии хранятся только для недавно изменённых пользователей."""
+        from bot.database.cache import HabitListCache
+        
+        cache = HabitListCache(max_size=3, ttl=60)
+        stale_version = cache.version(1)
+        cache._bump(1)
+        for user_id in range(2, 50):
+            cache._bump(user_id)
+        
+        assert len(cache._versions) == 3
+        cache.put(1, stale_version, ())
+        assert cache.get(1) is None
+
+
+class TestHabitStatsCache:
+    """Тесты кэша статистики привычек."""
+    
+    async def test_log_write_invalidates_only_touched_habit(self, session_factory):
+        """Тест: запись лога сбрасывает статистику своей привычки, остальные остаются в кэше."""
+        from datetime import date
+        from bot.database.cache import habit_stats_cache
+        from bot.database.crud import create_habit, get_or_create_log, get_or_create_user
+        from bot.database.models import LogStatus
+        from bot.services.streak import HabitStats
+        
+        today = date(2025, 3, 1)
+        async with session_factory() as session:
+            await get_or_create_user(session, 1)
+            touched = await create_habit(session, user_id=1, name="Бег")
+            untouched = await create_habit(session, user_id=1, name="Чтение")
+        
+        stats = HabitStats(0, 0, 0, 0, 0)
+        for habit in (touched, untouched):
+            habit_stats_cache.put(habit.id, today, habit_stats_cache.version(habit.id), stats)
+        stale_version = habit_stats_cache.version(touched.id)
+        
+        async with session_factory() as session:
+            await get_or_create_log(session, touched.id, today, LogStatus.DONE)
+            # Посчитано по данным до commit — в кэш не попадает
+            habit_stats_cache.put(touched.id, today, stale_version, stats)
+        
+        assert habit_stats_cache.get(touched.id, today) is None
+        assert habit_stats_cache.get(untouched.id, today) is stats
+        assert habit_stats_cache.get(untouched.id, date(2025, 3, 2)) is None
+    
+    def test_bounded_lru(self):
+        """Тест: при переполнении вытесняется давно не использованная запись."""
+        from datetime import date
+        from bot.database.cache import HabitStatsCache
+        from bot.services.streak import HabitStats
+        
+        cache = HabitStatsCache(max_size=2, ttl=60)
+        today = date(2025, 3, 1)
+        for habit_id in (1, 2):
+            cache.put(habit_id, today, 0, HabitStats(habit_id, 0, 0, 0, 0))
+        cache.get(1, today)
+        cache.put(3, today, 0, HabitStats(3, 0, 0, 0, 0))
+        
+        assert cache.get(2, today) is None
+        assert cache.get(1, today).current_streak == 1
+        assert cache.stats()["evictions"] == 1
+    
+    def test_versions_bounded(self):
+        """Тест: таблица версий ограничена, а версия вытесненной привычки не возвращается к прежней."""
+        from datetime import date
+        from bot.database.cache import HabitStatsCache
+        from bot.services.streak import HabitStats
+        
+        cache = HabitStatsCache(max_size=2, ttl=60)
+        today = date(2025, 3, 1)
+        stale_version = cache.version(1)
+        cache._bump(1)
+        seen = {cache.version(1)}
+        for habit_id in range(2, 100):
+            cache._bump(habit_id)
+        
+        assert len(cache._versions) == 2
+        # Версия вытесненной привычки только растёт: расчёт до изменения не примется
+        assert cache.version(1) not in seen | {stale_version}
+        cache.put(1, today, stale_version, HabitStats(0, 0, 0, 0, 0))
+        assert cache.get(1, today) is None
+        
+        cache.put(1, today, cache.version(1), HabitStats(1, 0, 0, 0, 0))
+        assert cache.get(1, today).current_streak == 1
@@ -0,0 +1,273 @@
+"""
+Тесты CRUD операций на in-memory SQLite.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+
+class TestHabitLogUpsert:
+    """Тесты upsert лога привычки."""
+    
+    async def test_repeated_tracking_keeps_single_row(self, session):
+        """Тест: повторная отметка за день обновляет статус, а не создаёт дубль."""
+        from bot.database.crud import create_habit, get_or_create_log, get_or_create_user
+        from bot.database.models import HabitLog, LogStatus
+        
+        await get_or_create_user(session, 1)
+        habit = await create_habit(session, user_id=1, name="Зарядка")
+        today = date(2024, 1, 15)
+        
+        first = await get_or_create_log(session, habit.id, today, LogStatus.DONE)
+        second = await get_or_create_log(session, habit.id, today, LogStatus.SKIPPED)
+        
+        count = await session.scalar(select(func.count()).select_from(HabitLog))
+        assert count == 1
+        assert second.id == first.id
+        assert second.status == LogStatus.SKIPPED
+
+
+class TestLogStatuses:
+    """Тесты загрузки статусов привычек за дату и период."""
+    
+    async def test_only_requested_days_loaded(self, session):
+        """Тест: возвращаются статусы только запрошенных привычек и дней."""
+        from bot.database.crud import (
+            create_habit,
+            get_log_statuses_for_date,
+            get_log_statuses_for_range,
+            get_or_create_log,
+            get_or_create_user,
+        )
+        from bot.database.models import LogStatus
+        
+        await get_or_create_user(session, 1)
+        run = await create_habit(session, user_id=1, name="Бег")
+        read = await create_habit(session, user_id=1, name="Чтение")
+        other = await create_habit(session, user_id=1, name="Вода")
+        for day, status in ((10, LogStatus.DONE), (14, LogStatus.SKIPPED), (15, LogStatus.NOT_DONE)):
+            await get_or_create_log(session, run.id, date(2024, 1, day), status)
+        await get_or_create_log(session, read.id, date(2024, 1, 13), LogStatus.DONE)
+        await get_or_create_log(session, other.id, date(2024, 1, 14), LogStatus.DONE)
+        habit_ids = [run.id, read.id]
+        
+        assert await get_log_statuses_for_date(session, habit_ids, date(2024, 1, 15)) == {
+            run.id: LogStatus.NOT_DONE,
+        }
+        assert await get_log_statuses_for_range(session, habit_ids, date(2024, 1, 13), date(2024, 1, 14)) == {
+            run.id: {date(2024, 1, 14): LogStatus.SKIPPED},
+            read.id: {date(2024, 1, 13): LogStatus.DONE},
+        }
+        assert await get_log_statuses_for_range(session, [], date(2024, 1, 1), date(2024, 1, 31)) == {}
+
+
+class TestDoneCounters:
+    """Тесты SQL-агрегата счётчиков done."""
+    
+    async def test_counters_match_python_stats(self, session):
+        """Тест: агрегат в БД совпадает с подсчётом get_habit_stats."""
+        from datetime import timedelta
+        from bot.database.crud import (
+            create_habit,
+            get_done_counters_for_user_habits,
+            get_logs_for_habit,
+            get_or_create_log,
+            get_or_create_user,
+        )
+        from bot.database.models import LogStatus, ScheduleType
+        from bot.services.streak import get_habit_stats
+        
+        await get_or_create_user(session, 1)
+        habit = await create_habit(session, user_id=1, name="Медитация")
+        today = date(2024, 1, 31)
+        statuses = [LogStatus.DONE, LogStatus.SKIPPED, LogStatus.DONE, LogStatus.NOT_DONE]
+        for i in range(45):
+            log_date = today - timedelta(days=i)
+            await get_or_create_log(session, habit.id, log_date, statuses[i % len(statuses)])
+        
+        counters = await get_done_counters_for_user_habits(session, 1, today)
+        logs = await get_logs_for_habit(session, habit.id)
+        stats = get_habit_stats(logs, ScheduleType.DAILY, 7, today)
+        
+        assert counters[habit.id] == (stats.done_7_days, stats.done_30_days, stats.total_done)
+
+
+class TestStreakSummary:
+    """Тесты сводки streak, обновляемой при записи логов."""
+    
+    @pytest.mark.parametrize("schedule", ["daily", "weekly"])
+    async def test_summary_matches_full_recompute(self, session, schedule):
+        """Тест: сводка после случайных отметок совпадает с расчётом по всей истории."""
+        import random
+        from datetime import timedelta
+        from bot.database.crud import (
+            DoneCounters,
+            create_habit,
+            get_logs_for_habit,
+            get_or_create_log,
+            get_or_create_user,
+            get_streak_summaries,
+        )
+        from bot.database.models import LogStatus, ScheduleType
+        from bot.services.streak import get_habit_stats, get_habit_stats_from_summary
+        
+        rng = random.Random(42)
+        schedule_type = ScheduleType(schedule)
+        weekly_target = 3 if schedule_type == ScheduleType.WEEKLY else 7
+        
+        await get_or_create_user(session, 1)
+        habit = await create_habit(
+            session, user_id=1, name="Спорт",
+            schedule_type=schedule_type, weekly_target=weekly_target,
+        )
+        
+        day = date(2024, 12, 1)
+        for _ in range(120):
+            # В основном отметки за «сегодня», иногда повторная или правка прошлого дня
+            if rng.random() < 0.6:
+                day += timedelta(days=rng.choice([1, 1, 1, 2, 4]))
+                log_date = day
+            elif rng.random() < 0.5:
+                log_date = day
+            else:
+                log_date = day - timedelta(days=rng.randint(1, 20))
+            await get_or_create_log(session, habit.id, log_date, rng.choice(list(LogStatus)))
+            
+            summaries = await get_streak_summaries(session, [habit])
+            logs = await get_logs_for_habit(session, habit.id)
+            for today in (day, day + timedelta(days=1), day + timedelta(days=9)):
+                expected = get_habit_stats(logs, schedule_type, weekly_target, today)
+                actual = get_habit_stats_from_summary(
+                    summaries[habit.id],
+                    DoneCounters(expected.done_7_days, expected.done_30_days, expected.total_done),
+                    today,
+                )
+                assert actual == expected
+    
+    
+    async def test_stale_summaries_bulk_rebuilt_and_backfilled(self, session):
+        """Тест: устаревшие сводки пересчитываются одним запросом логов и сохраняются backfill и update_habit."""
+        from datetime import timedelta
+        from sqlalchemy import delete, event
+        from bot.database.crud import (
+            backfill_streak_summaries,
+            create_habit,
+            get_or_create_log,
+            get_or_create_user,
+            get_streak_summaries,
+            update_habit,
+        )
+        from bot.database.models import HabitStreakSummary, LogStatus, ScheduleType
+        
+        await get_or_create_user(session, 1)
+        habits = [await create_habit(session, user_id=1, name=f"Привычка {i}") for i in range(3)]
+        for habit in habits:
+            for offset in range(5):
+                await get_or_create_log(session, habit.id, date(2024, 1, 1) + timedelta(days=offset), LogStatus.DONE)
+        expected = await get_streak_summaries(session, habits)
+        
+        # Привычки «до миграции»: сводок нет
+        await session.execute(delete(HabitStreakSummary))
+        session.expunge_all()
+        assert await get_streak_summaries(session, habits, rebuild_stale=False) == {}
+        
+        queries = []
+        sync_engine = session.bind.sync_engine
+        
+        def count_query(*args):
+            queries.append(args[2])
+        
+        event.listen(sync_engine, "before_cursor_execute", count_query)
+        try:
+            rebuilt = await get_streak_summaries(session, habits)
+        finally:
+            event.remove(sync_engine, "before_cursor_execute", count_query)
+        
+        assert len(queries) == 2  # Сводки и логи всех устаревших привычек
+        assert [rebuilt[h.id].current_streak for h in habits] == [expected[h.id].current_streak for h in habits]
+        
+        assert await backfill_streak_summaries(session, chunk_size=2) == 3
+        assert await backfill_streak_summaries(session) == 0
+        
+        await update_habit(session, habits[0].id, schedule_type=ScheduleType.WEEKLY, weekly_target=3)
+        assert await backfill_streak_summaries(session) == 0
+        summary = await session.get(HabitStreakSummary, habits[0].id)
+        assert (summary.schedule_type, summary.weekly_target, summary.total_done) == (ScheduleType.WEEKLY, 3, 5)
+
+
+class TestLogColumns:
+    """Тесты колоночной истории привычки."""
+    
+    async def test_columns_match_orm_logs(self, session):
+        """Тест: колонки совпадают с логами, статистика по ним — со статистикой по ORM."""
+        import random
+        from datetime import timedelta
+        from bot.database.crud import (
+            create_habit,
+            get_log_columns,
+            get_logs_for_habit,
+            get_or_create_log,
+            get_or_create_user,
+        )
+        from bot.database.columns import LogColumns
+        from bot.database.models import LogStatus, ScheduleType
+        from bot.services.streak import get_habit_stats, get_habit_stats_columns
+        
+        rng = random.Random(11)
+        await get_or_create_user(session, 1)
+        habit = await create_habit(session, user_id=1, name="Чтение")
+        
+        start = date(2024, 12, 1)
+        for offset in rng.sample(range(120), 80):
+            await get_or_create_log(
+                session, habit.id, start + timedelta(days=offset), rng.choice(list(LogStatus))
+            )
+        
+        logs = await get_logs_for_habit(session, habit.id)
+        columns = await get_log_columns(session, habit.id)
+        
+        assert columns == LogColumns.from_logs(logs)
+        assert columns.is_sorted()
+        
+        for today in (date(2025, 1, 15), date(2025, 3, 30), date(2025, 6, 1)):
+            for schedule_type, target in ((ScheduleType.DAILY, 7), (ScheduleType.WEEKLY, 3)):
+                assert get_habit_stats_columns(columns, schedule_type, target, today) == (
+                    get_habit_stats(logs, schedule_type, target, today)
+                )
+        
+        # Неотсортированный вход сортируется устойчиво
+        shuffled = list(logs)
+        rng.shuffle(shuffled)
+        today = date(2025, 3, 30)
+        assert get_habit_stats_columns(
+            LogColumns.from_logs(shuffled), ScheduleType.DAILY, 7, today
+        ) == get_habit_stats(logs, ScheduleType.DAILY, 7, today)
+    
+    async def test_log_batch_segments_follow_habit_ids(self, session):
+        """Тест: пакет историй повторяет порядок habit_ids, у привычки без логов сегмент пустой."""
+        from bot.database.crud import (
+            create_habit,
+            get_log_batch,
+            get_log_columns,
+            get_or_create_log,
+            get_or_create_user,
+        )
+        from bot.database.models import LogStatus
+        
+        await get_or_create_user(session, 1)
+        first = await create_habit(session, user_id=1, name="Бег")
+        second = await create_habit(session, user_id=1, name="Вода")
+        empty = await create_habit(session, user_id=1, name="Сон")
+        await get_or_create_log(session, first.id, date(2025, 1, 2), LogStatus.DONE)
+        await get_or_create_log(session, first.id, date(2025, 1, 1), LogStatus.SKIPPED)
+        await get_or_create_log(session, second.id, date(2025, 1, 1), LogStatus.NOT_DONE)
+        
+        batch = await get_log_batch(session, [second.id, empty.id, first.id])
+        
+        assert list(batch) == [
+            await get_log_columns(session, second.id),
+            await get_log_columns(session, empty.id),
+            await get_log_columns(session, first.id),
+        ]
+        assert len(batch.segment(1)) == 0
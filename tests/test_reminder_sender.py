@@ -0,0 +1,121 @@
+"""
+Тесты отправки напоминаний с ограничением скорости.
+"""
+import asyncio
+
+
+class FakeBot:
+    """Бот-заглушка: запоминает отправки, по запросу отвечает flood control или ошибками."""
+    
+    def __init__(self, retry_after_for=(), fail_times=None, forbidden_for=()):
+        self.sent = []  # (время отправки, chat_id)
+        self._retry_after_for = set(retry_after_for)
+        self._fail_times = dict(fail_times or {})
+        self._forbidden_for = set(forbidden_for)
+    
+    async def send_message(self, chat_id, text, reply_markup=None, parse_mode=None):
+        from aiogram.exceptions import TelegramForbiddenError, TelegramNetworkError, TelegramRetryAfter
+        from aiogram.methods import SendMessage
+        
+        method = SendMessage(chat_id=chat_id, text=text)
+        if chat_id in self._retry_after_for:
+            self._retry_after_for.discard(chat_id)
+            raise TelegramRetryAfter(method=method, message="Flood control", retry_after=1)
+        if chat_id in self._forbidden_for:
+            raise TelegramForbiddenError(method=method, message="Forbidden: bot was blocked by the user")
+        if self._fail_times.get(chat_id, 0) > 0:
+            self._fail_times[chat_id] -= 1
+            raise TelegramNetworkError(method=method, message="Connection reset")
+        
+        await asyncio.sleep(0.001)  # Сетевая задержка
+        self.sent.append((asyncio.get_running_loop().time(), chat_id))
+
+
+class TestTokenBucket:
+    """Тесты token bucket."""
+    
+    async def test_rate_after_burst(self):
+        """Тест: после всплеска токены выдаются не быстрее rate."""
+        from bot.services.reminder_sender import TokenBucket
+        
+        bucket = TokenBucket(rate=100, capacity=10)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(40):
+            await bucket.acquire()
+        
+        assert loop.time() - start >= (40 - 10) / 100 * 0.9
+
+
+class TestReminderSender:
+    """Тесты ReminderSender на боте-заглушке."""
+    
+    async def test_sustains_rate_without_losing_messages(self):
+        """Тест: все сообщения доставлены, скорость не превышает лимит, retry_after соблюдён."""
+        from bot.services.reminder_sender import ReminderSender
+        
+        rate, burst, total = 200, 5, 150
+        bot = FakeBot(retry_after_for={7}, fail_times={11: 1})
+        sender = ReminderSender(bot=bot, rate=rate, burst=burst, workers=8, max_queue=50, max_attempts=3,
+                                retry_backoff=0.05)
+        sender.start()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        
+        for chat_id in range(total):
+            await sender.submit(chat_id, "🔔")
+        await sender.join()
+        elapsed = loop.time() - start
+        await sender.stop()
+        
+        delivered = sorted(chat_id for _, chat_id in bot.sent)
+        assert delivered == list(range(total))
+        assert elapsed >= (total - burst) / rate
+        
+        # В любом окне длиной 0.1 с — не больше rate * 0.1 + burst отправок
+        times = [t for t, _ in bot.sent]
+        for i, t in enumerate(times):
+            in_window = sum(1 for other in times[i:] if other - t < 0.1)
+            assert in_window <= rate * 0.1 + burst
+        
+        # Flood control: после retry_after отправка возобновилась не раньше чем через секунду
+        retry_sent_at = next(t for t, chat_id in bot.sent if chat_id == 7)
+        assert retry_sent_at - start >= 1
+        
+        stats = sender.stats()
+        assert (stats["sent"], stats["failed"], stats["retried"], stats["depth"]) == (total, 0, 2, 0)
+        assert stats["latency_max"] >= 1
+    
+    async def test_permanent_and_exhausted_errors_are_dropped(self):
+        """Тест: заблокировавший бота пользователь и исчерпанные повторы не зацикливают очередь."""
+        from bot.services.reminder_sender import ReminderSender
+        
+        bot = FakeBot(forbidden_for={1}, fail_times={2: 10})
+        sender = ReminderSender(bot=bot, rate=1000, burst=10, workers=2, max_queue=10, max_attempts=2,
+                                retry_backoff=0.05)
+        sender.start()
+        for chat_id in range(4):
+            await sender.submit(chat_id, "🔔")
+        await sender.join()
+        await sender.stop()
+        
+        assert sorted(chat_id for _, chat_id in bot.sent) == [0, 3]
+        assert (sender.sent, sender.failed, sender.retried) == (2, 2, 1)
+    
+    async def test_priority_overtakes_while_waiting_for_token(self):
+        """Тест: срочное сообщение, пришедшее за время ожидания токена, уходит раньше уже взятого."""
+        from bot.services.reminder_sender import PRIORITY_HIGH, ReminderSender
+        
+        bot = FakeBot()
+        sender = ReminderSender(bot=bot, rate=20, burst=1, workers=1, max_queue=10, max_attempts=1,
+                                retry_backoff=0.05)
+        sender.start()
+        for chat_id in range(3):
+            await sender.submit(chat_id, "🔔")
+        # Первое сообщение ушло по накопленному токену, второе ждёт следующего
+        await asyncio.sleep(0.02)
+        await sender.submit(100, "🔔", priority=PRIORITY_HIGH)
+        await sender.join()
+        await sender.stop()
+        
+        assert [chat_id for _, chat_id in bot.sent] == [0, 100, 1, 2]
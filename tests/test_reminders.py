@@ -0,0 +1,59 @@
+"""
+Тесты персональных напоминаний.
+"""
+from datetime import date, datetime
+
+import pytz
+
+
+class TestBuildReminders:
+    """Тесты сборки напоминаний пачки пользователей."""
+    
+    async def test_only_unmarked_habits_in_one_query(self, session_factory):
+        """Тест: в напоминание попадают только неотмеченные за локальное сегодня привычки, одним запросом."""
+        from sqlalchemy import event
+        from bot.database.crud import create_habit, get_or_create_log, get_or_create_user, update_habit
+        from bot.database.models import LogStatus
+        from bot.services.reminders import build_reminders, format_reminder
+        
+        # 22:30 UTC: в Москве уже 2 марта, в Нью-Йорке ещё 1 марта
+        now = pytz.utc.localize(datetime(2025, 3, 1, 22, 30))
+        
+        async with session_factory() as session:
+            await get_or_create_user(session, 1, "Europe/Moscow")
+            marked = await create_habit(session, 1, "Зарядка")
+            unmarked = await create_habit(session, 1, "Чтение")
+            archived = await create_habit(session, 1, "Архив")
+            await update_habit(session, archived.id, is_active=False)
+            await get_or_create_log(session, marked.id, date(2025, 3, 2), LogStatus.SKIPPED)
+            
+            await get_or_create_user(session, 2, "America/New_York")
+            done = await create_habit(session, 2, "Бег")
+            await get_or_create_log(session, done.id, date(2025, 3, 1), LogStatus.DONE)
+            
+            await get_or_create_user(session, 3, "Europe/Moscow")
+            yesterday = await create_habit(session, 3, "Вода")
+            await get_or_create_log(session, yesterday.id, date(2025, 3, 1), LogStatus.DONE)
+            
+            await get_or_create_user(session, 4, "Europe/Moscow")  # Без привычек
+        
+        async with session_factory() as session:
+            queries = []
+            sync_engine = session.bind.sync_engine
+            
+            def count_query(*args):
+                queries.append(args[2])
+            
+            event.listen(sync_engine, "before_cursor_execute", count_query)
+            try:
+                reminders = await build_reminders(session, [1, 2, 3, 4], now)
+            finally:
+                event.remove(sync_engine, "before_cursor_execute", count_query)
+        
+        assert len(queries) == 1
+        assert [(r.user_id, r.today, [h.id for h in r.habits]) for r in reminders] == [
+            (1, date(2025, 3, 2), [unmarked.id]),
+            (3, date(2025, 3, 2), [yesterday.id]),
+        ]
+        assert reminders[0].habits[0].order == 1
+        assert "02.03.2025" in format_reminder(reminders[0])
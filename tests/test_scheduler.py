@@ -0,0 +1,205 @@
+"""
+Тесты планировщика напоминаний.
+"""
+from datetime import datetime, time, timedelta
+
+import pytz
+
+
+def utc(*args) -> datetime:
+    """Aware datetime в UTC."""
+    return datetime(*args, tzinfo=pytz.utc)
+
+
+class TestReminderIndex:
+    """Тесты индекса напоминаний по UTC минуте суток."""
+    
+    def test_buckets_follow_dst(self):
+        """Тест: при переходе на летнее время группа таймзоны переезжает в другую UTC минуту."""
+        from bot.services.scheduler import ReminderIndex
+        
+        index = ReminderIndex()
+        berlin = pytz.timezone("Europe/Berlin")
+        moscow = pytz.timezone("Europe/Moscow")
+        before_switch = utc(2025, 3, 29, 12, 0)
+        index.add(1, berlin, time(9, 0), before_switch)
+        index.add(2, berlin, time(9, 0), before_switch)
+        index.add(3, moscow, time(9, 0), before_switch)
+        
+        assert sorted(index.due(8 * 60)) == [1, 2]  # 09:00 CET = 08:00 UTC
+        assert index.due(6 * 60) == [3]  # 09:00 MSK = 06:00 UTC
+        
+        index.refresh_offsets(utc(2025, 3, 30, 1, 0))  # Переход на CEST
+        assert index.due(8 * 60) == []
+        assert sorted(index.due(7 * 60)) == [1, 2]
+        assert index.due(6 * 60) == [3]
+    
+    def test_move_and_remove(self):
+        """Тест: повторное добавление переносит пользователя, удаление очищает пустые группы."""
+        from bot.services.scheduler import ReminderIndex
+        
+        index = ReminderIndex()
+        now = utc(2025, 1, 1, 0, 0)
+        moscow = pytz.timezone("Europe/Moscow")
+        index.add(1, moscow, time(9, 0), now)
+        index.add(1, moscow, time(21, 30), now)
+        
+        assert index.due(6 * 60) == []
+        assert index.due(18 * 60 + 30) == [1]
+        assert len(index) == 1
+        
+        assert index.remove(1)
+        assert not index.remove(1)
+        assert index.due(18 * 60 + 30) == []
+        assert index._buckets == {} and index._local == {}
+
+
+class TestSchedulerService:
+    """Тесты поминутной отправки напоминаний."""
+    
+    async def test_run_due_dispatches_batches_and_catches_up(self):
+        """Тест: пользователи минуты уходят пачками, пропущенные минуты догоняются."""
+        from bot.services.scheduler import SchedulerService
+        
+        batches = []
+        
+        async def callback(user_ids, habit_ids):
+            batches.append(sorted(user_ids))
+        
+        service = SchedulerService(batch_size=2, max_catch_up_minutes=5)
+        service.set_reminder_callback(callback)
+        for user_id in range(1, 6):
+            service.add_reminder_job(user_id, time(9, 0), "Europe/Moscow")
+        service.add_reminder_job(6, time(9, 2), "Europe/Moscow")
+        service.add_reminder_job(7, time(9, 0), "Unknown/Zone")  # Таймзона по умолчанию
+        
+        start = utc(2025, 1, 1, 5, 59, 30)
+        assert await service.run_due(start) == 0
+        # Тик опоздал на 2 минуты: 06:00 и 06:02 UTC не теряются
+        assert await service.run_due(start + timedelta(minutes=3)) == 7
+        
+        assert sorted(sum(batches, [])) == list(range(1, 8))
+        assert all(len(batch) <= 2 for batch in batches)
+        # Повторный тик в ту же минуту ничего не отправляет
+        assert await service.run_due(start + timedelta(minutes=3, seconds=20)) == 0
+
+
+class TestReminderRestore:
+    """Тесты потокового восстановления напоминаний из БД."""
+    
+    async def test_restore_streams_chunks(self, session_factory):
+        """Тест: восстанавливаются только включённые напоминания, изменённые во время восстановления не перезаписываются."""
+        from bot.database.crud import get_or_create_user, update_user
+        from bot.services.scheduler import SchedulerService
+        
+        async with session_factory() as session:
+            for user_id in range(1, 26):
+                await get_or_create_user(session, user_id, "Europe/Moscow")
+                await update_user(
+                    session,
+                    user_id,
+                    reminder_time=time(9, user_id),
+                    reminders_enabled=user_id % 5 != 0,
+                )
+            await get_or_create_user(session, 100)  # Без времени напоминания
+        
+        service = SchedulerService(restore_chunk_size=10)
+        service.start_restore(session_factory)
+        # Пользователь поменял время, пока восстановление ещё не дошло до него
+        service.add_reminder_job(7, time(20, 0), "Europe/Moscow")
+        restored = await service._restore_task
+        
+        assert restored == 19
+        assert len(service.index) == 20
+        assert 5 not in service.index and 100 not in service.index
+        assert service.index.due(6 * 60 + 1) == [1]  # 09:01 MSK
+        assert service.index.due(6 * 60 + 7) == []
+        assert service.index.due(17 * 60) == [7]  # 20:00 MSK
+
+
+class TestReminderTimes:
+    """Тесты дополнительных напоминаний из таблицы reminder_times."""
+    
+    async def test_due_lookup_merges_and_follows_dst(self, session_factory):
+        """Тест: напоминания минуты берутся запросом по utc_minute, сливаются с основными и следуют переходу на летнее время."""
+        from bot.database.crud import (
+            add_reminder_time,
+            create_habit,
+            get_or_create_user,
+            get_reminder_times,
+            update_user,
+        )
+        from bot.services.scheduler import SchedulerService
+        
+        winter = utc(2025, 1, 15, 0, 0)
+        async with session_factory() as session:
+            await get_or_create_user(session, 1, "Europe/Moscow")
+            run = await create_habit(session, 1, "Бег")
+            await add_reminder_time(session, 1, time(9, 0), habit_id=run.id, now=winter)
+            
+            await get_or_create_user(session, 2, "America/New_York")
+            read = await create_habit(session, 2, "Чтение")
+            await add_reminder_time(session, 2, time(8, 0), habit_id=read.id, now=winter)
+            await add_reminder_time(session, 2, time(8, 0), habit_id=read.id, now=winter)  # Повтор
+            await add_reminder_time(session, 2, time(20, 0), now=winter)
+            
+            await get_or_create_user(session, 3, "America/New_York")
+            await update_user(session, 3, reminders_enabled=False)
+            await add_reminder_time(session, 3, time(8, 0), now=winter)
+            
+            assert await add_reminder_time(session, 3, time(8, 0), habit_id=run.id) is None  # Чужая привычка
+            assert len(await get_reminder_times(session, 2)) == 2
+        
+        calls = []
+        
+        async def callback(user_ids, habit_ids):
+            calls.append((sorted(user_ids), habit_ids))
+        
+        service = SchedulerService()
+        service.set_reminder_callback(callback)
+        service.set_session_factory(session_factory)
+        service.add_reminder_job(1, time(9, 0), "Europe/Moscow")
+        
+        # Зима: 09:00 MSK = 06:00 UTC, 08:00 EST = 13:00 UTC
+        assert await service.run_due(utc(2025, 1, 15, 6, 0)) == 1
+        assert await service.run_due(utc(2025, 1, 15, 13, 0)) == 1
+        assert calls == [([1], {}), ([2], {2: {read.id}})]  # У пользователя 1 основное напоминание обо всём
+        
+        # Лето: 08:00 EDT = 12:00 UTC, 20:00 EDT = 00:00 UTC
+        calls.clear()
+        assert await service.run_due(utc(2025, 7, 15, 12, 0)) == 1
+        assert await service.run_due(utc(2025, 7, 15, 13, 0)) == 0
+        assert await service.run_due(utc(2025, 7, 16, 0, 0)) == 1
+        assert calls == [([2], {2: {read.id}}), ([2], {})]
+        
+        # Смена таймзоны пользователя переносит и его дополнительные напоминания
+        async with session_factory() as session:
+            await update_user(session, 2, timezone="Asia/Tokyo")
+            times = await get_reminder_times(session, 2)
+        assert sorted(reminder.utc_minute for reminder in times) == [11 * 60, 23 * 60]
+    
+    async def test_zone_added_elsewhere_follows_dst(self, session_factory):
+        """Тест: таймзона, добавленная другим процессом незадолго до перехода на летнее время, пересчитывается в момент перехода."""
+        from bot.database.crud import add_reminder_time, get_or_create_user
+        from bot.services.scheduler import SchedulerService
+        
+        calls = []
+        
+        async def callback(user_ids, habit_ids):
+            calls.append(sorted(user_ids))
+        
+        service = SchedulerService()
+        service.set_reminder_callback(callback)
+        service.set_session_factory(session_factory)
+        
+        # Переход в Нью-Йорке: 2025-03-09 07:00 UTC (02:00 EST → 03:00 EDT)
+        assert await service.run_due(utc(2025, 3, 9, 6, 50)) == 0
+        async with session_factory() as session:
+            await get_or_create_user(session, 1, "America/New_York")
+            # Добавлено другим процессом по зимнему смещению: 03:29 EST = 08:29 UTC
+            await add_reminder_time(session, 1, time(3, 29), now=utc(2025, 3, 9, 6, 55))
+        
+        assert await service.run_due(utc(2025, 3, 9, 7, 0)) == 0
+        # 03:29 EDT = 07:29 UTC
+        assert await service.run_due(utc(2025, 3, 9, 7, 29)) == 1
+        assert calls == [[1]]
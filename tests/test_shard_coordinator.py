@@ -0,0 +1,184 @@
+"""
+Тесты шардирования планировщика напоминаний.
+"""
+from datetime import datetime, time, timedelta
+
+
+async def create_users(session_factory, count: int) -> None:
+    """Пользователи 1..count с напоминанием в 09:00 по Москве."""
+    from bot.database.crud import get_or_create_user, update_user
+    
+    async with session_factory() as session:
+        for user_id in range(1, count + 1):
+            await get_or_create_user(session, user_id, "Europe/Moscow")
+            await update_user(session, user_id, reminder_time=time(9, 0))
+
+
+def make_worker(home_shard, owner: str):
+    """Воркер: свой планировщик и координатор на 2 шарда."""
+    from bot.services.scheduler import SchedulerService
+    from bot.services.shard_coordinator import ShardCoordinator
+    
+    scheduler = SchedulerService(shard_count=2)
+    scheduler.assign_shards(())
+    return ShardCoordinator(scheduler, shard_count=2, home_shard=home_shard, owner=owner, lease_ttl=30)
+
+
+class TestShardLease:
+    """Тесты аренды шардов в БД."""
+    
+    async def test_claim_renew_and_expire(self, session):
+        """Тест: занятый шард не отдаётся до истечения аренды, после — забирается другим."""
+        from bot.database.crud import claim_shard_lease
+        
+        now = datetime(2025, 3, 1, 12, 0)
+        ttl = timedelta(seconds=30)
+        
+        assert await claim_shard_lease(session, 0, "a", now, ttl)
+        assert not await claim_shard_lease(session, 0, "b", now + timedelta(seconds=10), ttl)
+        assert await claim_shard_lease(session, 0, "a", now + timedelta(seconds=10), ttl)
+        assert not await claim_shard_lease(session, 0, "b", now + timedelta(seconds=39), ttl)
+        assert await claim_shard_lease(session, 0, "b", now + timedelta(seconds=40), ttl)
+        assert not await claim_shard_lease(session, 0, "a", now + timedelta(seconds=41), ttl)
+
+
+class TestReminderChanges:
+    """Тесты журнала изменений напоминаний."""
+    
+    async def test_journal_written_only_when_sharded(self, session, monkeypatch):
+        """Тест: без шардирования журнал не пишется — его некому читать и чистить."""
+        from bot.config import config
+        from bot.database.crud import get_last_reminder_change_id, get_or_create_user, update_user
+        
+        await get_or_create_user(session, 1, "Europe/Moscow")
+        await update_user(session, 1, reminder_time=time(9, 0))
+        assert await get_last_reminder_change_id(session) == 0
+        
+        monkeypatch.setattr(config, "scheduler_shards", 2)
+        await update_user(session, 1, reminder_time=time(10, 0))
+        assert await get_last_reminder_change_id(session) == 1
+    
+    async def test_ids_not_reused_after_prune(self, session, monkeypatch):
+        """Тест: после очистки журнала новые изменения получают id больше курсора читателя."""
+        from sqlalchemy import delete
+        from bot.config import config
+        from bot.database.crud import (
+            get_last_reminder_change_id,
+            get_or_create_user,
+            get_reminder_changes,
+            prune_reminder_changes,
+            update_user,
+        )
+        from bot.database.models import ReminderChange
+        
+        monkeypatch.setattr(config, "scheduler_shards", 2)
+        await get_or_create_user(session, 1, "Europe/Moscow")
+        await update_user(session, 1, reminder_time=time(9, 0))
+        await update_user(session, 1, reminder_time=time(10, 0))
+        cursor = await get_last_reminder_change_id(session)
+        
+        # Очистка оставляет последнюю запись, даже если она старше границы
+        assert await prune_reminder_changes(session, datetime(2100, 1, 1)) == 1
+        assert await get_last_reminder_change_id(session) == cursor
+        
+        # Журнал опустел целиком (например, очищен вручную): id всё равно не начинаются заново
+        await session.execute(delete(ReminderChange))
+        await update_user(session, 1, reminder_time=time(11, 0))
+        
+        last_id, changes = await get_reminder_changes(session, cursor)
+        assert last_id > cursor
+        assert changes[1].reminder_time == time(11, 0)
+    
+    async def test_reminder_times_journaled(self, session, monkeypatch):
+        """Тест: добавление и удаление дополнительных напоминаний пишут журнал, повторы — нет."""
+        from bot.config import config
+        from bot.database.crud import (
+            add_reminder_time,
+            delete_reminder_time,
+            get_last_reminder_change_id,
+            get_or_create_user,
+        )
+        
+        monkeypatch.setattr(config, "scheduler_shards", 2)
+        await get_or_create_user(session, 1, "Europe/Moscow")
+        
+        reminder = await add_reminder_time(session, 1, time(13, 0))
+        assert await get_last_reminder_change_id(session) == 1
+        
+        # Повторное добавление того же времени ничего не меняет
+        assert (await add_reminder_time(session, 1, time(13, 0))).id == reminder.id
+        assert await get_last_reminder_change_id(session) == 1
+        
+        # Чужое напоминание не удаляется и не попадает в журнал
+        assert not await delete_reminder_time(session, reminder.id, 2)
+        assert await get_last_reminder_change_id(session) == 1
+        
+        assert await delete_reminder_time(session, reminder.id, 1)
+        assert await get_last_reminder_change_id(session) == 2
+
+
+class TestShardCoordinator:
+    """Тесты координации воркеров."""
+    
+    async def test_partition_takeover_and_handoff(self, session_factory):
+        """Тест: шарды делятся по user_id % N, упавший шард забирается и возвращается домашнему воркеру."""
+        await create_users(session_factory, 6)
+        now = datetime(2025, 3, 1, 12, 0)
+        a = make_worker(0, "a")
+        b = make_worker(1, "b")
+        
+        assert await a.run_once(now, session_factory) == {0}
+        assert await b.run_once(now, session_factory) == {1}
+        assert sorted(a.scheduler.index) == [2, 4, 6]
+        assert sorted(b.scheduler.index) == [1, 3, 5]
+        
+        # b упал: пока аренда действует, шард 1 никто не трогает
+        now += timedelta(seconds=20)
+        assert await a.run_once(now, session_factory) == {0}
+        now += timedelta(seconds=40)
+        assert await a.run_once(now, session_factory) == {0, 1}
+        assert sorted(a.scheduler.index) == [1, 2, 3, 4, 5, 6]
+        
+        # Домашний воркер шарда 1 перезапущен: просит шард назад и получает его
+        b = make_worker(1, "b2")
+        assert await b.run_once(now, session_factory) == set()
+        now += timedelta(seconds=5)
+        assert await a.run_once(now, session_factory) == {0}
+        assert sorted(a.scheduler.index) == [2, 4, 6]
+        assert await b.run_once(now, session_factory) == {1}
+        assert sorted(b.scheduler.index) == [1, 3, 5]
+    
+    async def test_changes_from_other_process(self, session_factory, monkeypatch):
+        """Тест: изменения напоминаний из процесса polling доходят до воркера шарда через журнал."""
+        from bot.config import config
+        from bot.database.crud import get_or_create_user, update_user
+        
+        monkeypatch.setattr(config, "scheduler_shards", 2)
+        await create_users(session_factory, 4)
+        now = datetime(2025, 3, 1, 12, 0)
+        worker = make_worker(0, "a")
+        await worker.run_once(now, session_factory)
+        
+        async with session_factory() as session:
+            await update_user(session, 2, reminder_time=time(10, 30))  # Шард 0: перенос
+            await update_user(session, 4, reminders_enabled=False)  # Шард 0: выключение
+            await update_user(session, 3, reminder_time=time(7, 0))  # Шард 1: не наш
+            await get_or_create_user(session, 8, "Asia/Tokyo")
+            await update_user(session, 8, reminder_time=time(8, 0))  # Шард 0: новый
+        
+        await worker.run_once(now + timedelta(seconds=5), session_factory)
+        
+        index = worker.scheduler.index
+        assert sorted(index) == [2, 8]
+        assert index.due(7 * 60 + 30) == [2]  # 10:30 MSK
+        assert index.due(23 * 60) == [8]  # 08:00 JST
+    
+    async def test_scheduling_disabled(self):
+        """Тест: процесс без шардов не ведёт напоминаний."""
+        from bot.services.scheduler import SchedulerService
+        
+        scheduler = SchedulerService()
+        scheduler.assign_shards(())
+        scheduler.add_reminder_job(1, time(9, 0), "Europe/Moscow")
+        
+        assert len(scheduler.index) == 0
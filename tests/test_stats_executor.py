@@ -0,0 +1,103 @@
+"""
+Тесты пула расчёта статистики.
+"""
+import asyncio
+import threading
+import time
+from datetime import date, timedelta
+
+import pytest
+
+
+def long_history(days: int, today: date):
+    """История из days дней подряд done, заканчивающаяся сегодня."""
+    from bot.database.columns import LogColumns
+
+    columns = LogColumns()
+    for offset in range(days - 1, -1, -1):
+        columns.append((today - timedelta(days=offset)).toordinal(), 1)
+    return columns
+
+
+class TestStatsExecutor:
+    """Тесты StatsExecutor."""
+
+    @pytest.mark.parametrize("mode", ["thread", "process"])
+    async def test_offloaded_result_matches_inline(self, mode):
+        """Тест: расчёт в пуле совпадает с прямым, короткие истории в пул не уходят."""
+        from bot.database.columns import LogBatch
+        from bot.database.models import ScheduleType
+        from bot.services.stats_executor import StatsExecutor
+        from bot.services.streak import get_habit_stats_columns
+
+        today = date(2025, 3, 1)
+        columns = long_history(400, today)
+        executor = StatsExecutor(mode=mode, max_workers=1, max_jobs=2, inline_max_logs=100)
+        executor.start()
+        try:
+            stats = await executor.compute(columns, ScheduleType.DAILY, 0, today)
+            batch_stats = await executor.compute_batch(
+                LogBatch.from_columns([columns, columns]), [ScheduleType.DAILY, ScheduleType.WEEKLY], [0, 3], today
+            )
+            await executor.compute(long_history(10, today), ScheduleType.DAILY, 0, today)
+        finally:
+            await executor.stop()
+
+        assert stats == get_habit_stats_columns(columns, ScheduleType.DAILY, 0, today)
+        assert stats.current_streak == 400
+        assert batch_stats[0] == stats
+        assert (executor.jobs_offloaded, executor.jobs_inline) == (2, 1)
+
+    async def test_not_started_computes_inline(self):
+        """Тест: без запущенного пула расчёт идёт напрямую."""
+        from bot.database.models import ScheduleType
+        from bot.services.stats_executor import StatsExecutor
+
+        executor = StatsExecutor(inline_max_logs=0)
+        stats = await executor.compute(long_history(5, date(2025, 3, 1)), ScheduleType.DAILY, 0, date(2025, 3, 1))
+
+        assert stats.current_streak == 5
+        assert executor.jobs_inline == 1
+
+    async def test_concurrent_jobs_capped(self, monkeypatch):
+        """Тест: одновременно в пуле не больше max_jobs расчётов, event loop не блокируется."""
+        import bot.services.stats_executor as module
+        from bot.database.models import ScheduleType
+
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def slow_stats(*args):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+
+        monkeypatch.setattr(module, "get_habit_stats_columns", slow_stats)
+        executor = module.StatsExecutor(mode="thread", max_workers=4, max_jobs=2, inline_max_logs=0)
+        executor.start()
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticker_task = asyncio.create_task(ticker())
+        try:
+            columns = long_history(3, date(2025, 3, 1))
+            await asyncio.gather(*(
+                executor.compute(columns, ScheduleType.DAILY, 0, date(2025, 3, 1)) for _ in range(6)
+            ))
+        finally:
+            ticker_task.cancel()
+            await executor.stop()
+
+        assert peak == 2
+        assert ticks > 10
@@ -2,6 +2,7 @@
 Unit-тесты для расчёта streak.
 """
 from datetime import date, timedelta
+from types import SimpleNamespace
 from unittest.mock import MagicMock
 
 import pytest
@@ -115,6 +116,108 @@ class TestDailyStreak:
         assert best == 2
 
 
+def reference_daily_streak(logs, today):
+    """Исходная реализация calculate_daily_streak — эталон для дифференциального теста."""
+    from bot.database.models import LogStatus
+    
+    if not logs:
+        return 0, 0
+    
+    log_by_date = {log.date: log.status for log in logs}
+    
+    streak = 0
+    check_date = today
+    while True:
+        status = log_by_date.get(check_date)
+        if status == LogStatus.DONE:
+            streak += 1
+            check_date -= timedelta(days=1)
+        elif status == LogStatus.SKIPPED:
+            check_date -= timedelta(days=1)
+        elif status == LogStatus.NOT_DONE:
+            break
+        else:
+            if check_date < today:
+                break
+            check_date -= timedelta(days=1)
+    current_streak = streak
+    
+    best_streak = 0
+    streak = 0
+    prev_date = None
+    for log in sorted(logs, key=lambda x: x.date):
+        if log.status == LogStatus.DONE:
+            if prev_date is None:
+                streak = 1
+            elif log.date == prev_date + timedelta(days=1):
+                streak += 1
+            elif log.date == prev_date:
+                pass
+            else:
+                gap_ok = True
+                for i in range(1, (log.date - prev_date).days):
+                    if log_by_date.get(prev_date + timedelta(days=i)) != LogStatus.SKIPPED:
+                        gap_ok = False
+                        break
+                streak = streak + 1 if gap_ok else 1
+            prev_date = log.date
+            best_streak = max(best_streak, streak)
+        elif log.status == LogStatus.SKIPPED:
+            if prev_date is not None:
+                prev_date = log.date
+        else:
+            streak = 0
+            prev_date = None
+    
+    return current_streak, best_streak
+
+
+def random_history(rng, today, days, density, duplicates=False):
+    """Случайная история логов за days дней до today (и немного после), лёгкие объекты вместо MagicMock."""
+    from bot.database.models import LogStatus
+    
+    statuses = [LogStatus.DONE] * 6 + [LogStatus.SKIPPED] * 2 + [LogStatus.NOT_DONE]
+    logs = []
+    for offset in range(-3, days):
+        if rng.random() < density:
+            log_date = today - timedelta(days=offset)
+            logs.append(SimpleNamespace(date=log_date, status=rng.choice(statuses)))
+            if duplicates and rng.random() < 0.1:
+                logs.append(SimpleNamespace(date=log_date, status=rng.choice(statuses)))
+    logs.sort(key=lambda log: log.date)
+    return logs
+
+
+class TestDailyStreakDifferential:
+    """Дифференциальные тесты: однопроходный алгоритм совпадает с исходным."""
+    
+    @pytest.mark.parametrize("density", [0.05, 0.3, 0.8, 1.0])
+    def test_matches_reference_on_random_histories(self, density):
+        """Тест: совпадение на случайных историях разной плотности."""
+        import random
+        from bot.services.streak import calculate_daily_streak
+        
+        rng = random.Random(density)
+        for _ in range(300):
+            today = date(2024, 1, 1) + timedelta(days=rng.randint(0, 1000))
+            logs = random_history(rng, today, rng.randint(0, 400), density)
+            
+            assert calculate_daily_streak(logs, today) == reference_daily_streak(logs, today)
+    
+    def test_matches_reference_on_unsorted_and_duplicate_dates(self):
+        """Тест: совпадение на неотсортированном входе и повторяющихся датах."""
+        import random
+        from bot.services.streak import calculate_daily_streak
+        
+        rng = random.Random(12)
+        for _ in range(300):
+            today = date(2024, 6, 1)
+            logs = random_history(rng, today, 120, 0.7, duplicates=True)
+            rng.shuffle(logs)
+            
+            assert calculate_daily_streak(logs, today) == reference_daily_streak(logs, today)
+
+
 # === Тесты для Weekly Streak ===
 
 class TestWeeklyStreak:
@@ -189,6 +292,25 @@ class TestWeeklyStreak:
         # Неделя неуспешна (цель 3, выполнено 2)
         assert current == 0
     
+    def test_streak_across_iso_year_boundary(self):
+        """Тест: серия не рвётся, когда 31 декабря относится к неделе 1 следующего года."""
+        from bot.services.streak import calculate_weekly_streak
+        from bot.database.models import LogStatus
+        
+        # 2024-W52: 23-29 дек, 2025-W01: 30 дек 2024 - 5 янв 2025
+        today = date(2025, 1, 5)
+        logs = [
+            create_mock_log(date(2024, 12, 23), LogStatus.DONE),
+            create_mock_log(date(2024, 12, 24), LogStatus.DONE),
+            create_mock_log(date(2024, 12, 30), LogStatus.DONE),
+            create_mock_log(date(2024, 12, 31), LogStatus.DONE),
+        ]
+        
+        current, best = calculate_weekly_streak(logs, weekly_target=2, today=today)
+        
+        assert current == 2
+        assert best == 2
+    
     def test_empty_logs_weekly(self):
         """Тест: пустой список логов даёт нулевой weekly streak."""
         from bot.services.streak import calculate_weekly_streak
@@ -202,6 +324,80 @@ class TestWeeklyStreak:
         assert best == 0
 
 
+def reference_weekly_streak(logs, weekly_target, today):
+    """Исходная реализация calculate_weekly_streak на (год, неделя) — эталон для сравнения."""
+    from bot.database.models import LogStatus
+    from bot.services.streak import get_previous_week
+    
+    if not logs:
+        return 0, 0
+    
+    weeks = {}
+    for log in logs:
+        week_key = (log.date.isocalendar()[0], log.date.isocalendar()[1])
+        weeks.setdefault(week_key, []).append(log.status)
+    
+    def is_week_success(statuses):
+        return sum(1 for s in statuses if s == LogStatus.DONE) >= weekly_target
+    
+    sorted_weeks = sorted(weeks.keys())
+    
+    current_streak = 0
+    check_week = (today.isocalendar()[0], today.isocalendar()[1])
+    while check_week in weeks:
+        if is_week_success(weeks[check_week]):
+            current_streak += 1
+            check_week = get_previous_week(check_week)
+        else:
+            break
+    
+    best_streak = 0
+    streak = 0
+    for i, week in enumerate(sorted_weeks):
+        if is_week_success(weeks[week]):
+            if i == 0:
+                streak = 1
+            else:
+                prev_week = sorted_weeks[i - 1]
+                if prev_week == get_previous_week(week) and is_week_success(weeks[prev_week]):
+                    streak += 1
+                else:
+                    streak = 1
+            best_streak = max(best_streak, streak)
+        else:
+            streak = 0
+    
+    return current_streak, best_streak
+
+
+class TestWeeklyStreakDifferential:
+    """Дифференциальные тесты: расчёт по номерам недель совпадает с расчётом по (год, неделя)."""
+    
+    @pytest.mark.parametrize("density", [0.1, 0.4, 0.9])
+    def test_matches_reference_across_year_boundaries(self, density):
+        """Тест: совпадение на историях через границы лет, включая годы с неделей 53."""
+        import random
+        from bot.services.streak import calculate_weekly_streak
+        
+        rng = random.Random(density)
+        for _ in range(300):
+            # 2020 и 2026 — годы с 53 ISO неделями
+            today = date(2019, 12, 1) + timedelta(days=rng.randint(0, 2700))
+            logs = random_history(rng, today, rng.randint(0, 500), density)
+            target = rng.randint(0, 7)
+            
+            assert calculate_weekly_streak(logs, target, today) == reference_weekly_streak(
+                logs, target, today
+            )
+    
+    def test_week_53_is_adjacent_to_next_year_week_1(self):
+        """Тест: неделя 53 (2020) и неделя 1 (2021) идут подряд."""
+        from bot.services.streak import week_ordinal
+        
+        assert date(2020, 12, 31).isocalendar()[1] == 53
+        assert week_ordinal(date(2021, 1, 4)) - week_ordinal(date(2020, 12, 31)) == 1
+
+
 # === Тесты для HabitStats ===
 
 class TestHabitStats:
@@ -235,5 +431,53 @@ class TestHabitStats:
         assert stats.total_done == 15
 
 
+class TestDoneIndex:
+    """Тесты индекса префиксных сумм done."""
+    
+    def test_ranges_match_brute_force(self):
+        """Тест: любые окна и диапазоны совпадают с прямым подсчётом."""
+        import random
+        from bot.services.done_index import DoneIndex
+        from bot.database.columns import LogColumns
+        from bot.database.models import LogStatus
+        
+        rng = random.Random(19)
+        today = date(2025, 3, 15)
+        logs = random_history(rng, today, days=400, density=0.6, duplicates=True)
+        index = DoneIndex.from_columns(LogColumns.from_logs(logs))
+        done_dates = [log.date for log in logs if log.status == LogStatus.DONE]
+        
+        for days in (0, 1, 7, 30, 90, 365, 1000):
+            expected = sum(1 for d in done_dates if (today - d).days <= days)
+            assert index.last_days(days, today) == expected
+        
+        for _ in range(200):
+            start = today - timedelta(days=rng.randint(-10, 420))
+            end = start + timedelta(days=rng.randint(-5, 200))
+            assert index.between(start, end) == sum(1 for d in done_dates if start <= d <= end)
+        
+        assert index.total == len(done_dates)
+        assert index.month_to_date(today) == sum(
+            1 for d in done_dates if date(2025, 3, 1) <= d <= today
+        )
+    
+    def test_counters_match_habit_stats(self):
+        """Тест: done_7_days/done_30_days/total_done по истории совпадают с окнами индекса."""
+        from bot.database.columns import LogColumns
+        from bot.services.done_index import DoneIndex
+        from bot.services.streak import get_habit_stats
+        
+        today = date(2025, 1, 31)
+        logs = [create_mock_log(today - timedelta(days=i), MockLogStatus.DONE) for i in range(100)]
+        stats = get_habit_stats(logs, MockScheduleType.DAILY, 0, today)
+        index = DoneIndex.from_columns(LogColumns.from_logs(logs))
+        
+        assert index.last_days(7, today) == stats.done_7_days == 8
+        assert index.last_days(30, today) == stats.done_30_days == 31
+        assert index.total == stats.total_done == 100
+        assert index.last_days(90, today) == 91
+        assert index.month_to_date(today) == 31
+        assert DoneIndex().between(date.min, date.max) == 0
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
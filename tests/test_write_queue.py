@@ -0,0 +1,67 @@
+"""
+Тесты очереди записи логов с групповым commit.
+"""
+import asyncio
+from datetime import date
+
+from sqlalchemy import func, select
+
+
+class TestLogWriteQueue:
+    """Тесты LogWriteQueue."""
+    
+    async def test_concurrent_writes_committed_in_batches(self, session_factory):
+        """Тест: одновременные нажатия записываются меньшим числом транзакций."""
+        from bot.database.crud import create_habit, get_or_create_user
+        from bot.database.models import HabitLog, LogStatus
+        from bot.database.write_queue import LogWriteQueue
+        
+        async with session_factory() as session:
+            habit_ids = []
+            for user_id in range(1, 21):
+                await get_or_create_user(session, user_id)
+                habit = await create_habit(session, user_id=user_id, name="Вода")
+                habit_ids.append(habit.id)
+        
+        queue = LogWriteQueue(session_factory, max_size=8, max_batch=50, flush_interval=0.01)
+        queue.start()
+        today = date(2024, 1, 15)
+        await asyncio.gather(
+            *(queue.submit(habit_id, today, LogStatus.DONE) for habit_id in habit_ids),
+            # Повторное нажатие той же кнопки схлопывается в одну запись
+            queue.submit(habit_ids[0], today, LogStatus.SKIPPED),
+        )
+        await queue.stop()
+        
+        async with session_factory() as session:
+            count = await session.scalar(select(func.count()).select_from(HabitLog))
+            first = await session.scalar(select(HabitLog).where(HabitLog.habit_id == habit_ids[0]))
+        
+        assert count == 20
+        assert first.status == LogStatus.SKIPPED
+        assert queue.batches_committed < 20
+    
+    async def test_failed_write_does_not_break_batch(self, session_factory):
+        """Тест: ошибка одной записи возвращается её автору, остальные коммитятся."""
+        from bot.database.crud import create_habit, get_or_create_user
+        from bot.database.models import HabitLog, LogStatus
+        from bot.database.write_queue import LogWriteQueue
+        
+        async with session_factory() as session:
+            await get_or_create_user(session, 1)
+            habit = await create_habit(session, user_id=1, name="Бег")
+        
+        queue = LogWriteQueue(session_factory, flush_interval=0.01)
+        queue.start()
+        results = await asyncio.gather(
+            queue.submit(habit.id, date(2024, 1, 15), LogStatus.DONE),
+            queue.submit(habit.id, date(2024, 1, 16), "broken"),
+            return_exceptions=True,
+        )
+        await queue.stop()
+        
+        assert results[0] is None
+        assert isinstance(results[1], Exception)
+        async with session_factory() as session:
+            count = await session.scalar(select(func.count()).select_from(HabitLog))
+        assert count == 1